@@ -1,8 +1,18 @@
 import numpy as np
+import os
 import timeit
+import tracemalloc
 import platform
 import multiprocessing
 import scipy
+from scipy import sparse
+from collections import namedtuple
+
+SkippedTiming = namedtuple('SkippedTiming', ['mean', 'std', 'reason'])
+
+MEMORY_SAFETY_FACTOR = 0.8
+
+MUTATING_FUNCTIONS = set()  # functions under test which modify their inputs (see mutates_inputs)
 
 
 
@@ -25,7 +35,40 @@ def get_test_related_information():
     return data
 
 
-def test_performance(func, repeats, matrix_1, matrix_2):
+def mutates_inputs(func):
+    """
+    Registers a function under test which modifies its inputs. test_performance then gives every repeat a fresh
+    copy of the inputs, prepared outside of the timed region. The function must take the two matrices of the
+    harness, func(matrix_1, matrix_2), since copy_inputs copies both parameters.
+    Parameters
+    ----------
+    func - the function under test
+
+    Returns the function
+    -------
+
+    """
+    MUTATING_FUNCTIONS.add(func)
+    return func
+
+
+def copy_inputs(matrix_1, matrix_2):
+    """
+    Copies the inputs of a function under test. Memory-mapped matrices are copied into memory.
+    Parameters
+    ----------
+    matrix_1 - first parameter of the function under test
+    matrix_2 - second parameter of the function under test
+
+    Returns a tuple with the copies
+    -------
+
+    """
+    return tuple(matrix.copy() if sparse.issparse(matrix) else None if matrix is None else np.array(matrix)
+                 for matrix in (matrix_1, matrix_2))
+
+
+def test_performance(func, repeats, matrix_1, matrix_2, required_bytes=None, setup=None, warm_up=False, **kwargs):
     """
     creates a list of performance test results.
     Parameters
@@ -34,18 +77,35 @@ def test_performance(func, repeats, matrix_1, matrix_2):
     repeats - repeat for the time measurement
     matrix_1 - first parameter of the function under test
     matrix_2 - send parameter of the function under test
+    required_bytes - memory the function needs. If it exceeds the available memory, the test is skipped.
+    setup - a function which is called with (matrix_1, matrix_2) before every repeat, outside of the timed region,
+            and returns the parameters for that repeat. Functions declared with mutates_inputs get copy_inputs
+            by default.
+    warm_up - if True, the function is called once before the repeats, so a one-time preparation on the first call
+              (e.g. the autotuning of matrix_funcs.AUTOTUNED_FUNCTIONS) is not timed.
+    kwargs - further keyword arguments of the function under test
 
-    Returns a results list. The list contains tuples in the following form: (mean, std. deviation)
+    Returns a results list. The list contains tuples in the following form: (mean, std. deviation).
+    A skipped test returns a SkippedTiming (nan, nan, reason).
     -------
 
     """
+    if required_bytes is not None and not fits_in_memory(required_bytes):
+        reason = '{0} needs {1} bytes, but only {2} bytes are available'.format(
+            func.__name__, required_bytes, get_available_memory())
+        return SkippedTiming(np.nan, np.nan, reason)
+    if setup is None and func in MUTATING_FUNCTIONS:
+        setup = copy_inputs
+    if warm_up:
+        func(*(setup(matrix_1, matrix_2) if setup is not None else (matrix_1, matrix_2)), **kwargs)
     all_results = []
     for i in range(repeats):
-        all_results.append(measure_time(func,matrix_1, matrix_2))
+        inputs = setup(matrix_1, matrix_2) if setup is not None else (matrix_1, matrix_2)
+        all_results.append(measure_time(func, *inputs, **kwargs))
     return (np.mean(all_results), np.std(all_results))
 
 
-def measure_time(func, matrix_1, matrix_2):
+def measure_time(func, matrix_1, matrix_2, **kwargs):
     """
     Measures the clock time while running a function
     Parameters
@@ -53,6 +113,7 @@ def measure_time(func, matrix_1, matrix_2):
     func - the function under test
     matrix_1  - first parameter of the function under test
     matrix_2  - second parameter of the function under test
+    kwargs - further keyword arguments of the function under test
 
     Returns the measured time in seconds
     -------
@@ -60,12 +121,44 @@ def measure_time(func, matrix_1, matrix_2):
     """
 
     start = timeit.default_timer()
-    func(matrix_1, matrix_2)
+    func(matrix_1, matrix_2, **kwargs)
     end = timeit.default_timer()
     return end - start
 
 
-def test_performance_dot_sparse(repeats, matrix_1, matrix_2):
+def test_performance_over_workers(func, worker_counts, repeats, matrix_1, matrix_2, warm_up=False):
+    """
+    creates performance test results of a parallel function for several numbers of workers.
+    Parameters
+    ----------
+    func - the function under test. It must accept a keyword argument 'workers'.
+    worker_counts - the numbers of workers under test
+    repeats - repeat for the time measurement
+    matrix_1 - first parameter of the function under test
+    matrix_2 - second parameter of the function under test
+    warm_up - if True, the function is called once before the repeats of each number of workers (see
+              test_performance)
+
+    Returns a dictionary with the number of workers as keys and tuples (mean, std. deviation) as values
+    -------
+
+    """
+    return {workers: test_performance(func, repeats, matrix_1, matrix_2, warm_up=warm_up, workers=workers)
+            for workers in worker_counts}
+
+
+def get_worker_counts():
+    """
+    Returns the numbers of threads under test: powers of two up to all CPUs.
+    -------
+
+    """
+    cpu_count = multiprocessing.cpu_count()
+    worker_counts = [2 ** i for i in range(cpu_count.bit_length()) if 2 ** i < cpu_count]
+    return worker_counts + [cpu_count]
+
+
+def test_performance_dot_sparse(repeats, matrix_1, matrix_2, required_bytes=None):
     """
     creates a list of performance test results for the sparse matrix multiplication.
     Parameters
@@ -73,11 +166,18 @@ def test_performance_dot_sparse(repeats, matrix_1, matrix_2):
     repeats - number of repeats for the time measurements
     matrix_1 - the first matrix for the multiplication
     matrix_2 - the second matrix for the multiplication
+    required_bytes - memory the product needs (see nnz_funcs.get_product_bytes). If it exceeds the available
+                     memory, the test is skipped.
 
-    Returns a results list. The list contains tuples in the following form: (mean, std. deviation)
+    Returns a results list. The list contains tuples in the following form: (mean, std. deviation).
+    A skipped test returns a SkippedTiming (nan, nan, reason).
     -------
 
     """
+    if required_bytes is not None and not fits_in_memory(required_bytes):
+        reason = 'the product needs {0} bytes, but only {1} bytes are available'.format(
+            required_bytes, get_available_memory())
+        return SkippedTiming(np.nan, np.nan, reason)
     all_results = []
     for i in range(repeats):
        all_results.append(measure_time_dot_sparse(matrix_1, matrix_2))
@@ -101,3 +201,168 @@ def measure_time_dot_sparse(matrix_1, matrix_2):
     end = timeit.default_timer()
     return end - start
 
+
+def get_available_memory():
+    """
+    Gets the memory which is available without swapping.
+    Returns the available memory in bytes, or None if it cannot be determined
+    -------
+
+    """
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def fits_in_memory(required_bytes, safety_factor=MEMORY_SAFETY_FACTOR):
+    """
+    Checks whether an allocation fits into the available memory.
+    Parameters
+    ----------
+    required_bytes - the size of the allocation in bytes
+    safety_factor - the share of the available memory that may be used
+
+    Returns True if the allocation fits or the available memory is unknown
+    -------
+
+    """
+    available_memory = get_available_memory()
+    return available_memory is None or required_bytes <= available_memory * safety_factor
+
+
+def estimate_dense_baseline_bytes(matrix_1, matrix_2):
+    """
+    Estimates the memory a multiplication with a dense result needs: the dense result plus in-memory copies of
+    both operands.
+    Parameters
+    ----------
+    matrix_1 - the first matrix
+    matrix_2 - the second matrix
+
+    Returns the estimated memory in bytes
+    -------
+
+    """
+    itemsize = np.result_type(matrix_1.dtype, matrix_2.dtype).itemsize
+    return estimate_dense_result_bytes(matrix_1, matrix_2) + matrix_1.shape[0] * matrix_1.shape[1] * itemsize + \
+        matrix_2.shape[0] * matrix_2.shape[1] * itemsize
+
+
+def estimate_dense_result_bytes(matrix_1, matrix_2):
+    """
+    Estimates the memory of the dense result of a multiplication.
+    Parameters
+    ----------
+    matrix_1 - the first matrix
+    matrix_2 - the second matrix
+
+    Returns the estimated memory in bytes
+    -------
+
+    """
+    return matrix_1.shape[0] * matrix_2.shape[1] * np.result_type(matrix_1.dtype, matrix_2.dtype).itemsize
+
+
+def estimate_sparse_conversion_bytes(matrix):
+    """
+    Estimates the memory of the CSR (or CSC) conversion of a dense matrix: data and indices of the non-zero
+    entries plus the index pointer.
+    Parameters
+    ----------
+    matrix - a numpy-array or memory-mapped numpy-array
+
+    Returns the estimated memory in bytes
+    -------
+
+    """
+    nnz = np.count_nonzero(matrix)
+    index_itemsize = np.dtype(np.int32 if max(nnz, max(matrix.shape)) <= np.iinfo(np.int32).max
+                              else np.int64).itemsize
+    return nnz * (matrix.dtype.itemsize + index_itemsize) + (max(matrix.shape) + 1) * index_itemsize
+
+
+def get_matrix_bytes(matrix):
+    """
+    Gets the memory footprint of a dense or sparse matrix.
+    Parameters
+    ----------
+    matrix - numpy-array or SciPy sparse matrix
+
+    Returns the size in bytes
+    -------
+
+    """
+    if sparse.issparse(matrix):
+        if matrix.format == 'coo':
+            arrays = [matrix.data] + list(matrix.coords)
+        elif matrix.format in ('csr', 'csc', 'bsr'):
+            arrays = [matrix.data, matrix.indices, matrix.indptr]
+        else:
+            return get_matrix_bytes(matrix.tocoo())
+        return sum(array.nbytes for array in arrays)
+    return np.asarray(matrix).nbytes
+
+
+def measure_result_bytes(func, matrix_1, matrix_2, **kwargs):
+    """
+    Measures the memory footprint of the result of a function.
+    Parameters
+    ----------
+    func - the function under test
+    matrix_1 - first parameter of the function under test
+    matrix_2 - second parameter of the function under test
+    kwargs - further keyword arguments of the function under test
+
+    Returns the size of the result in bytes
+    -------
+
+    """
+    return get_matrix_bytes(func(matrix_1, matrix_2, **kwargs))
+
+
+def measure_bytes_moved(func, matrix_1, matrix_2):
+    """
+    Runs a function once and sums up the sizes of its operands and of its result.
+    Parameters
+    ----------
+    func - the function under test
+    matrix_1 - first parameter of the function under test
+    matrix_2 - second parameter of the function under test
+
+    Returns the number of bytes
+    -------
+
+    """
+    result = func(matrix_1, matrix_2)
+    return get_matrix_bytes(matrix_1) + get_matrix_bytes(matrix_2) + get_matrix_bytes(result)
+
+
+def measure_peak_memory(func, matrix_1, matrix_2, **kwargs):
+    """
+    Measures the peak memory allocated while running a function. numpy reports its array allocations to
+    tracemalloc, so the measurement includes all temporary arrays.
+    Parameters
+    ----------
+    func - the function under test
+    matrix_1 - first parameter of the function under test
+    matrix_2 - second parameter of the function under test
+    kwargs - further keyword arguments of the function under test
+
+    Returns the peak memory in bytes
+    -------
+
+    """
+    tracemalloc.start()
+    try:
+        func(matrix_1, matrix_2, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
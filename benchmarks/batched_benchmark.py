@@ -0,0 +1,118 @@
+import numpy as np
+import benchmark_funcs as bf
+import matrix_funcs as mf
+import fixture_funcs as fx
+import date_funcs as df
+import table_funcs as tf
+import plotting_funcs as pf
+import benchmarks.dense_dot_sparse_benchmark as dds
+from data_containers.plot_data import PlotData
+
+TABLE_HEADLINE = "Ergebnisse des 12. Benchmarks (n = Anzahl der Matrixpaare)"
+
+RESULTS_DIRECTORY = "results/"
+
+BENCHMARK_DIRECTORY = "12_BatchedBenchmark/"
+
+FILENAME = "batched_benchmark_results"
+
+TEST_NAME = 'Viele kleine Matrixmultiplikationen: Python-Schleife vs. ein Aufruf für den ganzen Stapel'
+
+PLOT_Y_LABEL = 'Durchschnittliche Rechenzeit [Sek]'
+
+PLOT_X_LABEL = 'Anzahl der Matrixpaare'
+
+
+def create_functions_aliases():
+    """
+    Creates aliases to the function names in order to display them in the plots.
+    Returns a dictionary with the function names as keys and aliases as values.
+    -------
+
+    """
+    return {'dot_scipy_csr_with_conversion_loop': 'Schleife über Compressed Sparse Row x Compressed Sparse Row',
+            'dot_batched_sparse': 'Stapel: blockdiagonale Compressed Sparse Row Matrix',
+            'dot_batched_dense': 'Stapel: Numpy matmul'}
+
+
+def dot_scipy_csr_with_conversion_loop(matrices_1, matrices_2):
+    """
+    Multiplies the pairs of a batch one after another with dot_scipy_csr_with_conversion.
+    Parameters
+    ----------
+    matrices_1 - numpy 3-dim array with the first matrices
+    matrices_2 - numpy 3-dim array with the second matrices
+
+    Returns a list with the products
+    -------
+
+    """
+    return [mf.dot_scipy_csr_with_conversion(matrix_1, matrix_2) for matrix_1, matrix_2 in zip(matrices_1, matrices_2)]
+
+
+def get_batch(batch_size, n, percent_zeros, seed):
+    """
+    Gets a batch of n x n matrices. The batch is one fixture matrix with batch_size * n rows.
+    Parameters
+    ----------
+    batch_size - number of matrices in the batch
+    n - number of items in each matrix dimension
+    percent_zeros - percentage of zeros in the matrices
+    seed - seed for the generated matrices
+
+    Returns a numpy 3-dim array (batch_size, n, n)
+    -------
+
+    """
+    return fx.get_matrix(batch_size * n, n, percent_zeros, dtype=np.float64, seed=seed).reshape(batch_size, n, n)
+
+
+def run_performance_test(batch_sizes, n, number_of_timings, percent_zeros=0.99, seed=fx.DEFAULT_SEED):
+    """
+    Runs the benchmark.
+    Parameters
+    ----------
+    batch_sizes - the numbers of matrix pairs in a batch
+    n - number of items in each matrix dimension
+    number_of_timings - number of repeats for each timing
+    percent_zeros - percentage of zeros in the matrices
+    seed - seed for the generated matrices
+
+    Returns a dictionary with the avg. results and std. for each function
+    -------
+
+    """
+    test_results = {name: [] for name in create_functions_aliases()}
+    for batch_size in batch_sizes:
+        matrices_1 = get_batch(batch_size, n, percent_zeros, seed)
+        matrices_2 = get_batch(batch_size, n, percent_zeros, seed + 1)
+        test_results['dot_scipy_csr_with_conversion_loop'].append(
+            bf.test_performance(dot_scipy_csr_with_conversion_loop, number_of_timings, matrices_1, matrices_2))
+        for method in ['sparse', 'dense']:
+            test_results['dot_batched_' + method].append(
+                bf.test_performance(mf.dot_batched, number_of_timings, matrices_1, matrices_2, method=method))
+        print(batch_size)
+    return test_results
+
+
+if __name__ == '__main__':
+    benchmark_timestamp = df.get_date()
+    results_path = RESULTS_DIRECTORY + BENCHMARK_DIRECTORY + benchmark_timestamp + "/"
+    batch_sizes = [1, 10, 100, 1000, 10000]
+    n = 50
+    number_of_timings = 5
+
+    results = run_performance_test(batch_sizes, n, number_of_timings)
+    dds.backup_results(results_path, results, FILENAME)
+
+    timings = dds.get_timings_from_results(results)
+    functions_ranked_by_time = dds.rank_functions_by_performance(timings)
+    functions_labels = create_functions_aliases()
+    table_data = tf.TableData(functions_labels, batch_sizes, functions_ranked_by_time, results, timings)
+
+    ranked_times = [ranked_label for time, ranked_label in functions_ranked_by_time]
+    plot_title = TEST_NAME + ', {0}x{0}'.format(n)
+    pf.plot_timing_over(PlotData(plot_title, functions_labels, results, ranked_times, PLOT_X_LABEL,
+                                 PLOT_Y_LABEL), batch_sizes, results_path, log_x=True)
+    dds.persist_summery_table(number_of_timings, results_path, dds.create_summery_table(table_data),
+                              TABLE_HEADLINE)
@@ -0,0 +1,92 @@
+import numpy as np
+import benchmark_funcs as bf
+import bsr_funcs as bsr
+import matrix_funcs as mf
+import fixture_funcs as fx
+import date_funcs as df
+import io_funcs as io
+import plotting_funcs as pf
+import benchmarks.dense_dot_sparse_benchmark as dds
+from data_containers.plot_data import PlotData
+
+RESULTS_DIRECTORY = "results/"
+
+BENCHMARK_DIRECTORY = "09_BsrBlocksizeBenchmark/"
+
+FILENAME = "bsr_blocksize_benchmark_results"
+
+SUMMERY_TABLE_FILE = 'summery_table.txt'
+
+TABLE_HEADLINE = "Ergebnisse des 9. Benchmarks\n"
+
+PLOT_Y_LABEL = 'Durchschnittliche Rechenzeit [Sek]'
+
+PLOT_X_LABEL = 'Blockgröße $b \\times b$'
+
+
+def create_structure_aliases(structures):
+    """
+    Creates aliases to the structures in order to display them in the plots.
+    Returns a dictionary with the structures as keys and aliases as values.
+    -------
+
+    """
+    names = {'uniform': 'Gleichverteilt', 'banded': 'Bandmatrix', 'diagonal': 'Diagonalen',
+             'block_diagonal': 'Blockdiagonal', 'power_law': 'Potenzgesetz', 'clustered': 'Cluster'}
+    return {structure: names[structure] for structure in structures}
+
+
+def run_performance_test(n, number_of_timings, structures, block_sizes, seed=fx.DEFAULT_SEED):
+    """
+    Runs the benchmark: the BSR x numpy multiplication for every structure and block size.
+    Parameters
+    ----------
+    n - number of items in each matrix dimension, a multiple of all block sizes
+    number_of_timings - number of repeats for each timing
+    structures - the sparsity structures under test
+    block_sizes - the edge lengths of the square blocks under test
+
+    Returns two dictionaries: the avg. results and std. for each structure over the block sizes, and the block
+    size the autotuner chose for each structure
+    -------
+
+    """
+    test_results = {structure: [] for structure in structures}
+    tuned_block_sizes = {}
+    for structure in structures:
+        dense_matrix = fx.get_matrix(n, n, 0.01, dtype=np.float64, seed=seed)
+        sparse_matrix = fx.get_matrix(n, n, 0.99, dtype=np.float64, structure=structure, seed=seed + 1)
+        for size in block_sizes:
+            test_results[structure].append(bf.test_performance(mf.scipy_bsr_dot_numpy_with_swap, number_of_timings,
+                                                               dense_matrix, sparse_matrix, blocksize=(size, size)))
+            print(structure, size)
+        tuned_block_sizes[structure] = bsr.get_bsr_blocksize(sparse_matrix.T, operation='dense')
+    return test_results, tuned_block_sizes
+
+
+if __name__ == '__main__':
+    benchmark_timestamp = df.get_date()
+    results_path = RESULTS_DIRECTORY + BENCHMARK_DIRECTORY + benchmark_timestamp + "/"
+    n = 4096
+    block_sizes = bsr.BLOCK_SIZES
+    number_of_timings = 5
+    structures = ['uniform', 'banded', 'diagonal', 'block_diagonal', 'power_law', 'clustered']
+
+    results, tuned_block_sizes = run_performance_test(n, number_of_timings, structures, block_sizes)
+    dds.backup_results(results_path, {'results': results, 'tuned_block_sizes': tuned_block_sizes}, FILENAME)
+
+    timings = dds.get_timings_from_results(results)
+    structures_ranked_by_time = dds.rank_functions_by_performance(timings)
+    labels = create_structure_aliases(structures)
+    ranked_structures = [ranked_label for time, ranked_label in structures_ranked_by_time]
+    plot_title = 'Block Sparse Row x Numpy: Rechenzeit über die Blockgröße, N={0}'.format(n)
+    pf.plot_timing_over(PlotData(plot_title, labels, results, ranked_structures, PLOT_X_LABEL,
+                                 PLOT_Y_LABEL), block_sizes, results_path)
+
+    io.persist_to_text_file(TABLE_HEADLINE + '\nFür jede Blockgröße wurde die Ausführungszeit {0} Mal gemessen.\n'
+                            .format(number_of_timings), results_path, SUMMERY_TABLE_FILE)
+    io.persist_test_related_info(results_path, SUMMERY_TABLE_FILE)
+    for structure in structures:
+        fastest = block_sizes[int(np.argmin(timings[structure]))]
+        io.persist_to_text_file('{0}: schnellste Blockgröße {1}x{1}, abgestimmte Blockgröße {2}x{3}\n'.format(
+            labels[structure], fastest, *tuned_block_sizes[structure]), results_path, SUMMERY_TABLE_FILE)
@@ -0,0 +1,120 @@
+import numpy as np
+import benchmark_funcs as bf
+import matrix_funcs as mf
+import buffer_funcs as buf
+import fixture_funcs as fx
+import date_funcs as df
+import table_funcs as tf
+import benchmarks.dense_dot_sparse_benchmark as dds
+from data_containers.plot_data import PlotData
+
+TABLE_HEADLINE = "Ergebnisse des 10. Benchmarks"
+
+RESULTS_DIRECTORY = "results/"
+
+BENCHMARK_DIRECTORY = "10_BufferReuseBenchmark/"
+
+FILENAME = "buffer_reuse_benchmark_results"
+
+TEST_NAME = 'Matrixmultiplikation: neues Ergebnis vs. wiederverwendeter Ergebnispuffer'
+
+PLOT_Y_LABEL = 'Durchschnittliche Rechenzeit [Sek]'
+
+PLOT_X_LABEL = 'Matrixgröße $N \\times N$'
+
+
+def get_functions_under_test():
+    """
+    Returns a list with all functions under test.
+    -------
+    """
+    return [mf.dot_numpy, mf.dot_scipy_csr_with_conversion, mf.scipy_csr_dot_numpy_with_swap]
+
+
+def create_functions_aliases():
+    """
+    Creates aliases to the function names in order to display them in the plots. Every function is tested with a
+    fresh result and with a reused buffer.
+    Returns a dictionary with the result keys as keys and aliases as values.
+    -------
+
+    """
+    aliases = {'dot_numpy': 'Numpy x Numpy',
+               'dot_scipy_csr_with_conversion': 'Compressed Sparse Row x Compressed Sparse Row',
+               'scipy_csr_dot_numpy_with_swap': 'Compressed Sparse Row x Numpy'}
+    labels = {}
+    for name, alias in aliases.items():
+        labels[get_result_key(name, False)] = alias + ' (neues Ergebnis)'
+        labels[get_result_key(name, True)] = alias + ' (Puffer wiederverwendet)'
+    return labels
+
+
+def get_result_key(function_name, reuse_buffer):
+    """
+    Creates the key of a function and buffer mode in the results.
+    Parameters
+    ----------
+    function_name - the name of the function under test
+    reuse_buffer - True if the result is written into a reused buffer
+
+    Returns the key as string
+    -------
+
+    """
+    return '{0}_{1}'.format(function_name, 'reused' if reuse_buffer else 'fresh')
+
+
+def run_performance_test(items_pro_dimension, number_of_timings, functions, seed=fx.DEFAULT_SEED):
+    """
+    Runs the benchmark. The reused buffer is acquired from a BufferPool and touched once before the timings, so
+    the difference of both modes is the allocation and the page faults of a fresh result.
+    Parameters
+    ----------
+    items_pro_dimension - number of items in each matrix dimension
+    number_of_timings - number of repeats for each timing
+    functions - the functions under test
+    seed - seed for the generated matrices
+
+    Returns a dictionary with the avg. results and std. for each function and buffer mode
+    -------
+
+    """
+    pool = buf.BufferPool()
+    test_results = {get_result_key(f.__name__, reuse_buffer): [] for f in functions for reuse_buffer in (False, True)}
+    for n in items_pro_dimension:
+        dense_matrix = fx.get_matrix(n, n, 0.01, dtype=np.float64, seed=seed)
+        sparse_matrix = fx.get_matrix(n, n, 0.99, dtype=np.float64, seed=seed + 1)
+        buffer = pool.acquire_product(dense_matrix, sparse_matrix)
+        buffer.fill(0)
+        for func in functions:
+            test_results[get_result_key(func.__name__, False)].append(
+                bf.test_performance(func, number_of_timings, dense_matrix, sparse_matrix))
+            test_results[get_result_key(func.__name__, True)].append(
+                bf.test_performance(func, number_of_timings, dense_matrix, sparse_matrix, out=buffer))
+            print(func.__name__, n)
+        pool.release(buffer)
+    return test_results
+
+
+if __name__ == '__main__':
+    benchmark_timestamp = df.get_date()
+    results_path = RESULTS_DIRECTORY + BENCHMARK_DIRECTORY + benchmark_timestamp + "/"
+    functions_under_test = get_functions_under_test()
+    items_pro_dimension = [250, 500, 1000, 2000, 4000]
+    number_of_timings_pro_function_and_matrix_dimension = 5
+
+    results = run_performance_test(items_pro_dimension, number_of_timings_pro_function_and_matrix_dimension,
+                                   functions_under_test)
+    dds.backup_results(results_path, results, FILENAME)
+
+    timings = dds.get_timings_from_results(results)
+    functions_ranked_by_time = dds.rank_functions_by_performance(timings)
+    functions_labels = create_functions_aliases()
+    table_data = tf.TableData(functions_labels, items_pro_dimension, functions_ranked_by_time, results, timings)
+
+    ranked_times = [ranked_label for time, ranked_label in functions_ranked_by_time]
+    plot__data = PlotData(TEST_NAME, functions_labels, results, ranked_times, PLOT_X_LABEL, PLOT_Y_LABEL)
+    dds.persist_plots(items_pro_dimension, results_path, plot__data)
+    results_table = dds.create_summery_table(table_data)
+    dds.persist_summery_table(number_of_timings_pro_function_and_matrix_dimension, results_path, results_table,
+                              TABLE_HEADLINE)
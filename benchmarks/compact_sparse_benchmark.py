@@ -0,0 +1,99 @@
+import benchmark_funcs as bf
+import matrix_funcs as mf
+import fixture_funcs as fx
+import date_funcs as df
+import table_funcs as tf
+import benchmarks.dense_dot_sparse_benchmark as dds
+from data_containers.plot_data import PlotData
+
+TABLE_HEADLINE = "Ergebnisse des 16. Benchmarks (n = Matrixgröße N x N)"
+
+RESULTS_DIRECTORY = "results/"
+
+BENCHMARK_DIRECTORY = "16_CompactSparseBenchmark/"
+
+FILENAME = "compact_sparse_benchmark_results"
+
+TEST_NAME = 'Dünn besetzte Matrix mal Vektor: Standard- vs. kompakte Darstellung'
+
+PLOT_Y_LABEL = 'Durchschnittliche Rechenzeit [Sek]'
+
+PLOT_X_LABEL = 'Matrixgröße $N \\times N$'
+
+
+def create_functions_aliases():
+    """
+    Creates aliases to the test cases in order to display them in the plots.
+    Returns a dictionary with the test case names as keys and aliases as values.
+    -------
+
+    """
+    return {'default': 'CSR, Standard (int64-Daten)',
+            'compact': 'CSR, kompakt (int32-Indizes, schmale Daten)'}
+
+
+def multiply_default(sparse_matrix, vector):
+    """
+    Multiplies a sparse matrix in the default representation with a vector.
+    Parameters
+    ----------
+    sparse_matrix - a SciPy CSR matrix
+    vector - a numpy array with one column
+
+    Returns a numpy array, which is the result of the matrix multiplication.
+    -------
+
+    """
+    return sparse_matrix.dot(vector)
+
+
+def run_performance_test(items_pro_dimension, number_of_timings, percent_zeros=0.99, seed=fx.DEFAULT_SEED):
+    """
+    Runs the benchmark. The default matrix is the CSR fixture as SciPy builds it from the int64 values of
+    create_matrix, the compact matrix is the same matrix after compact_sparse.
+    Parameters
+    ----------
+    items_pro_dimension - number of items in each matrix dimension
+    number_of_timings - number of repeats for each timing
+    percent_zeros - percentage of zeros in the sparse matrix
+    seed - seed for the generated matrices
+
+    Returns a dictionary with the avg. results and std. for each test case and a dictionary with the memory of the
+    sparse matrix in each representation
+    -------
+
+    """
+    test_results = {name: [] for name in create_functions_aliases()}
+    sparse_memory = {name: [] for name in create_functions_aliases()}
+    for n in items_pro_dimension:
+        default_matrix = fx.get_matrix(n, n, percent_zeros, seed=seed, matrix_format='csr')
+        vector = fx.get_matrix(n, 1, 0.01, seed=seed + 1)
+        test_cases = {'default': (multiply_default, default_matrix),
+                      'compact': (mf.dot_compact, mf.compact_sparse(default_matrix))}
+        for name, (func, sparse_matrix) in test_cases.items():
+            test_results[name].append(bf.test_performance(func, number_of_timings, sparse_matrix, vector))
+            sparse_memory[name].append(mf.get_sparse_bytes(sparse_matrix))
+            print(name, n)
+    return test_results, sparse_memory
+
+
+if __name__ == '__main__':
+    benchmark_timestamp = df.get_date()
+    results_path = RESULTS_DIRECTORY + BENCHMARK_DIRECTORY + benchmark_timestamp + "/"
+    items_pro_dimension = [5000, 10000, 20000, 40000]
+    number_of_timings = 10
+
+    results, sparse_memory = run_performance_test(items_pro_dimension, number_of_timings)
+    dds.backup_results(results_path, {'results': results, 'sparse_memory': sparse_memory}, FILENAME)
+
+    timings = dds.get_timings_from_results(results)
+    functions_ranked_by_time = dds.rank_functions_by_performance(timings)
+    functions_labels = create_functions_aliases()
+    table_data = tf.TableData(functions_labels, items_pro_dimension, functions_ranked_by_time, results, timings)
+
+    ranked_times = [ranked_label for time, ranked_label in functions_ranked_by_time]
+    plot__data = PlotData(TEST_NAME, functions_labels, results, ranked_times, PLOT_X_LABEL, PLOT_Y_LABEL)
+    dds.persist_plots(items_pro_dimension, results_path, plot__data)
+    results_table = dds.create_summery_table(table_data)
+    results_table += tf.create_memory_table(functions_labels, items_pro_dimension, sparse_memory, tf.SPARSE_MEMORY)
+    dds.persist_summery_table(number_of_timings, results_path, results_table, TABLE_HEADLINE)
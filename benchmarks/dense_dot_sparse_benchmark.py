@@ -1,5 +1,8 @@
 import benchmark_funcs as bf
+import numpy as np
 import matrix_funcs as mf
+import bitpacked_funcs as bp
+import fixture_funcs as fx
 import io_funcs as io
 import date_funcs as df
 import plotting_funcs as pf
@@ -20,8 +23,17 @@ RESULTS_DIRECTORY = "results/"
 
 BENCHMARK_DIRECTORY = "03_DenseDotSparseBenchmark/"
 
+PLAN_FILENAME = "dense_dot_sparse_plan"
 
-def run_performance_test(items_pro_dimension, number_of_timings, functions):
+PLAN_TEST_NAME = 'Matrixmultiplikation mit vorbereitetem Operanden: Konvertierung und Multiplikation'
+
+OUTPUT_FILENAME = "dense_dot_sparse_output"
+
+OUTPUT_TEST_NAME = 'Matrixmultiplikation zweier dünn besetzter Matrizen: Ausgabeformat des Ergebnisses'
+
+
+def run_performance_test(items_pro_dimension, number_of_timings, functions, seed=fx.DEFAULT_SEED,
+                         structure='uniform', out_of_core=False, dtype=int):
     """
     Runs the Benchmark.
     Parameters
@@ -29,21 +41,191 @@ def run_performance_test(items_pro_dimension, number_of_timings, functions):
     items_pro_dimension - number of items in each matrix dimension
     number_of_timings  - number of repeats for each timing
     functions - the functions under test
+    seed - seed for the generated matrices
+    structure - the sparsity structure of the generated matrices
+    out_of_core - if True, the matrices are generated on disk and memory-mapped instead of being loaded
+    dtype - the data type of the generated matrices
 
-    Returns a dictionary with the avg. results and std. for each function
+    Returns a dictionary with the avg. results and std. for each function. Functions which do not fit into memory
+    (see get_required_bytes) are skipped and get a SkippedTiming with the reason.
     -------
 
     """
+    if out_of_core and structure not in fx.MEMMAP_STRUCTURES:
+        raise ValueError("Out-of-core matrices can only be generated with the structures {0} (currently: {1})"
+                         .format(fx.MEMMAP_STRUCTURES, structure))
+    matrix_format = 'memmap' if out_of_core else 'dense'
     test_results = {f.__name__:[] for f in functions}
     for n in items_pro_dimension:
-        dense_matrix = mf.create_matrix(n, n, 0.01)
-        sparse_matrix = mf.create_matrix(n, n, 0.99)
+        dense_matrix = fx.get_matrix(n, n, 0.01, dtype=dtype, structure=structure, seed=seed,
+                                     matrix_format=matrix_format)
+        # another seed, otherwise the non zero entries of the sparse matrix are the zeros of the dense matrix
+        sparse_matrix = fx.get_matrix(n, n, 0.99, dtype=dtype, structure=structure, seed=seed + 1,
+                                      matrix_format=matrix_format)
         for func in functions:
-            test_results[func.__name__].append(bf.test_performance(func, number_of_timings, dense_matrix, sparse_matrix))
-            print(func.__name__, n)
+            result = bf.test_performance(func, number_of_timings, dense_matrix, sparse_matrix,
+                                         get_required_bytes(func, dense_matrix, sparse_matrix),
+                                         warm_up=func in mf.AUTOTUNED_FUNCTIONS)
+            test_results[func.__name__].append(result)
+            print(func.__name__, n, getattr(result, 'reason', ''))
     return test_results
 
 
+def get_required_bytes(func, dense_matrix, sparse_matrix):
+    """
+    Estimates the memory a function under test needs. numpy multiplies the dense operands in memory, the sparse
+    functions need the dense result and the sparse conversions of both operands. The "dense" operand has only 1%
+    zeros, so its conversion is larger than the operand itself.
+    Parameters
+    ----------
+    func - the function under test
+    dense_matrix - the dense matrix
+    sparse_matrix - the sparse matrix
+
+    Returns the estimated memory in bytes
+    -------
+
+    """
+    if func is mf.dot_numpy:
+        return bf.estimate_dense_baseline_bytes(dense_matrix, sparse_matrix)
+    return bf.estimate_dense_result_bytes(dense_matrix, sparse_matrix) + \
+        bf.estimate_sparse_conversion_bytes(dense_matrix) + bf.estimate_sparse_conversion_bytes(sparse_matrix)
+
+
+def create_dot_plan(dense_matrix, sparse_matrix, sparse_format='csr'):
+    """
+    Prepares a multiplication with the sparse matrix as static right operand.
+    Parameters
+    ----------
+    dense_matrix - not used, part of the signature of the functions under test
+    sparse_matrix - the static operand
+    sparse_format - the sparse format of the plan
+
+    Returns a matrix_funcs.SparseDotPlan
+    -------
+
+    """
+    return mf.SparseDotPlan(sparse_matrix, sparse_format)
+
+
+def multiply_with_plan(plan, dense_matrix):
+    """
+    Multiplies the dense matrix with the static operand of a plan.
+    Parameters
+    ----------
+    plan - a matrix_funcs.SparseDotPlan
+    dense_matrix - the changing operand
+
+    Returns a numpy-array which results from the dot product
+    -------
+
+    """
+    return plan.multiply(dense_matrix)
+
+
+def create_plan_aliases(sparse_formats):
+    """
+    Creates aliases to the result keys of the plan test in order to display them in the plots.
+    Returns a dictionary with the result keys as keys and aliases as values.
+    -------
+
+    """
+    names = {'csr': 'Compressed Sparse Row', 'csc': 'Compressed Sparse Column', 'bsr': 'Block Sparse Row'}
+    aliases = {}
+    for sparse_format in sparse_formats:
+        aliases[sparse_format + '_conversion'] = names[sparse_format] + ': Konvertierung'
+        aliases[sparse_format + '_multiply'] = names[sparse_format] + ': Multiplikation'
+    return aliases
+
+
+def run_plan_performance_test(items_pro_dimension, number_of_timings, sparse_formats, seed=fx.DEFAULT_SEED,
+                              structure='uniform'):
+    """
+    Runs the benchmark of the prepared multiplication and measures the conversion of the static operand and the
+    multiplication separately.
+    Parameters
+    ----------
+    items_pro_dimension - number of items in each matrix dimension
+    number_of_timings  - number of repeats for each timing
+    sparse_formats - the sparse formats under test
+    seed - seed for the generated matrices
+    structure - the sparsity structure of the generated matrices
+
+    Returns a dictionary with the avg. results and std. for the conversion and the multiplication of each format
+    -------
+
+    """
+    test_results = {}
+    for sparse_format in sparse_formats:
+        test_results[sparse_format + '_conversion'] = []
+        test_results[sparse_format + '_multiply'] = []
+    for n in items_pro_dimension:
+        dense_matrix = fx.get_matrix(n, n, 0.01, structure=structure, seed=seed)
+        sparse_matrix = fx.get_matrix(n, n, 0.99, structure=structure, seed=seed + 1)
+        for sparse_format in sparse_formats:
+            test_results[sparse_format + '_conversion'].append(
+                bf.test_performance(create_dot_plan, number_of_timings, dense_matrix, sparse_matrix,
+                                    sparse_format=sparse_format))
+            plan = create_dot_plan(dense_matrix, sparse_matrix, sparse_format)
+            test_results[sparse_format + '_multiply'].append(
+                bf.test_performance(multiply_with_plan, number_of_timings, plan, dense_matrix))
+            print(sparse_format, n)
+    return test_results
+
+
+def create_output_aliases(functions_labels, functions, outputs):
+    """
+    Creates aliases to the result keys of the output test in order to display them in the plots.
+    Parameters
+    ----------
+    functions_labels - a dictionary with the function names as keys and aliases as values
+    functions - the functions under test
+    outputs - the output formats under test
+
+    Returns a dictionary with the result keys as keys and aliases as values.
+    -------
+
+    """
+    return {'{0}_{1}'.format(func.__name__, output): '{0} ({1})'.format(functions_labels[func.__name__], output)
+            for func in functions for output in outputs}
+
+
+def run_output_performance_test(items_pro_dimension, number_of_timings, functions, outputs,
+                                percent_zeros_1=0.99, percent_zeros_2=0.99, seed=fx.DEFAULT_SEED, structure='uniform'):
+    """
+    Runs the benchmark of the output formats and records the time and the memory of the result.
+    Parameters
+    ----------
+    items_pro_dimension - number of items in each matrix dimension
+    number_of_timings  - number of repeats for each timing
+    functions - the functions under test, they must accept the keyword argument 'output'
+    outputs - the output formats under test (see matrix_funcs.format_result)
+    percent_zeros_1 - percentage of zeros in the first matrix
+    percent_zeros_2 - percentage of zeros in the second matrix
+    seed - seed for the generated matrices
+    structure - the sparsity structure of the generated matrices
+
+    Returns two dictionaries with the keys '<function name>_<output>': the avg. results and std., and the size of
+    the result in bytes
+    -------
+
+    """
+    keys = ['{0}_{1}'.format(func.__name__, output) for func in functions for output in outputs]
+    test_results = {key: [] for key in keys}
+    result_memory = {key: [] for key in keys}
+    for n in items_pro_dimension:
+        matrix_1 = fx.get_matrix(n, n, percent_zeros_1, structure=structure, seed=seed)
+        matrix_2 = fx.get_matrix(n, n, percent_zeros_2, structure=structure, seed=seed + 1)
+        for func in functions:
+            for output in outputs:
+                key = '{0}_{1}'.format(func.__name__, output)
+                test_results[key].append(bf.test_performance(func, number_of_timings, matrix_1, matrix_2,
+                                                             warm_up=func in mf.AUTOTUNED_FUNCTIONS, output=output))
+                result_memory[key].append(bf.measure_result_bytes(func, matrix_1, matrix_2, output=output))
+                print(key, n)
+    return test_results, result_memory
+
+
 def get_timings_from_results(results):
     """
     Scraps the timings from the results dictionary
@@ -66,7 +248,7 @@ def get_functions_under_test():
 
     """
     return [mf.dot_numpy,  mf.dot_scipy_csc_with_conversion,
-             mf.dot_scipy_bsr_with_conversion, mf.dot_scipy_csr_with_conversion]
+             mf.dot_scipy_bsr_with_conversion, mf.dot_scipy_csr_with_conversion, bp.dot_bitpacked]
 
 
 
@@ -78,7 +260,8 @@ def create_functions_aliases():
 
     """
     return  {'dot_numpy': 'Numpy (Referenz)', 'dot_scipy_csc_with_conversion': 'Compressed Sparse Column',
-         'dot_scipy_bsr_with_conversion': 'Block Sparse Row', 'dot_scipy_csr_with_conversion':'Compressed Sparse Row'}
+         'dot_scipy_bsr_with_conversion': 'Block Sparse Row', 'dot_scipy_csr_with_conversion':'Compressed Sparse Row',
+         'dot_bitpacked': 'Bitgepackt (AND + Popcount)'}
 
 
 
@@ -162,7 +345,8 @@ def persist_plots(items_pro_matrix_dimension, results_directory, *argv: PlotData
 
 def rank_functions_by_performance(timings):
     """
-    Creates a list of the functions ranked by their timing (slowest first).
+    Creates a list of the functions ranked by their timing (slowest first). Functions which were skipped at the
+    largest matrix size (nan timing) are ranked last.
     Parameters
     ----------
     timings - the avg. timing of each function
@@ -171,8 +355,10 @@ def rank_functions_by_performance(timings):
     -------
 
     """
-    functions_ranked_by_time = sorted([(time[1][-1], time[0]) for time in timings.items()], reverse=True)
-    return functions_ranked_by_time
+    ranked = [(time[1][-1], time[0]) for time in timings.items()]
+    measured = sorted([entry for entry in ranked if not np.isnan(entry[0])], reverse=True)
+    skipped = sorted([entry for entry in ranked if np.isnan(entry[0])], key=lambda entry: entry[1])
+    return measured + skipped
 
 
 def backup_results(results_path, results, file_name):
@@ -190,22 +376,64 @@ def backup_results(results_path, results, file_name):
 
 if __name__ == '__main__':
     benchmark_timestamp = df.get_date()
-    results_path = RESULTS_DIRECTORY + BENCHMARK_DIRECTORY + benchmark_timestamp + "/"
     functions_under_test = get_functions_under_test()
     items_pro_dimension = [1000, 2000, 3000, 4000, 5000]
     number_of_timings_pro_function_and_matrix_dimension = 5
-
-    results = run_performance_test(items_pro_dimension, number_of_timings_pro_function_and_matrix_dimension,
-                                   functions_under_test)
-    backup_results(results_path, results, 'dense_dot_sparse')
-
-    timings = get_timings_from_results(results)
-    functions_ranked_by_time = rank_functions_by_performance(timings)
-    functions_labels = create_functions_aliases()
-    table_data = tf.TableData(functions_labels, items_pro_dimension, functions_ranked_by_time, results, timings)
-
-    ranked_times = [ranked_label for time, ranked_label in functions_ranked_by_time]
-    plot__data = PlotData(FILENAME, functions_labels, results, ranked_times, PLOT_X_LABEL, PLOT_Y_LABEL)
-    persist_plots(items_pro_dimension, results_path, plot__data)
-    results_table = create_summery_table(table_data)
-    persist_summery_table(number_of_timings_pro_function_and_matrix_dimension, results_path, results_table, TEST_NAME)
+    out_of_core = False  # set to True for sizes beyond the main memory, e.g. [10000, 20000, 50000]
+    structures = fx.MEMMAP_STRUCTURES if out_of_core else list(mf.MATRIX_STRUCTURES)
+
+    for structure in structures:
+        results_path = RESULTS_DIRECTORY + BENCHMARK_DIRECTORY + benchmark_timestamp + "/" + structure + "/"
+        results = run_performance_test(items_pro_dimension, number_of_timings_pro_function_and_matrix_dimension,
+                                       functions_under_test, structure=structure, out_of_core=out_of_core)
+        backup_results(results_path, results, 'dense_dot_sparse')
+
+        timings = get_timings_from_results(results)
+        functions_ranked_by_time = rank_functions_by_performance(timings)
+        functions_labels = create_functions_aliases()
+        table_data = tf.TableData(functions_labels, items_pro_dimension, functions_ranked_by_time, results, timings)
+
+        ranked_times = [ranked_label for time, ranked_label in functions_ranked_by_time]
+        plot__data = PlotData(FILENAME, functions_labels, results, ranked_times, PLOT_X_LABEL, PLOT_Y_LABEL)
+        persist_plots(items_pro_dimension, results_path, plot__data)
+        results_table = create_summery_table(table_data)
+        persist_summery_table(number_of_timings_pro_function_and_matrix_dimension, results_path, results_table,
+                              TEST_NAME)
+
+        sparse_formats = ['csr', 'csc', 'bsr']
+        plan_results = run_plan_performance_test(items_pro_dimension,
+                                                 number_of_timings_pro_function_and_matrix_dimension, sparse_formats,
+                                                 structure=structure)
+        plan_path = results_path + "plan/"
+        backup_results(plan_path, plan_results, PLAN_FILENAME)
+        plan_timings = get_timings_from_results(plan_results)
+        plan_ranked_by_time = rank_functions_by_performance(plan_timings)
+        plan_labels = create_plan_aliases(sparse_formats)
+        plan_table_data = tf.TableData(plan_labels, items_pro_dimension, plan_ranked_by_time, plan_results,
+                                       plan_timings)
+        plan_plot_data = generate_reduced_plot_data(plan_labels, plan_results, plan_ranked_by_time, PLOT_X_LABEL,
+                                                    PLOT_Y_LABEL, PLAN_TEST_NAME)
+        persist_plots(items_pro_dimension, plan_path, plan_plot_data)
+        persist_summery_table(number_of_timings_pro_function_and_matrix_dimension, plan_path,
+                              create_summery_table(plan_table_data), PLAN_TEST_NAME)
+
+        outputs = ['dense', 'csr', 'auto']
+        sparse_functions = [mf.dot_scipy_csc_with_conversion, mf.dot_scipy_bsr_with_conversion,
+                            mf.dot_scipy_csr_with_conversion]
+        output_results, result_memory = run_output_performance_test(
+            items_pro_dimension, number_of_timings_pro_function_and_matrix_dimension, sparse_functions, outputs,
+            structure=structure)
+        output_path = results_path + "output/"
+        backup_results(output_path, {'results': output_results, 'result_memory': result_memory}, OUTPUT_FILENAME)
+        output_timings = get_timings_from_results(output_results)
+        output_ranked_by_time = rank_functions_by_performance(output_timings)
+        output_labels = create_output_aliases(functions_labels, sparse_functions, outputs)
+        output_table_data = tf.TableData(output_labels, items_pro_dimension, output_ranked_by_time, output_results,
+                                         output_timings)
+        output_plot_data = generate_reduced_plot_data(output_labels, output_results, output_ranked_by_time,
+                                                      PLOT_X_LABEL, PLOT_Y_LABEL, OUTPUT_TEST_NAME)
+        persist_plots(items_pro_dimension, output_path, output_plot_data)
+        output_table = create_summery_table(output_table_data)
+        output_table += tf.create_memory_table(output_labels, items_pro_dimension, result_memory, tf.RESULT_MEMORY)
+        persist_summery_table(number_of_timings_pro_function_and_matrix_dimension, output_path, output_table,
+                              OUTPUT_TEST_NAME)
@@ -0,0 +1,110 @@
+import numpy as np
+import benchmark_funcs as bf
+import matrix_funcs as mf
+import fixture_funcs as fx
+import date_funcs as df
+import table_funcs as tf
+import benchmarks.dense_dot_sparse_benchmark as dds
+from data_containers.plot_data import PlotData
+
+TABLE_HEADLINE = "Ergebnisse des 6. Benchmarks"
+
+RESULTS_DIRECTORY = "results/"
+
+BENCHMARK_DIRECTORY = "06_DtypeBenchmark/"
+
+FILENAME = "dtype_benchmark_results"
+
+TEST_NAME = 'Matrixmultiplikation: Datentyp {0}'
+
+PLOT_Y_LABEL = 'Durchschnittliche Rechenzeit [Sek]'
+
+PLOT_X_LABEL = 'Matrixgröße $N \\times N$'
+
+DTYPES = [np.bool_, np.int8, np.float32, np.float64, np.int64]
+
+
+def get_functions_under_test():
+    """
+    Returns a list with all functions under test.
+    -------
+
+    """
+    return [mf.dot_numpy, mf.dot_scipy_csc_with_conversion, mf.dot_scipy_csr_with_conversion,
+            mf.scipy_csr_dot_numpy_with_swap]
+
+
+def create_functions_aliases():
+    """
+    Creates aliases to the function names in order to display them in the plots.
+    Returns a dictionary with the function names as keys and aliases as values.
+    -------
+
+    """
+    return {'dot_numpy': 'Numpy (Referenz)', 'dot_scipy_csc_with_conversion': 'Compressed Sparse Column',
+            'dot_scipy_csr_with_conversion': 'Compressed Sparse Row',
+            'scipy_csr_dot_numpy_with_swap': 'Compressed Sparse Row x Numpy'}
+
+
+def run_performance_test(items_pro_dimension, number_of_timings, functions, dtypes, seed=fx.DEFAULT_SEED):
+    """
+    Runs the benchmark for every data type.
+    Parameters
+    ----------
+    items_pro_dimension - number of items in each matrix dimension
+    number_of_timings - number of repeats for each timing
+    functions - the functions under test
+    dtypes - the data types under test
+    seed - seed for the generated matrices
+
+    Returns two dictionaries with the data type names as keys: the avg. results and std. for each function, and the
+    bytes moved (operands and result) by each function.
+    -------
+
+    """
+    results = {}
+    bytes_moved = {}
+    for dtype in dtypes:
+        dtype_name = np.dtype(dtype).name
+        results[dtype_name] = {f.__name__: [] for f in functions}
+        bytes_moved[dtype_name] = {f.__name__: [] for f in functions}
+        for n in items_pro_dimension:
+            dense_matrix = fx.get_matrix(n, n, 0.01, dtype=dtype, seed=seed)
+            sparse_matrix = fx.get_matrix(n, n, 0.99, dtype=dtype, seed=seed + 1)
+            for func in functions:
+                results[dtype_name][func.__name__].append(
+                    bf.test_performance(func, number_of_timings, dense_matrix, sparse_matrix))
+                bytes_moved[dtype_name][func.__name__].append(bf.measure_bytes_moved(func, dense_matrix,
+                                                                                     sparse_matrix))
+                print(dtype_name, func.__name__, n)
+    return results, bytes_moved
+
+
+if __name__ == '__main__':
+    benchmark_timestamp = df.get_date()
+    results_path = RESULTS_DIRECTORY + BENCHMARK_DIRECTORY + benchmark_timestamp + "/"
+    functions_under_test = get_functions_under_test()
+    items_pro_dimension = [500, 1000, 2000, 3000]
+    number_of_timings_pro_function_and_matrix_dimension = 5
+
+    results, bytes_moved = run_performance_test(items_pro_dimension,
+                                                number_of_timings_pro_function_and_matrix_dimension,
+                                                functions_under_test, DTYPES)
+    dds.backup_results(results_path, {'results': results, 'bytes_moved': bytes_moved}, FILENAME)
+    functions_labels = create_functions_aliases()
+
+    for dtype_name in results:
+        timings = dds.get_timings_from_results(results[dtype_name])
+        functions_ranked_by_time = dds.rank_functions_by_performance(timings)
+        table_data = tf.TableData(functions_labels, items_pro_dimension, functions_ranked_by_time,
+                                  results[dtype_name], timings)
+
+        ranked_times = [ranked_label for time, ranked_label in functions_ranked_by_time]
+        plot__data = PlotData(TEST_NAME.format(dtype_name), functions_labels, results[dtype_name], ranked_times,
+                              PLOT_X_LABEL, PLOT_Y_LABEL)
+        dds.persist_plots(items_pro_dimension, results_path, plot__data)
+        results_table = dds.create_summery_table(table_data)
+        results_table += tf.create_bytes_moved_table(functions_labels, items_pro_dimension, bytes_moved[dtype_name],
+                                                     timings)
+        dds.persist_summery_table(number_of_timings_pro_function_and_matrix_dimension, results_path, results_table,
+                                  TABLE_HEADLINE + ": " + TEST_NAME.format(dtype_name))
@@ -0,0 +1,131 @@
+import numpy as np
+import benchmark_funcs as bf
+import matrix_funcs as mf
+import fixture_funcs as fx
+import date_funcs as df
+import table_funcs as tf
+import top_n_funcs as tnf
+from scipy import sparse
+import benchmarks.dense_dot_sparse_benchmark as dds
+from data_containers.plot_data import PlotData
+
+TABLE_HEADLINE = "Ergebnisse des 7. Benchmarks"
+
+RESULTS_DIRECTORY = "results/"
+
+BENCHMARK_DIRECTORY = "07_FusedTopKBenchmark/"
+
+FILENAME = "fused_top_k_benchmark_results"
+
+TEST_NAME = 'Matrixmultiplikation mit Top-K: fusioniert vs. multiplizieren und ausdünnen'
+
+PLOT_Y_LABEL = 'Durchschnittliche Rechenzeit [Sek]'
+
+PLOT_X_LABEL = 'Matrixgröße $N \\times N$'
+
+TOP_K = 20
+
+
+def numpy_dot_then_top_k(dense_matrix, sparse_matrix):
+    """
+    Reference: calculates the full dense product with numpy and prunes it to the top k items of every row.
+    Returns a SciPy CSR matrix
+    -------
+
+    """
+    return tnf.top_n_to_csr(mf.dot_numpy(dense_matrix, sparse_matrix), TOP_K)
+
+
+def csr_dot_then_top_k(dense_matrix, sparse_matrix):
+    """
+    Converts the second matrix to CSR, calculates the full product and prunes it to the top k items of every row.
+    Returns a SciPy CSR matrix
+    -------
+
+    """
+    return tnf.top_n_to_csr(dense_matrix @ sparse.csr_matrix(sparse_matrix), TOP_K)
+
+
+def fused_dot_with_top_k(dense_matrix, sparse_matrix):
+    """
+    Converts the second matrix to CSR and calculates the top k items of every row of the product tile by tile
+    with matrix_funcs.dot_with_top_k.
+    Returns a SciPy CSR matrix
+    -------
+
+    """
+    return mf.dot_with_top_k(dense_matrix, sparse.csr_matrix(sparse_matrix), TOP_K)
+
+
+def get_functions_under_test():
+    """
+    Returns a list with all functions under test.
+    -------
+
+    """
+    return [numpy_dot_then_top_k, csr_dot_then_top_k, fused_dot_with_top_k]
+
+
+def create_functions_aliases():
+    """
+    Creates aliases to the function names in order to display them in the plots.
+    Returns a dictionary with the function names as keys and aliases as values.
+    -------
+
+    """
+    return {'numpy_dot_then_top_k': 'Numpy, dann Top-K (Referenz)',
+            'csr_dot_then_top_k': 'Numpy x Compressed Sparse Row, dann Top-K',
+            'fused_dot_with_top_k': 'Fusioniert (kachelweise Top-K)'}
+
+
+def run_performance_test(items_pro_dimension, number_of_timings, functions, seed=fx.DEFAULT_SEED):
+    """
+    Runs the benchmark.
+    Parameters
+    ----------
+    items_pro_dimension - number of items in each matrix dimension
+    number_of_timings - number of repeats for each timing
+    functions - the functions under test
+    seed - seed for the generated matrices
+
+    Returns two dictionaries: the avg. results and std. for each function, and the peak memory of each function.
+    -------
+
+    """
+    test_results = {f.__name__: [] for f in functions}
+    peak_memory = {f.__name__: [] for f in functions}
+    for n in items_pro_dimension:
+        dense_matrix = fx.get_matrix(n, n, 0.01, dtype=np.float64, seed=seed)
+        sparse_matrix = fx.get_matrix(n, n, 0.99, dtype=np.float64, seed=seed + 1)
+        for func in functions:
+            test_results[func.__name__].append(bf.test_performance(func, number_of_timings, dense_matrix,
+                                                                   sparse_matrix))
+            peak_memory[func.__name__].append(bf.measure_peak_memory(func, dense_matrix, sparse_matrix))
+            print(func.__name__, n)
+    return test_results, peak_memory
+
+
+if __name__ == '__main__':
+    benchmark_timestamp = df.get_date()
+    results_path = RESULTS_DIRECTORY + BENCHMARK_DIRECTORY + benchmark_timestamp + "/"
+    functions_under_test = get_functions_under_test()
+    items_pro_dimension = [1000, 2000, 4000, 8000]
+    number_of_timings_pro_function_and_matrix_dimension = 5
+
+    results, peak_memory = run_performance_test(items_pro_dimension,
+                                                number_of_timings_pro_function_and_matrix_dimension,
+                                                functions_under_test)
+    dds.backup_results(results_path, {'results': results, 'peak_memory': peak_memory}, FILENAME)
+
+    timings = dds.get_timings_from_results(results)
+    functions_ranked_by_time = dds.rank_functions_by_performance(timings)
+    functions_labels = create_functions_aliases()
+    table_data = tf.TableData(functions_labels, items_pro_dimension, functions_ranked_by_time, results, timings)
+
+    ranked_times = [ranked_label for time, ranked_label in functions_ranked_by_time]
+    plot__data = PlotData(TEST_NAME, functions_labels, results, ranked_times, PLOT_X_LABEL, PLOT_Y_LABEL)
+    dds.persist_plots(items_pro_dimension, results_path, plot__data)
+    results_table = dds.create_summery_table(table_data)
+    results_table += tf.create_memory_table(functions_labels, items_pro_dimension, peak_memory)
+    dds.persist_summery_table(number_of_timings_pro_function_and_matrix_dimension, results_path, results_table,
+                              TABLE_HEADLINE)
@@ -0,0 +1,125 @@
+import numpy as np
+import benchmark_funcs as bf
+import matrix_funcs as mf
+import incremental_funcs as inc
+import fixture_funcs as fx
+import date_funcs as df
+import table_funcs as tf
+import plotting_funcs as pf
+import benchmarks.dense_dot_sparse_benchmark as dds
+from data_containers.plot_data import PlotData
+
+TABLE_HEADLINE = "Ergebnisse des 13. Benchmarks (n = Anteil der geänderten Zeilen bzw. Spalten)"
+
+RESULTS_DIRECTORY = "results/"
+
+BENCHMARK_DIRECTORY = "13_IncrementalBenchmark/"
+
+FILENAME = "incremental_benchmark_results"
+
+TEST_NAME = 'Inkrementelle Aktualisierung vs. vollständige Neuberechnung'
+
+PLOT_Y_LABEL = 'Durchschnittliche Rechenzeit [Sek]'
+
+PLOT_X_LABEL = 'Anteil der geänderten Zeilen bzw. Spalten'
+
+
+def create_functions_aliases():
+    """
+    Creates aliases to the function names in order to display them in the plots.
+    Returns a dictionary with the function names as keys and aliases as values.
+    -------
+
+    """
+    return {'dot_scipy_csr_with_conversion': 'Vollständig: Compressed Sparse Row x Compressed Sparse Row',
+            'update_rows': 'Inkrementell: geänderte Zeilen der ersten Matrix',
+            'update_columns': 'Inkrementell: geänderte Spalten der zweiten Matrix'}
+
+
+def update_rows(product, update):
+    """
+    Applies a row update to an incremental product.
+    Parameters
+    ----------
+    product - an IncrementalProduct
+    update - a tuple (rows, new_rows)
+
+    Returns the updated product
+    -------
+
+    """
+    return product.update_rows(*update)
+
+
+def update_columns(product, update):
+    """
+    Applies a column update to an incremental product.
+    Parameters
+    ----------
+    product - an IncrementalProduct
+    update - a tuple (cols, new_columns)
+
+    Returns the updated product
+    -------
+
+    """
+    return product.update_columns(*update)
+
+
+def run_performance_test(changed_shares, n, number_of_timings, percent_zeros=0.99, seed=fx.DEFAULT_SEED):
+    """
+    Runs the benchmark. The full recomputation multiplies the updated first matrix with the second matrix.
+    Parameters
+    ----------
+    changed_shares - the shares of changed rows or columns, between 0 and 1
+    n - number of items in each matrix dimension
+    number_of_timings - number of repeats for each timing
+    percent_zeros - percentage of zeros in the matrices
+    seed - seed for the generated matrices
+
+    Returns a dictionary with the avg. results and std. for each function
+    -------
+
+    """
+    test_results = {name: [] for name in create_functions_aliases()}
+    matrix_1 = fx.get_matrix(n, n, percent_zeros, dtype=np.float64, seed=seed)
+    matrix_2 = fx.get_matrix(n, n, percent_zeros, dtype=np.float64, seed=seed + 1)
+    product = inc.IncrementalProduct(matrix_1, matrix_2)
+    random_generator = np.random.default_rng(seed)
+    for changed_share in changed_shares:
+        count = max(1, int(round(changed_share * n)))
+        indices = np.sort(random_generator.choice(n, count, replace=False))
+        new_rows = fx.get_matrix(count, n, percent_zeros, dtype=np.float64, seed=seed + 2)
+        updated_matrix_1 = np.array(matrix_1)
+        updated_matrix_1[indices] = new_rows
+        test_results['dot_scipy_csr_with_conversion'].append(
+            bf.test_performance(mf.dot_scipy_csr_with_conversion, number_of_timings, updated_matrix_1, matrix_2))
+        test_results['update_rows'].append(
+            bf.test_performance(update_rows, number_of_timings, product, (indices, new_rows)))
+        test_results['update_columns'].append(
+            bf.test_performance(update_columns, number_of_timings, product, (indices, new_rows.T)))
+        print(changed_share)
+    return test_results
+
+
+if __name__ == '__main__':
+    benchmark_timestamp = df.get_date()
+    results_path = RESULTS_DIRECTORY + BENCHMARK_DIRECTORY + benchmark_timestamp + "/"
+    changed_shares = [0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0]
+    n = 4000
+    number_of_timings = 5
+
+    results = run_performance_test(changed_shares, n, number_of_timings)
+    dds.backup_results(results_path, results, FILENAME)
+
+    timings = dds.get_timings_from_results(results)
+    functions_ranked_by_time = dds.rank_functions_by_performance(timings)
+    functions_labels = create_functions_aliases()
+    table_data = tf.TableData(functions_labels, changed_shares, functions_ranked_by_time, results, timings)
+
+    ranked_times = [ranked_label for time, ranked_label in functions_ranked_by_time]
+    plot_title = TEST_NAME + ', N={0}'.format(n)
+    pf.plot_timing_over(PlotData(plot_title, functions_labels, results, ranked_times, PLOT_X_LABEL,
+                                 PLOT_Y_LABEL), changed_shares, results_path, log_x=True)
+    dds.persist_summery_table(number_of_timings, results_path, dds.create_summery_table(table_data),
+                              TABLE_HEADLINE)
@@ -0,0 +1,136 @@
+import numpy as np
+import benchmark_funcs as bf
+import chain_funcs as cf
+import fixture_funcs as fx
+import date_funcs as df
+import io_funcs as io
+import table_funcs as tf
+import plotting_funcs as pf
+import benchmarks.dense_dot_sparse_benchmark as dds
+from data_containers.plot_data import PlotData
+
+TABLE_HEADLINE = "Ergebnisse des 11. Benchmarks (n = Anzahl der Matrizen in der Kette)"
+
+RESULTS_DIRECTORY = "results/"
+
+BENCHMARK_DIRECTORY = "11_MatrixChainBenchmark/"
+
+FILENAME = "matrix_chain_benchmark_results"
+
+SUMMERY_TABLE_FILE = 'summery_table.txt'
+
+TEST_NAME = 'Matrixketten: von links nach rechts vs. geplante Reihenfolge'
+
+PLOT_Y_LABEL = 'Durchschnittliche Rechenzeit [Sek]'
+
+PLOT_X_LABEL = 'Anzahl der Matrizen in der Kette'
+
+CHAIN_PERCENT_ZEROS = [0.01, 0.99, 0.999]  # dense, sparse and very sparse links
+
+
+def create_functions_aliases():
+    """
+    Creates aliases to the function names in order to display them in the plots.
+    Returns a dictionary with the function names as keys and aliases as values.
+    -------
+
+    """
+    return {'multiply_chain_left_to_right': 'Von links nach rechts',
+            'multiply_chain': 'Geplant (inkl. Planung)',
+            'multiply_with_plan': 'Geplant (nur Ausführung)'}
+
+
+def get_chain(chain_length, n, seed=fx.DEFAULT_SEED):
+    """
+    Creates a matrix chain with random dimensions and densities. Matrices with 99% zeros or more are CSR matrices,
+    the others numpy arrays.
+    Parameters
+    ----------
+    chain_length - number of matrices in the chain
+    n - the largest matrix dimension
+    seed - seed for the chain layout and the generated matrices
+
+    Returns a list of matrices
+    -------
+
+    """
+    random_generator = np.random.default_rng(seed + chain_length)
+    dimensions = random_generator.choice([n // 16, n // 4, n], size=chain_length + 1)
+    matrices = []
+    for i in range(chain_length):
+        percent_zeros = float(random_generator.choice(CHAIN_PERCENT_ZEROS))
+        matrix_format = 'csr' if percent_zeros >= 0.99 else 'dense'
+        matrices.append(fx.get_matrix(int(dimensions[i]), int(dimensions[i + 1]), percent_zeros, dtype=np.float64,
+                                      seed=seed + i, matrix_format=matrix_format))
+    return matrices
+
+
+def multiply_with_plan(plan, matrices):
+    """
+    Multiplies a matrix chain with a prepared plan.
+    Parameters
+    ----------
+    plan - a ChainPlan
+    matrices - the matrices of the chain
+
+    Returns the product
+    -------
+
+    """
+    return plan.multiply(matrices)
+
+
+def run_performance_test(chain_lengths, n, number_of_timings, seed=fx.DEFAULT_SEED):
+    """
+    Runs the benchmark. All functions return a dense result.
+    Parameters
+    ----------
+    chain_lengths - the numbers of matrices in the chains
+    n - the largest matrix dimension
+    number_of_timings - number of repeats for each timing
+    seed - seed for the generated chains
+
+    Returns a dictionary with the avg. results and std. for each function and a dictionary with the plan of each
+    chain length
+    -------
+
+    """
+    test_results = {name: [] for name in create_functions_aliases()}
+    plans = {}
+    for chain_length in chain_lengths:
+        matrices = get_chain(chain_length, n, seed)
+        plan = cf.ChainPlan(matrices)
+        plans[chain_length] = plan.describe()
+        test_results['multiply_chain_left_to_right'].append(
+            bf.test_performance(cf.multiply_chain_left_to_right, number_of_timings, matrices, 'dense'))
+        test_results['multiply_chain'].append(
+            bf.test_performance(cf.multiply_chain, number_of_timings, matrices, 'dense'))
+        test_results['multiply_with_plan'].append(
+            bf.test_performance(multiply_with_plan, number_of_timings, plan, matrices))
+        print(chain_length, plans[chain_length])
+    return test_results, plans
+
+
+if __name__ == '__main__':
+    benchmark_timestamp = df.get_date()
+    results_path = RESULTS_DIRECTORY + BENCHMARK_DIRECTORY + benchmark_timestamp + "/"
+    chain_lengths = [3, 4, 5, 6]
+    n = 4000
+    number_of_timings = 5
+
+    results, plans = run_performance_test(chain_lengths, n, number_of_timings)
+    dds.backup_results(results_path, {'results': results, 'plans': plans}, FILENAME)
+
+    timings = dds.get_timings_from_results(results)
+    functions_ranked_by_time = dds.rank_functions_by_performance(timings)
+    functions_labels = create_functions_aliases()
+    table_data = tf.TableData(functions_labels, chain_lengths, functions_ranked_by_time, results, timings)
+
+    ranked_times = [ranked_label for time, ranked_label in functions_ranked_by_time]
+    pf.plot_timing_over(PlotData(TEST_NAME, functions_labels, results, ranked_times, PLOT_X_LABEL,
+                                 PLOT_Y_LABEL), chain_lengths, results_path)
+    dds.persist_summery_table(number_of_timings, results_path, dds.create_summery_table(table_data),
+                              TABLE_HEADLINE)
+    for chain_length in chain_lengths:
+        io.persist_to_text_file('Kette mit {0} Matrizen: {1}\n'.format(chain_length, plans[chain_length]),
+                                results_path, SUMMERY_TABLE_FILE)
@@ -1,8 +1,12 @@
 import matrix_funcs as mf
 import date_funcs as df
+import io_funcs as io
 import table_funcs as tf
+import benchmark_funcs as bf
+import fixture_funcs as fx
 import benchmarks.dense_dot_sparse_benchmark as dds
 import numpy as np
+from scipy import sparse
 from data_containers.plot_data import PlotData
 
 FILENAME = "matrix_swap_benchmark_results"
@@ -19,6 +23,16 @@ PLOT_Y_LABEL = 'Durchschnittliche Rechenzeit [Sek]'
 
 PLOT_X_LABEL = 'Matrixgröße $N \\times N$'
 
+SCALING_FILENAME = "matrix_swap_benchmark_scaling_results"
+
+SCALING_TEST_NAME = 'Gekachelte Matrixmultiplikation: Skalierung über Threads'
+
+MEMORY_FILENAME = "matrix_swap_benchmark_memory_results"
+
+SUMMERY_TABLE_FILE = 'summery_table.txt'
+
+MEMORY_TABLE_HEADLINE = "Speicherbedarf pro Aufruf: Vertauschung mit und ohne kopierte Transponierte\n"
+
 
 def get_functions_under_test():
     """
@@ -26,7 +40,7 @@ def get_functions_under_test():
     -------
     """
     return [mf.dot_numpy,  mf.scipy_csc_dot_numpy_with_swap, mf.scipy_csr_dot_numpy_with_swap,
-            mf.scipy_bsr_dot_numpy_with_swap ]
+            mf.scipy_bsr_dot_numpy_with_swap, mf.scipy_csr_dot_numpy_tiled]
 
 
 def create_functions_aliases():
@@ -38,27 +52,165 @@ def create_functions_aliases():
     """
     return  {'dot_numpy':'Numpy x Numpy (Referenz)', 'scipy_csc_dot_numpy_with_swap':'Compressed Sparse Column x Numpy',
              'scipy_csr_dot_numpy_with_swap':'Compressed Sparse Row x Numpy',
-             'scipy_bsr_dot_numpy_with_swap':'Block Sparse Row x Numpy'}
+             'scipy_bsr_dot_numpy_with_swap':'Block Sparse Row x Numpy',
+             'scipy_csr_dot_numpy_tiled': 'Compressed Sparse Row x Numpy (gekachelt, alle Threads)'}
+
+
+def scipy_csc_dot_numpy_with_copying_swap(matrix_dense, matrix_sparse):
+    """
+    The CSC swap as it was before the tiled path: both whole transposes are copied (reference for the memory test).
+    Parameters
+    ----------
+    matrix_dense - the dense numpy matrix
+    matrix_sparse - the sparse numpy matrix
+
+    Returns a numpy array, which is the result of the matrix multiplication.
+    -------
+
+    """
+    return sparse.csc_matrix(matrix_sparse.T).dot(matrix_dense.T).T
+
+
+def scipy_csr_dot_numpy_with_copying_swap(dense_matrix, sparse_matrix):
+    """
+    The CSR swap as it was before the tiled path: both whole transposes are copied (reference for the memory test).
+    Parameters
+    ----------
+    dense_matrix - the dense numpy matrix
+    sparse_matrix - the sparse numpy matrix
+
+    Returns a numpy array, which is the result of the matrix multiplication.
+    -------
+
+    """
+    return sparse.csr_matrix(sparse_matrix.T).dot(dense_matrix.T).T
+
+
+def create_memory_aliases():
+    """
+    Creates aliases to the function names of the memory test in order to display them in the tables.
+    Returns a dictionary with the function names as keys and aliases as values.
+    -------
+
+    """
+    return {'scipy_csc_dot_numpy_with_copying_swap': 'Compressed Sparse Column x Numpy (vorher, ganze Kopie)',
+            'scipy_csc_dot_numpy_with_swap': 'Compressed Sparse Column x Numpy (nachher, gekachelte Kopien)',
+            'scipy_csr_dot_numpy_with_copying_swap': 'Compressed Sparse Row x Numpy (vorher, ganze Kopie)',
+            'scipy_csr_dot_numpy_with_swap': 'Compressed Sparse Row x Numpy (nachher, gekachelte Kopien)',
+            'scipy_bsr_dot_numpy_with_swap': 'Block Sparse Row x Numpy (nachher, gekachelte Kopien)'}
+
+
+def run_memory_test(items_pro_dimension, seed=fx.DEFAULT_SEED, structure='uniform'):
+    """
+    Measures the bytes each swap function allocates pro call (peak of tracemalloc), before and after the tiled
+    transpose path. For the C-ordered matrices of the benchmark the new path still copies the dense matrix, but
+    one tile at a time. The result of the call itself is included.
+    Parameters
+    ----------
+    items_pro_dimension - number of items in each matrix dimension
+    seed - seed for the generated matrices
+    structure - the sparsity structure of the generated matrices
+
+    Returns a dictionary with the function names as keys and a list of bytes (one pro matrix size) as values
+    -------
+
+    """
+    functions = [scipy_csc_dot_numpy_with_copying_swap, mf.scipy_csc_dot_numpy_with_swap,
+                 scipy_csr_dot_numpy_with_copying_swap, mf.scipy_csr_dot_numpy_with_swap,
+                 mf.scipy_bsr_dot_numpy_with_swap]
+    peak_memory = {func.__name__: [] for func in functions}
+    for n in items_pro_dimension:
+        dense_matrix = fx.get_matrix(n, n, 0.01, structure=structure, seed=seed)
+        sparse_matrix = fx.get_matrix(n, n, 0.99, structure=structure, seed=seed + 1)
+        for func in functions:
+            peak_memory[func.__name__].append(bf.measure_peak_memory(func, dense_matrix, sparse_matrix))
+            print(func.__name__, n)
+    return peak_memory
+
+
+def create_scaling_aliases(worker_counts):
+    """
+    Creates aliases to the result keys of the scaling test in order to display them in the plots.
+    Returns a dictionary with the result keys as keys and aliases as values.
+    -------
+
+    """
+    return {'workers_{0}'.format(workers): '{0} Thread(s)'.format(workers) for workers in worker_counts}
+
+
+def run_scaling_test(items_pro_dimension, number_of_timings, worker_counts, seed=fx.DEFAULT_SEED,
+                     structure='uniform'):
+    """
+    Runs the scaling benchmark of the tiled multiplication. Every number of threads is warmed up once, so the
+    thread pool is started outside of the timed region.
+    Parameters
+    ----------
+    items_pro_dimension - number of items in each matrix dimension
+    number_of_timings - number of repeats for each timing
+    worker_counts - the numbers of threads under test
+    seed - seed for the generated matrices
+    structure - the sparsity structure of the generated matrices
+
+    Returns a dictionary with the avg. results and std. for each number of threads
+    -------
+
+    """
+    test_results = {'workers_{0}'.format(workers): [] for workers in worker_counts}
+    for n in items_pro_dimension:
+        dense_matrix = fx.get_matrix(n, n, 0.01, structure=structure, seed=seed)
+        sparse_matrix = fx.get_matrix(n, n, 0.99, structure=structure, seed=seed + 1)
+        results = bf.test_performance_over_workers(mf.scipy_csr_dot_numpy_tiled, worker_counts, number_of_timings,
+                                                   dense_matrix, sparse_matrix, warm_up=True)
+        for workers, result in results.items():
+            test_results['workers_{0}'.format(workers)].append(result)
+            print('scipy_csr_dot_numpy_tiled', workers, n)
+    return test_results
 
 
 if __name__ == '__main__':
     benchmark_timestamp = df.get_date()
-    results_path = RESULTS_DIRECTORY + BENCHMARK_DIRECTORY + benchmark_timestamp + "/"
     functions_under_test = get_functions_under_test()
     items_pro_dimension = [500, 1000, 2000, 3000, 4000, 5000]
     number_of_timings_pro_function_and_matrix_dimension = 5
-
-    results = dds.run_performance_test(items_pro_dimension, number_of_timings_pro_function_and_matrix_dimension,
-                               functions_under_test)
-    dds.backup_results(results_path, results, FILENAME)
-
-    timings = dds.get_timings_from_results(results)
-    functions_ranked_by_time = dds.rank_functions_by_performance(timings)
-    functions_labels = create_functions_aliases()
-    table_data = tf.TableData(functions_labels, items_pro_dimension, functions_ranked_by_time, results, timings)
-
-    ranked_times = [ranked_label for time, ranked_label in functions_ranked_by_time]
-    plot__data = PlotData(TEST_NAME, functions_labels, results, ranked_times, PLOT_X_LABEL, PLOT_Y_LABEL)
-    dds.persist_plots(items_pro_dimension, results_path, plot__data)
-    results_table = dds.create_summery_table(table_data)
-    dds.persist_summery_table(number_of_timings_pro_function_and_matrix_dimension, results_path, results_table, TABLE_HEADLINE)
+    structures = list(mf.MATRIX_STRUCTURES)
+
+    for structure in structures:
+        results_path = RESULTS_DIRECTORY + BENCHMARK_DIRECTORY + benchmark_timestamp + "/" + structure + "/"
+        results = dds.run_performance_test(items_pro_dimension, number_of_timings_pro_function_and_matrix_dimension,
+                                           functions_under_test, structure=structure)
+        dds.backup_results(results_path, results, FILENAME)
+
+        timings = dds.get_timings_from_results(results)
+        functions_ranked_by_time = dds.rank_functions_by_performance(timings)
+        functions_labels = create_functions_aliases()
+        table_data = tf.TableData(functions_labels, items_pro_dimension, functions_ranked_by_time, results, timings)
+
+        ranked_times = [ranked_label for time, ranked_label in functions_ranked_by_time]
+        plot__data = PlotData(TEST_NAME, functions_labels, results, ranked_times, PLOT_X_LABEL, PLOT_Y_LABEL)
+        dds.persist_plots(items_pro_dimension, results_path, plot__data)
+        results_table = dds.create_summery_table(table_data)
+        dds.persist_summery_table(number_of_timings_pro_function_and_matrix_dimension, results_path, results_table,
+                                  TABLE_HEADLINE)
+
+        worker_counts = bf.get_worker_counts()
+        scaling_results = run_scaling_test(items_pro_dimension, number_of_timings_pro_function_and_matrix_dimension,
+                                           worker_counts, structure=structure)
+        scaling_path = results_path + "scaling/"
+        dds.backup_results(scaling_path, scaling_results, SCALING_FILENAME)
+        scaling_timings = dds.get_timings_from_results(scaling_results)
+        scaling_ranked_by_time = dds.rank_functions_by_performance(scaling_timings)
+        scaling_labels = create_scaling_aliases(worker_counts)
+        scaling_table_data = tf.TableData(scaling_labels, items_pro_dimension, scaling_ranked_by_time, scaling_results,
+                                          scaling_timings)
+        scaling_plot_data = dds.generate_reduced_plot_data(scaling_labels, scaling_results, scaling_ranked_by_time,
+                                                           PLOT_X_LABEL, PLOT_Y_LABEL, SCALING_TEST_NAME)
+        dds.persist_plots(items_pro_dimension, scaling_path, scaling_plot_data)
+        dds.persist_summery_table(number_of_timings_pro_function_and_matrix_dimension, scaling_path,
+                                  dds.create_summery_table(scaling_table_data), SCALING_TEST_NAME)
+
+        peak_memory = run_memory_test(items_pro_dimension, structure=structure)
+        memory_path = results_path + "memory/"
+        dds.backup_results(memory_path, peak_memory, MEMORY_FILENAME)
+        io.persist_to_text_file(MEMORY_TABLE_HEADLINE + tf.create_memory_table(create_memory_aliases(),
+                                                                               items_pro_dimension, peak_memory),
+                                memory_path, SUMMERY_TABLE_FILE)
@@ -0,0 +1,119 @@
+import numpy as np
+from scipy import sparse
+import benchmark_funcs as bf
+import matrix_funcs as mf
+import shared_memory_funcs as smf
+import fixture_funcs as fx
+import date_funcs as df
+import table_funcs as tf
+import benchmarks.dense_dot_sparse_benchmark as dds
+from data_containers.plot_data import PlotData
+
+TABLE_HEADLINE = "Ergebnisse des 8. Benchmarks"
+
+RESULTS_DIRECTORY = "results/"
+
+BENCHMARK_DIRECTORY = "08_ProcessPoolBenchmark/"
+
+FILENAME = "process_pool_benchmark_results"
+
+TEST_NAME = 'Matrixmultiplikation: ein Thread vs. Threads vs. Prozesse mit Shared Memory'
+
+PLOT_Y_LABEL = 'Durchschnittliche Rechenzeit [Sek]'
+
+PLOT_X_LABEL = 'Matrixgröße $N \\times N$'
+
+
+def get_functions_under_test():
+    """
+    Returns a list with all functions under test.
+    -------
+    """
+    return [mf.scipy_csr_dot_numpy_with_swap, mf.scipy_csr_dot_numpy_tiled, smf.scipy_csr_dot_numpy_processes]
+
+
+def create_functions_aliases():
+    """
+    Creates aliases to the function names in order to display them in the plots.
+    Returns a dictionary with the function names as keys and aliases as values.
+    -------
+
+    """
+    return {'scipy_csr_dot_numpy_with_swap': 'Compressed Sparse Row x Numpy (ein Thread)',
+            'scipy_csr_dot_numpy_tiled': 'Compressed Sparse Row x Numpy (Threads)',
+            'scipy_csr_dot_numpy_processes': 'Compressed Sparse Row x Numpy (Prozesse, Shared Memory)',
+            'multiply_shared_operands': 'Compressed Sparse Row x Numpy (Prozesse, Operanden vorab im Shared Memory)'}
+
+
+def multiply_shared_operands(shared_sparse_matrix, shared_dense_matrix):
+    """
+    Multiplies like smf.scipy_csr_dot_numpy_processes, but with operands which were placed in shared memory before
+    the timings, so only the multiplication is timed.
+    Parameters
+    ----------
+    shared_sparse_matrix - the transposed sparse matrix in shared memory (see SharedMemoryDotPool.share)
+    shared_dense_matrix - the transposed dense matrix in shared memory
+
+    Returns a numpy array, which is the result of the matrix multiplication.
+    -------
+
+    """
+    return smf.get_dot_pool().multiply(shared_sparse_matrix, shared_dense_matrix).T
+
+
+def run_performance_test(items_pro_dimension, number_of_timings, functions, seed=fx.DEFAULT_SEED):
+    """
+    Runs the benchmark. The process pool is started before the first timing, so the timings contain only the
+    transfer through shared memory and the multiplication. smf.scipy_csr_dot_numpy_processes places the operands in
+    shared memory in its first repeat and reuses them in the others. For multiply_shared_operands the operands are
+    placed in shared memory once pro matrix size, outside of the timed region.
+    Parameters
+    ----------
+    items_pro_dimension - number of items in each matrix dimension
+    number_of_timings - number of repeats for each timing
+    functions - the functions under test
+    seed - seed for the generated matrices
+
+    Returns a dictionary with the avg. results and std. for each function
+    -------
+
+    """
+    pool = smf.get_dot_pool()
+    test_results = {f.__name__: [] for f in functions + [multiply_shared_operands]}
+    for n in items_pro_dimension:
+        dense_matrix = fx.get_matrix(n, n, 0.01, dtype=np.float64, seed=seed)
+        sparse_matrix = fx.get_matrix(n, n, 0.99, dtype=np.float64, seed=seed + 1)
+        for func in functions:
+            test_results[func.__name__].append(bf.test_performance(func, number_of_timings, dense_matrix,
+                                                                   sparse_matrix))
+            print(func.__name__, n)
+        with pool.share(sparse.csr_matrix(sparse_matrix.T)) as shared_sparse_matrix, \
+                pool.share(dense_matrix.T) as shared_dense_matrix:
+            test_results['multiply_shared_operands'].append(bf.test_performance(
+                multiply_shared_operands, number_of_timings, shared_sparse_matrix, shared_dense_matrix))
+        print('multiply_shared_operands', n)
+    return test_results
+
+
+if __name__ == '__main__':
+    benchmark_timestamp = df.get_date()
+    results_path = RESULTS_DIRECTORY + BENCHMARK_DIRECTORY + benchmark_timestamp + "/"
+    functions_under_test = get_functions_under_test()
+    items_pro_dimension = [250, 500, 1000, 2000, 4000, 8000]
+    number_of_timings_pro_function_and_matrix_dimension = 5
+
+    results = run_performance_test(items_pro_dimension, number_of_timings_pro_function_and_matrix_dimension,
+                                   functions_under_test)
+    dds.backup_results(results_path, results, FILENAME)
+
+    timings = dds.get_timings_from_results(results)
+    functions_ranked_by_time = dds.rank_functions_by_performance(timings)
+    functions_labels = create_functions_aliases()
+    table_data = tf.TableData(functions_labels, items_pro_dimension, functions_ranked_by_time, results, timings)
+
+    ranked_times = [ranked_label for time, ranked_label in functions_ranked_by_time]
+    plot__data = PlotData(TEST_NAME, functions_labels, results, ranked_times, PLOT_X_LABEL, PLOT_Y_LABEL)
+    dds.persist_plots(items_pro_dimension, results_path, plot__data)
+    results_table = dds.create_summery_table(table_data)
+    dds.persist_summery_table(number_of_timings_pro_function_and_matrix_dimension, results_path, results_table,
+                              TABLE_HEADLINE)
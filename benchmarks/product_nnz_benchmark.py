@@ -0,0 +1,121 @@
+import numpy as np
+import benchmark_funcs as bf
+import nnz_funcs as nz
+import fixture_funcs as fx
+import date_funcs as df
+import io_funcs as io
+import table_funcs as tf
+import benchmarks.dense_dot_sparse_benchmark as dds
+from data_containers.plot_data import PlotData
+
+TABLE_HEADLINE = "Ergebnisse des 15. Benchmarks"
+
+RESULTS_DIRECTORY = "results/"
+
+BENCHMARK_DIRECTORY = "15_ProductNnzBenchmark/"
+
+FILENAME = "product_nnz_benchmark_results"
+
+SUMMERY_TABLE_FILE = 'summery_table.txt'
+
+TEST_NAME = 'Vorhersage der Nicht-Nullen des Produkts: Kosten der Schätzer vs. Multiplikation'
+
+PLOT_Y_LABEL = 'Durchschnittliche Rechenzeit [Sek]'
+
+PLOT_X_LABEL = 'Matrixgröße $N \\times N$'
+
+
+def create_functions_aliases():
+    """
+    Creates aliases to the function names in order to display them in the plots.
+    Returns a dictionary with the function names as keys and aliases as values.
+    -------
+
+    """
+    return {'multiply_csr': 'Multiplikation Compressed Sparse Row x Compressed Sparse Row',
+            'count_product_nnz': 'Exakt: symbolischer Durchlauf',
+            'estimate_product_nnz_degrees': 'Schätzung aus den Zeilengraden',
+            'estimate_product_nnz_sample': 'Schätzung aus einer Zeilenstichprobe'}
+
+
+def multiply_csr(matrix_1, matrix_2):
+    """
+    Multiplies two CSR matrices, the reference for the costs of the estimators.
+    Parameters
+    ----------
+    matrix_1 - the first CSR matrix
+    matrix_2 - the second CSR matrix
+
+    Returns a SciPy CSR matrix
+    -------
+
+    """
+    return matrix_1.dot(matrix_2)
+
+
+def run_performance_test(items_pro_dimension, number_of_timings, structure='uniform', percent_zeros=0.995,
+                         seed=fx.DEFAULT_SEED):
+    """
+    Runs the benchmark.
+    Parameters
+    ----------
+    items_pro_dimension - number of items in each matrix dimension
+    number_of_timings - number of repeats for each timing
+    structure - the sparsity structure of the matrices (see matrix_funcs.MATRIX_STRUCTURES)
+    percent_zeros - percentage of zeros in the matrices
+    seed - seed for the generated matrices
+
+    Returns a dictionary with the avg. results and std. for each function, a dictionary with the estimates of each
+    estimator and a list with the exact numbers of non zero entries
+    -------
+
+    """
+    test_results = {name: [] for name in create_functions_aliases()}
+    estimates = {'estimate_product_nnz_degrees': [], 'estimate_product_nnz_sample': []}
+    exact_counts = []
+    for n in items_pro_dimension:
+        matrix_1 = fx.get_matrix(n, n, percent_zeros, dtype=np.float64, structure=structure, seed=seed,
+                                 matrix_format='csr')
+        matrix_2 = fx.get_matrix(n, n, percent_zeros, dtype=np.float64, structure=structure, seed=seed + 1,
+                                 matrix_format='csr')
+        test_results['multiply_csr'].append(bf.test_performance(multiply_csr, number_of_timings, matrix_1, matrix_2))
+        test_results['count_product_nnz'].append(
+            bf.test_performance(nz.count_product_nnz, number_of_timings, matrix_1, matrix_2))
+        exact_counts.append(int(nz.count_product_nnz(matrix_1, matrix_2).sum()))
+        for method in ['degrees', 'sample']:
+            name = 'estimate_product_nnz_' + method
+            test_results[name].append(bf.test_performance(nz.estimate_product_nnz, number_of_timings, matrix_1,
+                                                          matrix_2, method=method))
+            estimates[name].append(nz.estimate_product_nnz(matrix_1, matrix_2, method))
+        print(structure, n)
+    return test_results, estimates, exact_counts
+
+
+if __name__ == '__main__':
+    benchmark_timestamp = df.get_date()
+    results_path = RESULTS_DIRECTORY + BENCHMARK_DIRECTORY + benchmark_timestamp + "/"
+    items_pro_dimension = [1000, 2000, 4000, 8000, 16000]
+    number_of_timings = 5
+    structures = ['uniform', 'banded', 'power_law', 'clustered']
+    functions_labels = create_functions_aliases()
+
+    io.persist_to_text_file(TABLE_HEADLINE + '\nFür jede Matrixgröße wurde die Ausführungszeit {0} Mal gemessen.\n'
+                            .format(number_of_timings), results_path, SUMMERY_TABLE_FILE)
+    io.persist_test_related_info(results_path, SUMMERY_TABLE_FILE)
+    all_results = {}
+    for structure in structures:
+        results, estimates, exact_counts = run_performance_test(items_pro_dimension, number_of_timings, structure)
+        all_results[structure] = {'results': results, 'estimates': estimates, 'exact_counts': exact_counts}
+
+        timings = dds.get_timings_from_results(results)
+        functions_ranked_by_time = dds.rank_functions_by_performance(timings)
+        table_data = tf.TableData(functions_labels, items_pro_dimension, functions_ranked_by_time, results, timings)
+        ranked_times = [ranked_label for time, ranked_label in functions_ranked_by_time]
+        plot_title = TEST_NAME + ' ({0})'.format(structure)
+        dds.persist_plots(items_pro_dimension, results_path, PlotData(plot_title, functions_labels, results,
+                                                                      ranked_times, PLOT_X_LABEL, PLOT_Y_LABEL))
+        io.persist_to_text_file('\nStruktur: {0}\n'.format(structure), results_path, SUMMERY_TABLE_FILE)
+        io.persist_to_text_file(dds.create_summery_table(table_data), results_path, SUMMERY_TABLE_FILE)
+        io.persist_to_text_file(tf.create_estimation_error_table(functions_labels, items_pro_dimension, estimates,
+                                                                 exact_counts), results_path, SUMMERY_TABLE_FILE)
+    dds.backup_results(results_path, all_results, FILENAME)
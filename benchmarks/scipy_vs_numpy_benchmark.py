@@ -1,6 +1,7 @@
 from data_containers.plot_data import PlotData
 import benchmark_funcs as bf
 import matrix_funcs as mf
+import fixture_funcs as fx
 import table_funcs as tf
 import plotting_funcs as pf
 import date_funcs as df
@@ -21,7 +22,8 @@ PLOT_Y_LABEL = "Durchschnittliche Rechenzeit [Sek]"
 
 
 
-def run_performance_test(functions, items_pro_dimension, sparsities):
+def run_performance_test(functions, items_pro_dimension, sparsities, seed=fx.DEFAULT_SEED, structure='uniform',
+                         dtype=int):
     """
     Runs the benchmark.
     Parameters
@@ -29,6 +31,9 @@ def run_performance_test(functions, items_pro_dimension, sparsities):
     functions - the functions under test
     items_pro_dimension - number of items pro matrix dimenstion
     sparsities - a list of values between 0 and 1 which define the percent zeros in each matrix.
+    seed - seed for the generated matrices
+    structure - the sparsity structure of the generated matrices
+    dtype - the data type of the generated matrices
 
     Returns a dictionary with the avg. results and std. for each function
     -------
@@ -37,11 +42,11 @@ def run_performance_test(functions, items_pro_dimension, sparsities):
     results = {size: {f.__name__: [] for f in functions} for size in items_pro_dimension}
     for key, dimension in items_pro_dimension.items():
         for sparsity in sparsities:
-            matrix_1 = mf.create_matrix(dimension, dimension, sparsity)
+            matrix_1 = fx.get_matrix(dimension, dimension, sparsity, dtype=dtype, structure=structure, seed=seed)
             matrix_2 = matrix_1.T
             for func in functions:
-                results[key][func.__name__].append(bf.test_performance(func, number_of_timings,
-                                                                       matrix_1, matrix_2))
+                results[key][func.__name__].append(bf.test_performance(
+                    func, number_of_timings, matrix_1, matrix_2, warm_up=func in mf.AUTOTUNED_FUNCTIONS))
                 print(key, sparsity, func)
     return results
 
@@ -131,7 +136,6 @@ def get_functions_under_test():
 
 if __name__ == "__main__":
     benchmark_timestamp = df.get_date()
-    results_path = RESULTS_DIRECTORY + BENCHMARK_DIRECTORY + benchmark_timestamp + "/"
     functions = get_functions_under_test()
     matrix_sizes_values = [500, 1000, 2000, 3000]
     matrix__sizes_keys = ['{0}x{1}' .format(str(i), str(i)) for i in matrix_sizes_values]
@@ -139,23 +143,27 @@ if __name__ == "__main__":
 
     sparsities = [0.4, 0.45, 0.5, 0.55, 0.6] #percent zeros
     number_of_timings = 5
+    structures = list(mf.MATRIX_STRUCTURES)
     functions_labels = create_functions_aliases()
 
-    results = run_performance_test(functions, items_pro_dimension, sparsities)
-    io.save_results_to_pkl(results_path, results, RESULTS_FILENAME)
+    for structure in structures:
+        results_path = RESULTS_DIRECTORY + BENCHMARK_DIRECTORY + benchmark_timestamp + "/" + structure + "/"
+        results = run_performance_test(functions, items_pro_dimension, sparsities, structure=structure)
+        io.save_results_to_pkl(results_path, results, RESULTS_FILENAME)
 
-    timings = get_timings_from_results(results)
-    functions_ranked_by_performance = rank_functions_by_performance(timings)
-    persist_benchmark_data_to_summery_table_file(number_of_timings, results_path)
+        timings = get_timings_from_results(results)
+        functions_ranked_by_performance = rank_functions_by_performance(timings)
+        persist_benchmark_data_to_summery_table_file(number_of_timings, results_path)
 
-    for key in matrix__sizes_keys:
-        plot_title = 'Matrixmultiplikation-Performance: {0} Matrix' .format(key)
-        plot_data =  PlotData(plot_title, functions_labels, results, functions_ranked_by_performance, PLOT_X_LABEL,
-                             PLOT_Y_LABEL)
-        pf.plot_timing_scipy_vs_numpy_benchmark(plot_data, sparsities, functions, key, results_path)
+        for key in matrix__sizes_keys:
+            plot_title = 'Matrixmultiplikation-Performance: {0} Matrix' .format(key)
+            plot_data =  PlotData(plot_title, functions_labels, results, functions_ranked_by_performance,
+                                  PLOT_X_LABEL, PLOT_Y_LABEL)
+            pf.plot_timing_scipy_vs_numpy_benchmark(plot_data, sparsities, functions, key, results_path)
 
 
-        table_data = tf.ExpendedTableData(functions_labels, matrix_sizes_values, functions_ranked_by_performance[key],
-                                  results, timings[key], key, sparsities)
-        persist_summery_table(table_data, results_path)
+            table_data = tf.ExpendedTableData(functions_labels, matrix_sizes_values,
+                                              functions_ranked_by_performance[key], results, timings[key], key,
+                                              sparsities)
+            persist_summery_table(table_data, results_path)
 
@@ -6,9 +6,11 @@ import table_funcs as tf
 from data_containers import plot_data
 from data_containers.plot_data import PlotData
 from scipy.sparse import *
+from bsr_funcs import tuned_bsr_matrix
+import nnz_funcs as nz
 
 
-from matrix_funcs import create_matrix
+from fixture_funcs import get_matrix, DEFAULT_SEED
 
 SUMMERY_TABLE_FILE = 'summery_table_sparse_matrices_benchmark.txt'
 
@@ -30,13 +32,15 @@ def create_functions_aliases():
     -------
 
     """
-    return{'bsr_matrix': 'Block Sparse Row', 'coo_matrix': 'Coordinate',
+    return{'bsr_matrix': 'Block Sparse Row', 'tuned_bsr_matrix': 'Block Sparse Row (abgestimmte Blockgröße)',
+                        'coo_matrix': 'Coordinate',
                         'csc_matrix': 'Compressed Sparse Column',
                         'csr_matrix': 'Compressed Sparse Row', 'dia_matrix': 'Diagonal storage',
                         'dok_matrix': 'Dictionary Of Keys ', 'lil_matrix': 'Row-based linked list'}
 
 
-def run_performance_test(sparsities, sparse_matrices, items_pro_dimension, number_of_timings):
+def run_performance_test(sparsities, sparse_matrices, items_pro_dimension, number_of_timings, seed=DEFAULT_SEED,
+                         structure='uniform', dtype=int):
     """
     Runs the benchmark
     Parameters
@@ -45,6 +49,9 @@ def run_performance_test(sparsities, sparse_matrices, items_pro_dimension, numbe
     sparse_matrices - the matrices under test
     items_pro_dimension - amount of items pro matrix dimension
     number_of_timings - amount of repeats pro test
+    seed - seed for the generated matrices
+    structure - the sparsity structure of the generated matrices
+    dtype - the data type of the generated matrices
 
     Returns a dictionary containing the avg timing and std. for each tested matrix.
     -------
@@ -53,13 +60,17 @@ def run_performance_test(sparsities, sparse_matrices, items_pro_dimension, numbe
     results = {sparsity: {sm.__name__: [] for sm in sparse_matrices} for sparsity in sparsities}
     for sparsity in sparsities:
         for n in items_pro_dimension:
-            M_1 = create_matrix(n, n, sparsity)
+            M_1 = get_matrix(n, n, sparsity, dtype=dtype, structure=structure, seed=seed)
             M_2 = M_1.T
+            # the product is sized before it is calculated, so a product that does not fit is skipped. The
+            # 'degrees' estimate costs one pass over the entries, exact enough for the decision.
+            required_bytes = nz.get_product_bytes(M_1, M_2, nz.estimate_product_nnz(M_1, M_2, 'degrees'))['csr']
 
             for sm in sparse_matrices:
                 M_1 = sm(M_1)
                 M_2 = sm(M_2)
-                results[sparsity][sm.__name__].append(bf.test_performance_dot_sparse(number_of_timings, M_1, M_2))
+                results[sparsity][sm.__name__].append(
+                    bf.test_performance_dot_sparse(number_of_timings, M_1, M_2, required_bytes))
                 print(sparsity, sm.__name__, n)
     return results
 
@@ -159,30 +170,33 @@ def create_plot_title(key):
 
 if __name__ == "__main__":
     benchmark_timestamp = df.get_date()
-    results_path = RESULTS_DIRECTORY + BENCHMARK_SUBDIRECTORY + benchmark_timestamp + "/"
-    sparse_matrices= [bsr_matrix, coo_matrix, csc_matrix, csr_matrix, dia_matrix, dok_matrix, lil_matrix]
+    sparse_matrices= [bsr_matrix, tuned_bsr_matrix, coo_matrix, csc_matrix, csr_matrix, dia_matrix, dok_matrix, lil_matrix]
     sparsities = [0.01, 0.1, 0.3, 0.5, 0.7, 0.9, 0.99]
     items_pro_matrix_dimension = [100, 500, 1000, 2000, 3000]
     number_of_timings = 5
-
-    results = run_performance_test(sparsities, sparse_matrices, items_pro_matrix_dimension, number_of_timings)
-    backup_results(results_path, results)
-
-    timings = get_timings_from_performance_test_results(results)
-    functions_labels = create_functions_aliases()
-    functions_ranked_by_performance = rank_functions_by_performance(timings)
-    persist_benchmark_data_to_summery_table_file(number_of_timings, results_path)
-
-    for key in sparsities:
-        plot_title = create_plot_title(key)
-        plot_data = PlotData(plot_title, functions_labels, results, functions_ranked_by_performance, PLOT_X_LABEL,
-                             PLOT_Y_LABEL)
-        pf.plot_timing_sparse_matrices_benchmark(plot_data, items_pro_matrix_dimension, sparse_matrices, key,
-                                                 results_path)
-
-        pf.make_reduced_plot_for_sparse_matrices_benchmark(plot_data, items_pro_matrix_dimension, sparse_matrices, key,
-                                                 results_path)
-
-        table_data = tf.TableData(functions_labels, items_pro_matrix_dimension, functions_ranked_by_performance[key],
-                                  results, timings[key])
-        persist_summery_table(table_data, key, results_path)
+    structures = ['uniform', 'banded', 'diagonal', 'block_diagonal', 'power_law', 'clustered']
+
+    for structure in structures:
+        results_path = RESULTS_DIRECTORY + BENCHMARK_SUBDIRECTORY + benchmark_timestamp + "/" + structure + "/"
+        results = run_performance_test(sparsities, sparse_matrices, items_pro_matrix_dimension, number_of_timings,
+                                       structure=structure)
+        backup_results(results_path, results)
+
+        timings = get_timings_from_performance_test_results(results)
+        functions_labels = create_functions_aliases()
+        functions_ranked_by_performance = rank_functions_by_performance(timings)
+        persist_benchmark_data_to_summery_table_file(number_of_timings, results_path)
+
+        for key in sparsities:
+            plot_title = create_plot_title(key)
+            plot_data = PlotData(plot_title, functions_labels, results, functions_ranked_by_performance, PLOT_X_LABEL,
+                                 PLOT_Y_LABEL)
+            pf.plot_timing_sparse_matrices_benchmark(plot_data, items_pro_matrix_dimension, sparse_matrices, key,
+                                                     results_path)
+
+            pf.make_reduced_plot_for_sparse_matrices_benchmark(plot_data, items_pro_matrix_dimension, sparse_matrices,
+                                                               key, results_path)
+
+            table_data = tf.TableData(functions_labels, items_pro_matrix_dimension,
+                                      functions_ranked_by_performance[key], results, timings[key])
+            persist_summery_table(table_data, key, results_path)
@@ -0,0 +1,127 @@
+import os
+import shutil
+import numpy as np
+import benchmark_funcs as bf
+import memmap_funcs as mm
+import fixture_funcs as fx
+import date_funcs as df
+import io_funcs as io
+import table_funcs as tf
+import benchmarks.dense_dot_sparse_benchmark as dds
+from data_containers.plot_data import PlotData
+
+TABLE_HEADLINE = "Ergebnisse des 14. Benchmarks (n = Zeilen der gestreamten Matrix)"
+
+RESULTS_DIRECTORY = "results/"
+
+BENCHMARK_DIRECTORY = "14_StreamingBenchmark/"
+
+FILENAME = "streaming_benchmark_results"
+
+SUMMERY_TABLE_FILE = 'summery_table.txt'
+
+STREAMING_DIRECTORY = "streaming_files/"
+
+TEST_NAME = 'Out-of-Core Matrixmultiplikation: Streaming mit und ohne Vorauslesen'
+
+PLOT_Y_LABEL = 'Durchschnittliche Rechenzeit [Sek]'
+
+PLOT_X_LABEL = 'Zeilen der gestreamten Matrix'
+
+
+def create_functions_aliases():
+    """
+    Creates aliases to the test cases in order to display them in the plots.
+    Returns a dictionary with the test case names as keys and aliases as values.
+    -------
+
+    """
+    return {'memmap_read_ahead': 'Memmap -> Memmap, mit Vorauslesen',
+            'memmap': 'Memmap -> Memmap, ohne Vorauslesen',
+            'shards_read_ahead': 'CSR-Shards -> CSR-Shards, mit Vorauslesen',
+            'shards': 'CSR-Shards -> CSR-Shards, ohne Vorauslesen'}
+
+
+def get_bytes_read(matrix_1):
+    """
+    Gets the number of bytes the streaming multiplication reads from the first matrix.
+    Parameters
+    ----------
+    matrix_1 - a memmap or a list of paths to CSR row shards
+
+    Returns the number of bytes
+    -------
+
+    """
+    if isinstance(matrix_1, list):
+        return sum(os.path.getsize(path) for path in matrix_1)
+    return matrix_1.nbytes
+
+
+def run_performance_test(row_counts, inner, cols, number_of_timings, memory_budget, rows_pro_shard=10000,
+                         percent_zeros=0.99, seed=fx.DEFAULT_SEED):
+    """
+    Runs the benchmark. The first matrix is a memory-mapped fixture and a copy of it in CSR row shards, the second
+    matrix is held in memory. All files are written to STREAMING_DIRECTORY, which is removed afterwards.
+    Parameters
+    ----------
+    row_counts - the numbers of rows of the first matrix
+    inner - number of columns of the first matrix
+    cols - number of columns of the second matrix
+    number_of_timings - number of repeats for each timing
+    memory_budget - the memory budget of the streaming multiplication in bytes
+    rows_pro_shard - number of rows pro CSR shard
+    percent_zeros - percentage of zeros in the matrices
+    seed - seed for the generated matrices
+
+    Returns a dictionary with the avg. results and std. for each test case and a dictionary with the bytes read
+    -------
+
+    """
+    test_results = {name: [] for name in create_functions_aliases()}
+    bytes_read = {name: [] for name in create_functions_aliases()}
+    matrix_2 = fx.get_matrix(inner, cols, percent_zeros, dtype=np.float64, seed=seed + 1, matrix_format='csr')
+    try:
+        for n in row_counts:
+            memmap_matrix = fx.get_matrix(n, inner, percent_zeros, dtype=np.float64, seed=seed,
+                                          matrix_format='memmap')
+            shard_paths = mm.save_csr_shards(memmap_matrix, STREAMING_DIRECTORY + 'shards_{0}/'.format(n),
+                                             rows_pro_shard)
+            test_cases = {'memmap': (memmap_matrix, STREAMING_DIRECTORY + 'result.npy', 'dense'),
+                          'shards': (shard_paths, STREAMING_DIRECTORY + 'result_shards/', 'csr')}
+            for name, (matrix_1, output_path, output_format) in test_cases.items():
+                for read_ahead in [1, 0]:
+                    key = name + '_read_ahead' if read_ahead else name
+                    test_results[key].append(bf.test_performance(
+                        mm.streaming_dot, number_of_timings, matrix_1, matrix_2, output_path=output_path,
+                        output_format=output_format, memory_budget=memory_budget, read_ahead=read_ahead))
+                    bytes_read[key].append(get_bytes_read(matrix_1))
+            print(n)
+    finally:
+        shutil.rmtree(STREAMING_DIRECTORY, ignore_errors=True)
+    return test_results, bytes_read
+
+
+if __name__ == '__main__':
+    benchmark_timestamp = df.get_date()
+    results_path = RESULTS_DIRECTORY + BENCHMARK_DIRECTORY + benchmark_timestamp + "/"
+    row_counts = [25000, 50000, 100000, 200000]
+    inner, cols = 1000, 100
+    memory_budget = 64 * 1024 ** 2
+    number_of_timings = 5
+
+    results, bytes_read = run_performance_test(row_counts, inner, cols, number_of_timings, memory_budget)
+    dds.backup_results(results_path, {'results': results, 'bytes_read': bytes_read}, FILENAME)
+
+    timings = dds.get_timings_from_results(results)
+    functions_ranked_by_time = dds.rank_functions_by_performance(timings)
+    functions_labels = create_functions_aliases()
+    table_data = tf.TableData(functions_labels, row_counts, functions_ranked_by_time, results, timings)
+
+    ranked_times = [ranked_label for time, ranked_label in functions_ranked_by_time]
+    plot__data = PlotData(TEST_NAME, functions_labels, results, ranked_times, PLOT_X_LABEL, PLOT_Y_LABEL)
+    dds.persist_plots(row_counts, results_path, plot__data)
+    dds.persist_summery_table(number_of_timings, results_path, dds.create_summery_table(table_data),
+                              TABLE_HEADLINE)
+    io.persist_to_text_file(tf.create_streaming_throughput_table(functions_labels, row_counts, bytes_read, timings),
+                            results_path, SUMMERY_TABLE_FILE)
@@ -1,10 +1,12 @@
 import date_funcs as df
 import matrix_funcs as mf
+import fixture_funcs as fx
 import benchmarks.dense_dot_sparse_benchmark as dds
 import table_funcs as tf
 import benchmark_funcs as bf
 from data_containers.plot_data import PlotData
 import plotting_funcs as pf
+import top_n_funcs as tnf
 
 TABLE_HEADLINE = "Ergebnisse des 5. Benchmarks"
 
@@ -20,6 +22,16 @@ PLOT_Y_LABEL = 'Durchschnittliche Rechenzeit [Sek]'
 
 PLOT_X_LABEL = 'Matrixgröße $N \\times N$'
 
+SCALING_FILENAME = "top_n_scaling_benchmark_results"
+
+SCALING_TEST_NAME = 'Top-N-Auswahl: Skalierung mit der Anzahl der Threads'
+
+OUTPUT_FILENAME = "top_n_output_benchmark_results"
+
+OUTPUT_TEST_NAME = 'Matrixmultiplikation mit Top-N: Ausgabeformat des Ergebnisses'
+
+TOP_N = 20
+
 def create_functions_aliases():
     """
     Creates aliases to the function names in order to display them in the plots.
@@ -55,25 +67,80 @@ def persist_plots(items_pro_matrix_dimension, results_directory, *argv: PlotData
         pf.plot_timing_top_n_benchmark(plot_data, items_pro_matrix_dimension, results_directory)
 
 
-def run_performance_test(items_in_matrix, number_of_timings, functions):
+def run_performance_test(items_in_matrix, number_of_timings, functions, seed=fx.DEFAULT_SEED, structure='uniform',
+                         dtype=int):
     test_results = {f.__name__:[] for f in functions}
     for n in items_in_matrix:
-        dense_matrix = mf.create_matrix(n, n, 0.01)
-        sparse_matrix = mf.create_matrix(n, n, 0.99)
+        dense_matrix = fx.get_matrix(n, n, 0.01, dtype=dtype, structure=structure, seed=seed)
+        sparse_matrix = fx.get_matrix(n, n, 0.99, dtype=dtype, structure=structure, seed=seed + 1)
         for func in functions:
-            test_results[func.__name__].append(bf.test_performance(func, number_of_timings, dense_matrix, sparse_matrix))
+            test_results[func.__name__].append(bf.test_performance(func, number_of_timings, dense_matrix, sparse_matrix,
+                                                                   warm_up=func in mf.AUTOTUNED_FUNCTIONS))
             print(func.__name__, n)
     return test_results
 
+def top_n_with_workers(dense_matrix, sparse_matrix, workers=1):
+    """
+    Creates the top-n CSR matrix of the dense matrix on a number of threads. The sparse matrix is not used; it
+    is part of the signature, so the function fits the benchmark functions.
+    Parameters
+    ----------
+    dense_matrix - the matrix whose top-n items are selected
+    sparse_matrix - not used
+    workers - number of threads
+
+    Returns a SciPy CSR matrix
+    -------
+
+    """
+    return tnf.top_n_to_csr(dense_matrix, TOP_N, workers=workers)
+
+
+def create_scaling_aliases(worker_counts):
+    """
+    Creates aliases to the result keys of the scaling test in order to display them in the plots.
+    Returns a dictionary with the result keys as keys and aliases as values.
+    -------
+
+    """
+    return {'workers_{0}'.format(workers): '{0} Thread(s)'.format(workers) for workers in worker_counts}
+
+
+def run_scaling_test(items_in_matrix, number_of_timings, worker_counts, seed=fx.DEFAULT_SEED):
+    """
+    Runs the scaling benchmark of the parallel top-n selection.
+    Parameters
+    ----------
+    items_in_matrix - number of items in each matrix dimension
+    number_of_timings - number of repeats for each timing
+    worker_counts - the numbers of threads under test
+    seed - seed for the generated matrices
+
+    Returns a dictionary with the avg. results and std. for each number of threads
+    -------
+
+    """
+    test_results = {'workers_{0}'.format(workers): [] for workers in worker_counts}
+    for n in items_in_matrix:
+        dense_matrix = fx.get_matrix(n, n, 0.01, dtype=float, seed=seed)
+        results = bf.test_performance_over_workers(top_n_with_workers, worker_counts, number_of_timings,
+                                                   dense_matrix, None)
+        for workers, result in results.items():
+            test_results['workers_{0}'.format(workers)].append(result)
+            print('top_n_with_workers', workers, n)
+    return test_results
+
+
 if __name__ == '__main__':
     benchmark_timestamp = df.get_date()
     results_path = RESULTS_DIRECTORY + BENCHMARK_DIRECTORY + benchmark_timestamp + "/"
     functions_under_test = get_functions_under_test()
     items_pro_dimension = [500, 1000, 2000, 3000, 4000]
     number_of_timings_pro_function_and_matrix_dimension = 5
+    structure = 'uniform'
 
     results = run_performance_test(items_pro_dimension, number_of_timings_pro_function_and_matrix_dimension,
-                               functions_under_test)
+                               functions_under_test, structure=structure)
     dds.backup_results(results_path, results, FILENAME)
     timings = dds.get_timings_from_results(results)
     functions_ranked_by_time = dds.rank_functions_by_performance(timings)
@@ -86,4 +153,40 @@ if __name__ == '__main__':
 
     results_table = dds.create_summery_table(table_data)
     dds.persist_summery_table(number_of_timings_pro_function_and_matrix_dimension, results_path, results_table,
-                              TABLE_HEADLINE)
\ No newline at end of file
+                              TABLE_HEADLINE)
+
+    worker_counts = bf.get_worker_counts()
+    scaling_results = run_scaling_test(items_pro_dimension, number_of_timings_pro_function_and_matrix_dimension,
+                                       worker_counts)
+    scaling_path = results_path + "scaling/"
+    dds.backup_results(scaling_path, scaling_results, SCALING_FILENAME)
+    scaling_timings = dds.get_timings_from_results(scaling_results)
+    scaling_ranked_by_time = dds.rank_functions_by_performance(scaling_timings)
+    scaling_labels = create_scaling_aliases(worker_counts)
+    scaling_table_data = tf.TableData(scaling_labels, items_pro_dimension, scaling_ranked_by_time, scaling_results,
+                                      scaling_timings)
+    scaling_plot_data = dds.generate_reduced_plot_data(scaling_labels, scaling_results, scaling_ranked_by_time,
+                                                       PLOT_X_LABEL, PLOT_Y_LABEL, SCALING_TEST_NAME)
+    persist_plots(items_pro_dimension, scaling_path, scaling_plot_data)
+    dds.persist_summery_table(number_of_timings_pro_function_and_matrix_dimension, scaling_path,
+                              dds.create_summery_table(scaling_table_data), SCALING_TEST_NAME)
+
+    outputs = ['dense', 'csr', 'auto']
+    top_n_functions = functions_under_test[1:]
+    output_results, result_memory = dds.run_output_performance_test(
+        items_pro_dimension, number_of_timings_pro_function_and_matrix_dimension, top_n_functions, outputs,
+        percent_zeros_1=0.01, percent_zeros_2=0.99)
+    output_path = results_path + "output/"
+    dds.backup_results(output_path, {'results': output_results, 'result_memory': result_memory}, OUTPUT_FILENAME)
+    output_timings = dds.get_timings_from_results(output_results)
+    output_ranked_by_time = dds.rank_functions_by_performance(output_timings)
+    output_labels = dds.create_output_aliases(functions_labels, top_n_functions, outputs)
+    output_table_data = tf.TableData(output_labels, items_pro_dimension, output_ranked_by_time, output_results,
+                                     output_timings)
+    output_plot_data = dds.generate_reduced_plot_data(output_labels, output_results, output_ranked_by_time,
+                                                      PLOT_X_LABEL, PLOT_Y_LABEL, OUTPUT_TEST_NAME)
+    persist_plots(items_pro_dimension, output_path, output_plot_data)
+    output_table = dds.create_summery_table(output_table_data)
+    output_table += tf.create_memory_table(output_labels, items_pro_dimension, result_memory, tf.RESULT_MEMORY)
+    dds.persist_summery_table(number_of_timings_pro_function_and_matrix_dimension, output_path, output_table,
+                              OUTPUT_TEST_NAME)
@@ -0,0 +1,103 @@
+import numpy as np
+from scipy import sparse
+
+WORD_BITS = 64
+
+BLOCK_MEMORY_BUDGET = 64 * 1024 ** 2  # bytes of intermediate results pro row block
+
+BYTE_POPCOUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def pack_rows(matrix):
+    """
+    Packs the rows of a 0/1 matrix into 64 bit words: bit j % 64 of word j // 64 is set if the entry in column j
+    is not zero.
+    Parameters
+    ----------
+    matrix - numpy 2-dim matrix or SciPy sparse matrix
+
+    Returns a numpy array of type uint64 with the shape (rows, ceil(cols / 64))
+    -------
+
+    """
+    rows, cols = matrix.shape
+    words_count = -(-cols // WORD_BITS)
+    if sparse.issparse(matrix):
+        coordinates = matrix.tocoo()
+        nonzero = coordinates.data != 0
+        row, col = coordinates.row[nonzero], coordinates.col[nonzero]
+        packed = np.zeros((rows, words_count), dtype=np.uint64)
+        bits = np.left_shift(np.uint64(1), (col % WORD_BITS).astype(np.uint64))
+        np.bitwise_or.at(packed, (row, col // WORD_BITS), bits)
+        return packed
+    packed_bytes = np.packbits(np.asarray(matrix) != 0, axis=1, bitorder='little')
+    padded = np.zeros((rows, words_count * 8), dtype=np.uint8)
+    padded[:, :packed_bytes.shape[1]] = packed_bytes
+    return padded.view('<u8').astype(np.uint64, copy=False)
+
+
+def popcount(words):
+    """
+    Counts the set bits of every word.
+    Parameters
+    ----------
+    words - numpy array of type uint64
+
+    Returns a numpy array of type uint8 with the same shape
+    -------
+
+    """
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words)
+    return BYTE_POPCOUNTS[words.view(np.uint8)].reshape(words.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+
+def bitpacked_dot(matrix_1, matrix_2, mode='count', memory_budget=BLOCK_MEMORY_BUDGET):
+    """
+    Multiplies two 0/1 matrices in bit-packed form. The rows of the first matrix and the columns of the second
+    matrix are packed into 64 bit words, every entry of the product is the popcount of the AND of two bit rows.
+    Parameters
+    ----------
+    matrix_1 - the first matrix, numpy array or SciPy sparse matrix. All non zero entries count as 1.
+    matrix_2 - the second matrix, numpy array or SciPy sparse matrix. All non zero entries count as 1.
+    mode - 'count' for the exact integer product, 'boolean' for the boolean product (OR of ANDs)
+    memory_budget - maximal size of the intermediate results of a row block in bytes
+
+    Returns a numpy array of type int64 ('count') or bool ('boolean')
+    -------
+
+    """
+    if mode not in ('count', 'boolean'):
+        raise ValueError("Unknown mode: {0}".format(mode))
+    packed_1 = pack_rows(matrix_1)
+    packed_2 = pack_rows(matrix_2.T)
+    rows, cols = packed_1.shape[0], packed_2.shape[0]
+    result = np.zeros((rows, cols), dtype=np.int64 if mode == 'count' else bool)
+    block_rows = max(1, memory_budget // max(1, cols * 8))
+    for first_row in range(0, rows, block_rows):
+        block = packed_1[first_row:first_row + block_rows]
+        block_result = result[first_row:first_row + block_rows]
+        for word in range(packed_1.shape[1]):
+            overlap = np.bitwise_and(block[:, word, np.newaxis], packed_2[np.newaxis, :, word])
+            if mode == 'count':
+                block_result += popcount(overlap)
+            else:
+                block_result |= overlap != 0
+    return result
+
+
+def dot_bitpacked(matrix_1, matrix_2, dtype=None):
+    """
+    Calculates the dot product of two 0/1 matrices with the bit-packed engine (see bitpacked_dot).
+    Parameters
+    ----------
+    matrix_1:  numpy-array
+    matrix_2:  numpy-array
+    dtype: if given, the result is converted to this data type
+
+    Returns: a numpy-array which results from the dot product
+    -------
+
+    """
+    result = bitpacked_dot(matrix_1, matrix_2)
+    return result if dtype is None else result.astype(dtype, copy=False)
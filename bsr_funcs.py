@@ -0,0 +1,207 @@
+import timeit
+import numpy as np
+from scipy import sparse
+
+BLOCK_SIZES = [1, 2, 4, 8, 16]
+
+TUNING_SAMPLE_SIZE = 256  # rows and columns of the tuning sample, a multiple of all block sizes
+
+TUNING_REPEATS = 3
+
+TUNING_DENSE_COLUMNS = 64  # columns of the dense operand in the tuning multiplication
+
+PROBE_SIZE = 64  # rows and columns of the grid and the corner of the cheap lookup (see get_lookup_key)
+
+BLOCKSIZE_CACHE = {}
+
+LOOKUP_CACHE = {}  # block sizes by the cheap lookup key, filled after every full lookup
+
+
+def tuned_bsr_matrix(matrix, structure=None, operation='sparse'):
+    """
+    Converts a matrix to a Block Sparse Row matrix with the autotuned block size.
+    Parameters
+    ----------
+    matrix - numpy 2-dim matrix or SciPy sparse matrix
+    structure - a label of the sparsity structure, part of the cache key (see get_bsr_blocksize)
+    operation - the multiplication the block size is tuned for: 'sparse' or 'dense'
+
+    Returns a SciPy BSR matrix
+    -------
+
+    """
+    return sparse.bsr_matrix(matrix, blocksize=get_bsr_blocksize(matrix, structure, operation))
+
+
+def get_bsr_blocksize(matrix, structure=None, operation='sparse'):
+    """
+    Gets the fastest BSR block size for a matrix. The block size is tuned on a sample of the matrix on the first
+    request and cached pro (shape, density, structure, operation). A repeated request is answered from a cheap
+    lookup key (see get_lookup_key), so the sample and the exact density are only calculated on a miss.
+    Parameters
+    ----------
+    matrix - numpy 2-dim matrix or SciPy sparse matrix
+    structure - a label of the sparsity structure. If None, the block fill of the sample is used as structure
+                signature, so block structured and scattered matrices of the same density get their own entries.
+    operation - the multiplication the block size is tuned for: 'sparse' (BSR x BSR) or 'dense' (BSR x numpy)
+
+    Returns the block size as tuple (rows, cols)
+    -------
+
+    """
+    lookup_key = get_lookup_key(matrix, structure, operation)
+    if lookup_key in LOOKUP_CACHE:
+        return LOOKUP_CACHE[lookup_key]
+    sample = get_tuning_sample(matrix)
+    if structure is None:
+        structure = get_block_fill(sample)
+    key = get_tuning_key(matrix, structure, operation)
+    if key not in BLOCKSIZE_CACHE:
+        timings = measure_blocksize_timings(sample, get_candidate_blocksizes(matrix.shape), operation)
+        BLOCKSIZE_CACHE[key] = min(timings, key=timings.get)
+    LOOKUP_CACHE[lookup_key] = BLOCKSIZE_CACHE[key]
+    return BLOCKSIZE_CACHE[key]
+
+
+def get_lookup_key(matrix, structure, operation):
+    """
+    Creates a cache key which costs almost nothing: the density of a sparse matrix is taken from its stored
+    entries, the density of a dense matrix from a grid of PROBE_SIZE x PROBE_SIZE entries, and without a structure
+    label the block fill of the PROBE_SIZE x PROBE_SIZE corner stands for the structure.
+    Parameters
+    ----------
+    matrix - numpy 2-dim matrix or SciPy sparse matrix
+    structure - a label of the sparsity structure or None
+    operation - the multiplication the block size is tuned for
+
+    Returns a tuple
+    -------
+
+    """
+    rows, cols = matrix.shape
+    if sparse.issparse(matrix):
+        density = matrix.nnz / max(1, rows * cols)
+        if matrix.format not in ('csr', 'csc'):
+            matrix = matrix.tocsr()
+    else:
+        grid = matrix[::max(1, rows // PROBE_SIZE), ::max(1, cols // PROBE_SIZE)]
+        density = np.count_nonzero(grid) / max(1, grid.size)
+    if structure is None:
+        structure = get_block_fill(sparse.csr_matrix(matrix[:PROBE_SIZE, :PROBE_SIZE]))
+    return matrix.shape, float('{0:.2g}'.format(density)), structure, operation
+
+
+def get_tuning_key(matrix, structure, operation):
+    """
+    Creates the cache key of a matrix.
+    Parameters
+    ----------
+    matrix - numpy 2-dim matrix or SciPy sparse matrix
+    structure - a label or signature of the sparsity structure
+    operation - the multiplication the block size is tuned for
+
+    Returns a tuple
+    -------
+
+    """
+    nnz = matrix.count_nonzero() if sparse.issparse(matrix) else np.count_nonzero(matrix)
+    density = nnz / max(1, matrix.shape[0] * matrix.shape[1])
+    return matrix.shape, float('{0:.2g}'.format(density)), structure, operation
+
+
+def get_candidate_blocksizes(shape):
+    """
+    Gets the square block sizes which divide both dimensions of a matrix.
+    Parameters
+    ----------
+    shape - the shape of the matrix
+
+    Returns a list of tuples (rows, cols)
+    -------
+
+    """
+    return [(size, size) for size in BLOCK_SIZES if shape[0] % size == 0 and shape[1] % size == 0]
+
+
+def get_tuning_sample(matrix):
+    """
+    Gets the upper left corner of a matrix, at most TUNING_SAMPLE_SIZE x TUNING_SAMPLE_SIZE. Every candidate block
+    size of the matrix divides the sample as well.
+    Parameters
+    ----------
+    matrix - numpy 2-dim matrix or SciPy sparse matrix
+
+    Returns a SciPy CSR matrix
+    -------
+
+    """
+    if sparse.issparse(matrix):
+        matrix = matrix.tocsr()
+    return sparse.csr_matrix(matrix[:TUNING_SAMPLE_SIZE, :TUNING_SAMPLE_SIZE])
+
+
+def get_block_fill(sample, size=4):
+    """
+    Calculates how densely the non zero entries fill the size x size blocks they occupy.
+    Parameters
+    ----------
+    sample - a SciPy CSR matrix
+    size - the block size
+
+    Returns the average fill of the occupied blocks, rounded to one decimal
+    -------
+
+    """
+    coordinates = sample.tocoo()
+    if coordinates.nnz == 0:
+        return 0.0
+    blocks = np.unique(coordinates.row // size * (sample.shape[1] // size + 1) + coordinates.col // size)
+    return round(coordinates.nnz / (len(blocks) * size * size), 1)
+
+
+def measure_blocksize_timings(sample, blocksizes, operation='sparse', repeats=TUNING_REPEATS):
+    """
+    Measures the conversion and multiplication time of a sample for several block sizes.
+    Parameters
+    ----------
+    sample - a SciPy CSR matrix
+    blocksizes - the block sizes under test
+    operation - 'sparse' multiplies the sample with its transpose, 'dense' with a dense matrix
+    repeats - number of repeats, the fastest repeat counts
+
+    Returns a dictionary with the block sizes as keys and the times in seconds as values
+    -------
+
+    """
+    if operation == 'sparse':
+        other = sample.T.tocsr()
+    elif operation == 'dense':
+        other = np.ones((sample.shape[1], TUNING_DENSE_COLUMNS), dtype=sample.dtype)
+    else:
+        raise ValueError("Unknown operation: {0}".format(operation))
+    timings = {}
+    for blocksize in blocksizes:
+        def multiply():
+            bsr_sample = sparse.bsr_matrix(sample, blocksize=blocksize)
+            if operation == 'sparse':
+                return bsr_sample.dot(sparse.bsr_matrix(other, blocksize=blocksize[::-1]))
+            return bsr_sample.dot(other)
+        timings[blocksize] = min(timeit.repeat(multiply, number=1, repeat=repeats))
+    return timings
+
+
+def get_matching_blocksize(blocksize, shape):
+    """
+    Gets the block size of the right operand of a BSR x BSR multiplication. Its block rows must equal the block
+    columns of the left operand.
+    Parameters
+    ----------
+    blocksize - the block size of the left operand
+    shape - the shape of the right operand
+
+    Returns the block size as tuple (rows, cols)
+    -------
+
+    """
+    cols = blocksize[1] if shape[1] % blocksize[1] == 0 else 1
+    return blocksize[1], cols
@@ -0,0 +1,83 @@
+import numpy as np
+
+
+class BufferPool(object):
+    """
+    A pool of preallocated result arrays. Released buffers are kept pro (shape, dtype) and handed out again by the
+    next acquire with the same key, so repeated multiplications of the same shapes do not allocate new results.
+    """
+
+    def __init__(self, max_buffers_pro_key=4):
+        """
+        Parameters
+        ----------
+        max_buffers_pro_key - maximal number of released buffers which are kept pro (shape, dtype)
+        """
+        self.max_buffers_pro_key = max_buffers_pro_key
+        self.free_buffers = {}
+
+    def acquire(self, shape, dtype=np.float64):
+        """
+        Gets a buffer with the given shape and data type. The content of a reused buffer is not cleared.
+        Parameters
+        ----------
+        shape - the shape of the buffer
+        dtype - the data type of the buffer
+
+        Returns a C-contiguous numpy array
+        -------
+
+        """
+        key = get_buffer_key(shape, dtype)
+        free_buffers = self.free_buffers.get(key)
+        if free_buffers:
+            return free_buffers.pop()
+        return np.empty(key[0], dtype=key[1])
+
+    def acquire_product(self, matrix_1, matrix_2, dtype=None):
+        """
+        Gets a buffer for the dense product of two matrices.
+        Parameters
+        ----------
+        matrix_1 - the first matrix, numpy array or SciPy sparse matrix
+        matrix_2 - the second matrix, numpy array or SciPy sparse matrix
+        dtype - the data type of the product. If None, the result type of the operands is used.
+
+        Returns a C-contiguous numpy array
+        -------
+
+        """
+        dtype = dtype or np.result_type(matrix_1.dtype, matrix_2.dtype)
+        return self.acquire((matrix_1.shape[0], matrix_2.shape[1]), dtype)
+
+    def release(self, buffer):
+        """
+        Gives a buffer back to the pool. The buffer must not be used by the caller afterwards.
+        Parameters
+        ----------
+        buffer - a numpy array which was acquired from this pool
+        """
+        free_buffers = self.free_buffers.setdefault(get_buffer_key(buffer.shape, buffer.dtype), [])
+        if len(free_buffers) < self.max_buffers_pro_key:
+            free_buffers.append(buffer)
+
+    def clear(self):
+        """
+        Drops all released buffers.
+        """
+        self.free_buffers.clear()
+
+
+def get_buffer_key(shape, dtype):
+    """
+    Creates the pool key of a buffer.
+    Parameters
+    ----------
+    shape - the shape of the buffer
+    dtype - the data type of the buffer
+
+    Returns a tuple (shape, dtype string)
+    -------
+
+    """
+    return tuple(int(size) for size in shape), np.dtype(dtype).str
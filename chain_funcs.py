@@ -0,0 +1,389 @@
+import functools
+import numpy as np
+from scipy import sparse
+import matrix_funcs as mf
+
+CHAIN_FORMATS = ('dense', 'csr', 'csc')
+
+# uncalibrated seconds pro elementary operation, used where the calibrated cost model has no value (see get_step_costs)
+STEP_COSTS = {'dense_product': 5e-11,  # multiply-add of numpy's dot
+              'sparse_dense_product': 1e-9,  # non zero entry of the sparse operand x column of the dense operand
+              'sparse_product': 5e-9,  # multiply-add of a sparse x sparse product
+              'sparse_entry': 1.5e-8,  # written or converted non zero entry of a sparse matrix
+              'dense_entry': 5e-10,  # written entry of a dense matrix
+              'sparsify_entry': 4e-8}  # scanned entry of a dense matrix that is converted to a sparse matrix
+
+# the kinds of a multiplication step: (kind, format of the left operand, format of the right operand, result format)
+CHAIN_STEPS = [('dense', 'dense', 'dense', 'dense'),
+               ('sparse_dense', 'csr', 'dense', 'dense'),
+               ('dense_sparse', 'dense', 'csc', 'dense'),
+               ('sparse', 'csr', 'csr', 'csr'),
+               ('sparse', 'csc', 'csc', 'csc')]
+
+# the coefficient of the calibrated cost model which measures a step cost: (function name, feature index), see
+# cost_model_funcs.get_cost_features
+CALIBRATED_STEP_COSTS = {'dense_product': ('dot_numpy', 1),
+                         'sparse_product': ('dot_scipy_csr_with_conversion', 2),
+                         'sparsify_entry': ('dot_scipy_csr_with_conversion', 1),
+                         'sparse_dense_product': ('scipy_csr_dot_numpy_with_swap', 2),
+                         'dense_entry': ('scipy_csr_dot_numpy_with_swap', 3)}
+
+
+class ChainPlan(object):
+    """
+    An execution plan for the product of a matrix chain A_0 x A_1 x ... x A_n. The plan chooses the
+    parenthesization, the kind of every multiplication step and the format of every intermediate result by dynamic
+    programming over the estimated costs. The densities of the intermediate results are predicted from the
+    densities of the operands, assuming independently scattered non zero entries.
+    The step 'dense_sparse' generalizes the swap functions of matrix_funcs: a dense x sparse product is calculated
+    as (B^T x A^T)^T, so the sparse operand is on the left. Both transpositions are views, nothing is copied.
+    """
+
+    def __init__(self, matrices, output='dense', step_costs=None):
+        """
+        Parameters
+        ----------
+        matrices - a list of numpy 2-dim matrices or SciPy sparse matrices with matching inner dimensions
+        output - the format of the result: 'dense', 'csr', 'csc' or 'auto' (the cheapest of them)
+        step_costs - a dictionary with the costs of the elementary operations. If None, the costs are taken from
+                     the calibrated cost model (see get_step_costs).
+        """
+        if not matrices:
+            raise ValueError("The chain is empty")
+        if output not in CHAIN_FORMATS and output != 'auto':
+            raise ValueError("Unknown output format: {0}".format(output))
+        self.dimensions = get_chain_dimensions(matrices)
+        self.step_costs = step_costs or get_step_costs()
+        self.densities = get_chain_densities(matrices, self.dimensions)
+        self.costs, self.choices = self.plan(matrices)
+        last = len(matrices) - 1
+        formats = CHAIN_FORMATS if output == 'auto' else [output]
+        self.output = min(formats, key=lambda matrix_format: self.costs[0, last][matrix_format])
+        self.cost = self.costs[0, last][self.output]
+
+    def plan(self, matrices):
+        """
+        Calculates the cheapest way to get the product of every sub chain in every format.
+        Parameters
+        ----------
+        matrices - the matrices of the chain
+
+        Returns two dictionaries with the sub chains (first, last) as keys: the costs pro format and the choices pro
+        format. A choice is ('leaf',), ('convert', source format) or ('step', split, kind, left format, right format).
+        -------
+
+        """
+        costs, choices = {}, {}
+        count = len(matrices)
+        for i, matrix in enumerate(matrices):
+            costs[i, i] = {get_chain_format(matrix): 0.0}
+            choices[i, i] = {get_chain_format(matrix): ('leaf',)}
+            self.add_conversions(costs, choices, i, i)
+        for length in range(2, count + 1):
+            for first in range(count - length + 1):
+                last = first + length - 1
+                costs[first, last], choices[first, last] = {}, {}
+                rows, cols = self.dimensions[first], self.dimensions[last + 1]
+                for split in range(first, last):
+                    inner = self.dimensions[split + 1]
+                    for kind, left_format, right_format, result_format in CHAIN_STEPS:
+                        cost = costs[first, split][left_format] + costs[split + 1, last][right_format] + \
+                            self.get_step_cost(kind, rows, inner, cols, self.densities[first, split],
+                                               self.densities[split + 1, last], self.densities[first, last])
+                        if cost < costs[first, last].get(result_format, np.inf):
+                            costs[first, last][result_format] = cost
+                            choices[first, last][result_format] = ('step', split, kind, left_format, right_format)
+                self.add_conversions(costs, choices, first, last)
+        return costs, choices
+
+    def add_conversions(self, costs, choices, first, last):
+        """
+        Adds the formats which are cheaper to reach by converting the product of a sub chain.
+        Parameters
+        ----------
+        costs - the costs pro sub chain and format
+        choices - the choices pro sub chain and format
+        first - the first matrix of the sub chain
+        last - the last matrix of the sub chain
+        """
+        computed = dict(costs[first, last])
+        for target in CHAIN_FORMATS:
+            for source, cost in computed.items():
+                cost += self.get_conversion_cost(source, target, first, last)
+                if cost < costs[first, last].get(target, np.inf):
+                    costs[first, last][target] = cost
+                    choices[first, last][target] = ('convert', source)
+
+    def get_step_cost(self, kind, rows, inner, cols, density_1, density_2, result_density):
+        """
+        Estimates the cost of a multiplication step.
+        Parameters
+        ----------
+        kind - the kind of the step (see CHAIN_STEPS)
+        rows - number of rows of the first matrix
+        inner - number of columns of the first matrix (rows of the second matrix)
+        cols - number of columns of the second matrix
+        density_1 - share of the non zero entries in the first matrix
+        density_2 - share of the non zero entries in the second matrix
+        result_density - predicted share of the non zero entries in the product
+
+        Returns the estimated cost in seconds
+        -------
+
+        """
+        c = self.step_costs
+        if kind == 'dense':
+            return c['dense_product'] * rows * inner * cols + c['dense_entry'] * rows * cols
+        if kind == 'sparse_dense':
+            return c['sparse_dense_product'] * rows * inner * density_1 * cols + c['dense_entry'] * rows * cols
+        if kind == 'dense_sparse':
+            return c['sparse_dense_product'] * inner * cols * density_2 * rows + c['dense_entry'] * rows * cols
+        return c['sparse_product'] * rows * inner * cols * density_1 * density_2 + \
+            c['sparse_entry'] * rows * cols * result_density
+
+    def get_conversion_cost(self, source, target, first, last):
+        """
+        Estimates the cost of converting the product of a sub chain to another format.
+        Parameters
+        ----------
+        source - the current format
+        target - the requested format
+        first - the first matrix of the sub chain
+        last - the last matrix of the sub chain
+
+        Returns the estimated cost in seconds
+        -------
+
+        """
+        size = self.dimensions[first] * self.dimensions[last + 1]
+        if source == target:
+            return 0.0
+        if target == 'dense':
+            return self.step_costs['dense_entry'] * size
+        if source == 'dense':
+            return self.step_costs['sparsify_entry'] * size
+        return self.step_costs['sparse_entry'] * size * self.densities[first, last]
+
+    def multiply(self, matrices):
+        """
+        Multiplies a matrix chain according to the plan. The matrices must have the shapes and formats of the
+        matrices the plan was created for.
+        Parameters
+        ----------
+        matrices - a list of numpy 2-dim matrices or SciPy sparse matrices
+
+        Returns a numpy array or a sparse matrix in the output format of the plan
+        -------
+
+        """
+        if get_chain_dimensions(matrices) != self.dimensions:
+            raise ValueError("The chain does not match the plan")
+        return self.evaluate(matrices, 0, len(matrices) - 1, self.output)
+
+    def evaluate(self, matrices, first, last, matrix_format):
+        """
+        Calculates the product of a sub chain according to the plan.
+        Parameters
+        ----------
+        matrices - the matrices of the chain
+        first - the first matrix of the sub chain
+        last - the last matrix of the sub chain
+        matrix_format - the format of the product
+
+        Returns a numpy array or a sparse matrix
+        -------
+
+        """
+        choice = self.choices[first, last][matrix_format]
+        if choice[0] == 'leaf':
+            return matrices[first]
+        if choice[0] == 'convert':
+            return convert_chain_matrix(self.evaluate(matrices, first, last, choice[1]), matrix_format)
+        split, kind, left_format, right_format = choice[1:]
+        left = self.evaluate(matrices, first, split, left_format)
+        right = self.evaluate(matrices, split + 1, last, right_format)
+        if kind == 'dense':
+            return np.dot(left, right)
+        if kind == 'dense_sparse':
+            # the transposed CSC matrix is a CSR matrix
+            return right.T.dot(left.T).T
+        result = left.dot(right)
+        return result.asformat(matrix_format) if kind == 'sparse' else result
+
+    def describe(self, first=0, last=None, matrix_format=None):
+        """
+        Describes the plan of a sub chain.
+        Parameters
+        ----------
+        first - the first matrix of the sub chain
+        last - the last matrix of the sub chain. None means the end of the chain.
+        matrix_format - the format of the product. None means the output format.
+
+        Returns a string like '((A0 x A1)[sparse:csr] x A2)[dense_sparse:dense]'
+        -------
+
+        """
+        last = len(self.dimensions) - 2 if last is None else last
+        matrix_format = matrix_format or self.output
+        choice = self.choices[first, last][matrix_format]
+        if choice[0] == 'leaf':
+            return 'A{0}'.format(first)
+        if choice[0] == 'convert':
+            return '{0}->{1}'.format(self.describe(first, last, choice[1]), matrix_format)
+        split, kind, left_format, right_format = choice[1:]
+        return '({0} x {1})[{2}:{3}]'.format(self.describe(first, split, left_format),
+                                             self.describe(split + 1, last, right_format), kind, matrix_format)
+
+
+def get_step_costs(cost_model=None):
+    """
+    Gets the costs of the elementary operations from the calibrated cost model of matrix_funcs.dot_auto, so the
+    planner and the dispatcher share one calibration. A cost the model does not determine (the function was not
+    calibrated or the fit set its coefficient to zero) and the cost of written sparse entries, which the model does
+    not measure, keep their value from STEP_COSTS.
+    Parameters
+    ----------
+    cost_model - the cost model (see cost_model_funcs). If None, the calibrated model is loaded.
+
+    Returns a dictionary with the costs in seconds pro operation
+    -------
+
+    """
+    if cost_model is None:
+        import cost_model_funcs as cm  # imported here, it pulls scipy.optimize and the benchmark helpers
+        cost_model = cm.load_cost_model() or {}
+    step_costs = dict(STEP_COSTS)
+    for name, (func_name, feature) in CALIBRATED_STEP_COSTS.items():
+        if func_name in cost_model and cost_model[func_name][feature] > 0:
+            step_costs[name] = float(cost_model[func_name][feature])
+    return step_costs
+
+
+def get_chain_dimensions(matrices):
+    """
+    Gets the dimensions of a matrix chain: matrix i has the shape (dimensions[i], dimensions[i + 1]).
+    Parameters
+    ----------
+    matrices - a list of numpy 2-dim matrices or SciPy sparse matrices
+
+    Returns a list of integers
+    -------
+
+    """
+    dimensions = [matrices[0].shape[0]]
+    for i, matrix in enumerate(matrices):
+        if matrix.shape[0] != dimensions[-1]:
+            raise ValueError("Matrix {0} has {1} rows, expected {2}".format(i, matrix.shape[0], dimensions[-1]))
+        dimensions.append(matrix.shape[1])
+    return dimensions
+
+
+def get_chain_densities(matrices, dimensions):
+    """
+    Predicts the densities of the products of all sub chains.
+    Parameters
+    ----------
+    matrices - the matrices of the chain
+    dimensions - the dimensions of the chain (see get_chain_dimensions)
+
+    Returns a dictionary with the sub chains (first, last) as keys and the densities as values
+    -------
+
+    """
+    densities = {}
+    for first, matrix in enumerate(matrices):
+        densities[first, first] = mf.estimate_density(matrix)
+        for last in range(first + 1, len(matrices)):
+            densities[first, last] = predict_product_density(densities[first, last - 1],
+                                                             mf.estimate_density(matrices[last]),
+                                                             dimensions[last])
+    return densities
+
+
+def predict_product_density(density_1, density_2, inner):
+    """
+    Predicts the density of a product, assuming independently scattered non zero entries: an entry of the product
+    is zero if none of the inner products of its row and column meet.
+    Parameters
+    ----------
+    density_1 - share of the non zero entries in the first matrix
+    density_2 - share of the non zero entries in the second matrix
+    inner - number of columns of the first matrix (rows of the second matrix)
+
+    Returns the predicted share of the non zero entries in the product
+    -------
+
+    """
+    probability = density_1 * density_2
+    if probability >= 1:
+        return 1.0
+    return float(-np.expm1(inner * np.log1p(-probability)))
+
+
+def get_chain_format(matrix):
+    """
+    Gets the chain format of a matrix. Sparse matrices in other formats count as CSR, they are converted when
+    they are multiplied.
+    Parameters
+    ----------
+    matrix - numpy 2-dim matrix or SciPy sparse matrix
+
+    Returns 'dense', 'csr' or 'csc'
+    -------
+
+    """
+    if not sparse.issparse(matrix):
+        return 'dense'
+    return matrix.format if matrix.format in CHAIN_FORMATS else 'csr'
+
+
+def convert_chain_matrix(matrix, matrix_format):
+    """
+    Converts a matrix to a chain format.
+    Parameters
+    ----------
+    matrix - numpy 2-dim matrix or SciPy sparse matrix
+    matrix_format - 'dense', 'csr' or 'csc'
+
+    Returns a numpy array or a SciPy sparse matrix
+    -------
+
+    """
+    if matrix_format == 'dense':
+        return matrix.toarray() if sparse.issparse(matrix) else np.asarray(matrix)
+    if sparse.issparse(matrix):
+        return matrix.asformat(matrix_format)
+    return sparse.csr_matrix(matrix) if matrix_format == 'csr' else sparse.csc_matrix(matrix)
+
+
+def multiply_chain(matrices, output='dense', step_costs=None):
+    """
+    Plans and multiplies a matrix chain (see ChainPlan).
+    Parameters
+    ----------
+    matrices - a list of numpy 2-dim matrices or SciPy sparse matrices
+    output - the format of the result: 'dense', 'csr', 'csc' or 'auto'
+    step_costs - a dictionary with the costs of the elementary operations. If None, the costs are taken from the
+                 calibrated cost model (see get_step_costs).
+
+    Returns a numpy array or a sparse matrix
+    -------
+
+    """
+    return ChainPlan(matrices, output, step_costs).multiply(matrices)
+
+
+def multiply_chain_left_to_right(matrices, output='dense'):
+    """
+    Multiplies a matrix chain from left to right, every step with the formats of its operands.
+    Parameters
+    ----------
+    matrices - a list of numpy 2-dim matrices or SciPy sparse matrices
+    output - the format of the result: 'dense', 'csr' or 'csc'
+
+    Returns a numpy array or a sparse matrix
+    -------
+
+    """
+    get_chain_dimensions(matrices)
+    return convert_chain_matrix(functools.reduce(lambda left, right: left @ right, matrices), output)
@@ -0,0 +1,249 @@
+"""
+Cost model for the dot product functions in matrix_funcs.py. The model predicts the runtime of each function from
+the matrix shapes and densities and is fitted from the pickled benchmark results.
+
+Calibrate on every host (after running the benchmarks 02, 03 and 04) with:
+
+    python cost_model_funcs.py [results_directory]
+
+The model is saved to cost_model/ and is not under version control, since it holds the timings of one host.
+Without a saved model matrix_funcs.choose_dot_function falls back to its uncalibrated density rules.
+"""
+import functools
+import os
+import re
+import sys
+import numpy as np
+from scipy import optimize
+import io_funcs as io
+
+COST_MODEL_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cost_model/')
+
+COST_MODEL_FILENAME = 'cost_model'
+
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'results/')
+
+DENSE_OPERAND_DENSITY = 0.99  # the dense operand of the benchmarks 03 and 04 has 1% zeros
+
+SPARSE_OPERAND_DENSITY = 0.01  # the sparse operand of the benchmarks 03 and 04 has 99% zeros
+
+CALIBRATION_STRUCTURE = 'uniform'  # the densities above describe the uniformly distributed non zero entries
+
+FUNCTION_KINDS = {'dot_numpy': 'dense',
+                  'dot_scipy_csc_with_conversion': 'conversion',
+                  'dot_scipy_csr_with_conversion': 'conversion',
+                  'dot_scipy_bsr_with_conversion': 'conversion',
+                  'scipy_csc_dot_numpy_with_swap': 'swap',
+                  'scipy_csr_dot_numpy_with_swap': 'swap',
+                  'scipy_bsr_dot_numpy_with_swap': 'swap'}
+
+
+def get_cost_features(func_name, rows, inner, cols, density_1, density_2):
+    """
+    Calculates the cost features of a dot product function. The runtime is modelled as a non-negative linear
+    combination of these features.
+    Parameters
+    ----------
+    func_name - the name of the function in matrix_funcs.py
+    rows - number of rows of the first matrix
+    inner - number of columns of the first matrix (rows of the second matrix)
+    cols - number of columns of the second matrix
+    density_1 - share of the non zero entries in the first matrix
+    density_2 - share of the non zero entries in the second matrix
+
+    Returns a numpy array with the features
+    -------
+
+    """
+    kind = FUNCTION_KINDS[func_name]
+    if kind == 'dense':
+        # constant overhead, multiply-adds
+        features = [1.0, rows * inner * cols]
+    elif kind == 'conversion':
+        # constant overhead, scan of both operands, expected sparse products, dense result
+        features = [1.0, rows * inner + inner * cols, rows * inner * cols * density_1 * density_2, rows * cols]
+    else:
+        # constant overhead, scan of the sparse operand, sparse x dense products, dense result
+        features = [1.0, inner * cols, rows * inner * cols * density_2, rows * cols]
+    return np.array(features, dtype=float)
+
+
+def predict_cost(cost_model, func_name, rows, inner, cols, density_1, density_2):
+    """
+    Predicts the runtime of a dot product function.
+    Parameters
+    ----------
+    cost_model - a dictionary with the function names as keys and the fitted coefficients as values
+    func_name, rows, inner, cols, density_1, density_2 - see get_cost_features
+
+    Returns the predicted runtime in seconds
+    -------
+
+    """
+    features = get_cost_features(func_name, rows, inner, cols, density_1, density_2)
+    return float(np.dot(cost_model[func_name], features))
+
+
+def fit_cost_model(samples):
+    """
+    Fits the coefficients of each function by non-negative least squares on the relative error, so the small
+    matrices weigh as much as the large ones.
+    Parameters
+    ----------
+    samples - a dictionary with the function names as keys and lists of (features, runtime) tuples as values
+
+    Returns a dictionary with the function names as keys and the coefficients as values
+    -------
+
+    """
+    cost_model = {}
+    for func_name, func_samples in samples.items():
+        if not func_samples:
+            continue
+        features = np.array([f for f, runtime in func_samples])
+        runtimes = np.array([runtime for f, runtime in func_samples])
+        weighted = features / runtimes[:, np.newaxis]
+        scale = weighted.max(axis=0)
+        scale[scale == 0] = 1
+        coefficients, residual = optimize.nnls(weighted / scale, np.ones(len(runtimes)))
+        cost_model[func_name] = coefficients / scale
+    return cost_model
+
+
+def get_latest_results_directory(results_directory, benchmark_directory, structure=CALIBRATION_STRUCTURE):
+    """
+    Gets the directory of the latest run of a benchmark. The benchmarks save the results of each sparsity structure
+    in a subdirectory of the run, runs without these subdirectories are read directly.
+    Parameters
+    ----------
+    results_directory - path to the results directory
+    benchmark_directory - the subdirectory of the benchmark, e.g. '03_DenseDotSparseBenchmark'
+    structure - the sparsity structure whose results are read
+
+    Returns the path of the latest run or None if the benchmark was never run
+    -------
+
+    """
+    path = os.path.join(results_directory, benchmark_directory)
+    if not os.path.isdir(path):
+        return None
+    runs = sorted(run for run in os.listdir(path) if os.path.isdir(os.path.join(path, run)))
+    if not runs:
+        return None
+    run_path = os.path.join(path, runs[-1]) + '/'
+    if os.path.isdir(run_path + structure):
+        return run_path + structure + '/'
+    return run_path
+
+
+def read_table_values(path, pattern):
+    """
+    Reads the distinct values of a column from a summery table, in the order of their first occurrence.
+    Parameters
+    ----------
+    path - path to the summery table
+    pattern - a regular expression with one group which matches the values
+
+    Returns a list of ints
+    -------
+
+    """
+    with open(path, 'rt') as f:
+        values = [int(value) for value in re.findall(pattern, f.read())]
+    return sorted(set(values), key=values.index)
+
+
+def append_samples(samples, results, sizes, density_1, density_2):
+    """
+    Adds the timings of square matrices to the calibration samples. Skipped timings are ignored.
+    Parameters
+    ----------
+    samples - the calibration samples (see fit_cost_model)
+    results - a dictionary with the function names as keys and lists of (mean, std.) tuples or SkippedTimings
+              as values
+    sizes - the matrix size of each timing
+    density_1, density_2 - the densities of each timing
+    """
+    for func_name, func_results in results.items():
+        if func_name not in FUNCTION_KINDS:
+            continue
+        for result, n, d_1, d_2 in zip(func_results, sizes, density_1, density_2):
+            mean = result[0]
+            if np.isfinite(mean) and mean > 0:
+                samples.setdefault(func_name, []).append((get_cost_features(func_name, n, n, n, d_1, d_2), mean))
+
+
+def collect_calibration_samples(results_directory=RESULTS_DIRECTORY):
+    """
+    Collects the calibration samples from the latest results of the benchmarks 02 (scipy vs. numpy),
+    03 (dense dot sparse) and 04 (matrix swap).
+    Parameters
+    ----------
+    results_directory - path to the results directory
+
+    Returns the calibration samples (see fit_cost_model)
+    -------
+
+    """
+    samples = {}
+    path = get_latest_results_directory(results_directory, '02_scipy_vs_numpy')
+    if path is not None:
+        results = io.load_results_from_pkl(path, 'scipy_vs_numpy_benchmark_results')
+        sparsities = [percent / 100 for percent in
+                      read_table_values(path + 'summery_table_scipy_vs_numpy_benchmark.txt', r'\|\s+(\d+)%\s+\|')]
+        densities = [1 - sparsity for sparsity in sparsities]
+        for key, size_results in results.items():
+            n = int(key.split('x')[0])
+            append_samples(samples, size_results, [n] * len(densities), densities, densities)
+    for benchmark_directory, filename in [('03_DenseDotSparseBenchmark', 'dense_dot_sparse'),
+                                          ('04_MatrixSwapBenchmark', 'matrix_swap_benchmark_results')]:
+        path = get_latest_results_directory(results_directory, benchmark_directory)
+        if path is None:
+            continue
+        results = io.load_results_from_pkl(path, filename)
+        sizes = read_table_values(path + 'summery_table.txt', r'\|\s*n=(\d+)\s*\|')
+        append_samples(samples, results, sizes, [DENSE_OPERAND_DENSITY] * len(sizes),
+                       [SPARSE_OPERAND_DENSITY] * len(sizes))
+    return samples
+
+
+def calibrate_cost_model(results_directory=RESULTS_DIRECTORY, model_directory=COST_MODEL_DIRECTORY):
+    """
+    Fits the cost model from the benchmark results and saves it.
+    Parameters
+    ----------
+    results_directory - path to the results directory
+    model_directory - the directory in which the cost model is saved
+
+    Returns the cost model
+    -------
+
+    """
+    cost_model = fit_cost_model(collect_calibration_samples(results_directory))
+    io.save_results_to_pkl(model_directory, cost_model, COST_MODEL_FILENAME)
+    load_cost_model.cache_clear()
+    return cost_model
+
+
+@functools.lru_cache(maxsize=None)
+def load_cost_model(model_directory=COST_MODEL_DIRECTORY):
+    """
+    Loads the saved cost model.
+    Parameters
+    ----------
+    model_directory - the directory in which the cost model is saved
+
+    Returns the cost model or None if the model was never calibrated
+    -------
+
+    """
+    if not os.path.isfile(model_directory + COST_MODEL_FILENAME + '.pkl'):
+        return None
+    return io.load_results_from_pkl(model_directory, COST_MODEL_FILENAME)
+
+
+if __name__ == '__main__':
+    directory = sys.argv[1] if len(sys.argv) > 1 else RESULTS_DIRECTORY
+    model = calibrate_cost_model(directory)
+    for name, coefficients in sorted(model.items()):
+        print(name, coefficients)
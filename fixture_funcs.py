@@ -0,0 +1,202 @@
+import hashlib
+import os
+import tempfile
+import numpy as np
+from scipy import sparse
+import matrix_funcs as mf
+import memmap_funcs as mm
+
+FIXTURE_DIRECTORY = "fixtures/"
+
+CACHE_SIZE_BUDGET = 4 * 1024 ** 3  # bytes
+
+DEFAULT_SEED = 42
+
+SPARSE_FORMATS = ['coo', 'csr', 'csc']
+
+MEMMAP_STRUCTURES = ['uniform']  # structures which can be generated block by block
+
+
+def get_matrix(rows, cols, percent_zeros=0.99, dtype=int, structure='uniform', seed=DEFAULT_SEED,
+               matrix_format='dense', cache_directory=FIXTURE_DIRECTORY, size_budget=CACHE_SIZE_BUDGET,
+               mmap_mode=None):
+    """
+    Gets a benchmark matrix from the on-disk fixture cache. The matrix is generated and stored on the first
+    request; every later request with the same parameters loads the identical matrix from disk.
+    Parameters
+    ----------
+    rows - number of rows in the matrix
+    cols - number of columns in the matrix
+    percent_zeros - percentage of zeros in the matrix
+    dtype - the data type of the matrix entries
+    structure - the sparsity structure of the matrix (see matrix_funcs.MATRIX_STRUCTURES)
+    seed - seed for the random generator
+    matrix_format - one of 'coo', 'csr', 'csc', 'dense' or 'memmap'. A 'memmap' matrix is generated block by block
+                    directly on disk (uniform structure only) and is always memory-mapped.
+    cache_directory - path to the cache directory
+    size_budget - maximal size of the cache directory in bytes. The least recently used fixtures are evicted.
+    mmap_mode - if given, dense matrices are memory-mapped with this mode (see numpy.load) instead of being read
+
+    Returns a numpy 2-dim matrix or a SciPy sparse matrix
+    -------
+
+    """
+    path = get_fixture_path(cache_directory, rows, cols, percent_zeros, dtype, structure, seed, matrix_format)
+    if os.path.isfile(path):
+        os.utime(path)  # marks the fixture as recently used
+    elif matrix_format == 'memmap':
+        save_memmap_fixture(path, rows, cols, percent_zeros, dtype, structure, seed)
+        evict_least_recently_used(cache_directory, size_budget, keep=path)
+    else:
+        matrix = create_fixture_matrix(rows, cols, percent_zeros, dtype, structure, seed, matrix_format)
+        save_fixture(path, matrix)
+        evict_least_recently_used(cache_directory, size_budget, keep=path)
+    if matrix_format == 'memmap':
+        return mm.load_matrix_memmap(path, mmap_mode or 'r')
+    return load_fixture(path, mmap_mode)
+
+
+def get_fixture_key(rows, cols, percent_zeros, dtype, structure, seed, matrix_format):
+    """
+    Creates the content address of a fixture.
+    Parameters
+    ----------
+    rows - number of rows in the matrix
+    cols - number of columns in the matrix
+    percent_zeros - percentage of zeros in the matrix
+    dtype - the data type of the matrix entries
+    structure - the sparsity structure of the matrix
+    seed - seed for the random generator
+    matrix_format - the matrix format
+
+    Returns a hex digest which identifies the fixture
+    -------
+
+    """
+    description = '{0}x{1}|{2!r}|{3}|{4}|{5}|{6}'.format(rows, cols, float(percent_zeros), np.dtype(dtype).str,
+                                                        structure, seed, matrix_format)
+    return hashlib.sha1(description.encode('utf-8')).hexdigest()
+
+
+def get_fixture_path(cache_directory, rows, cols, percent_zeros, dtype, structure, seed, matrix_format):
+    """
+    Gets the path of the file in which a fixture is stored.
+    Parameters
+    ----------
+    cache_directory - path to the cache directory
+    rows, cols, percent_zeros, dtype, structure, seed, matrix_format - the fixture parameters (see get_matrix)
+
+    Returns the file path
+    -------
+
+    """
+    key = get_fixture_key(rows, cols, percent_zeros, dtype, structure, seed, matrix_format)
+    extension = '.npz' if matrix_format in SPARSE_FORMATS else '.npy'
+    return os.path.join(cache_directory, key + extension)
+
+
+def create_fixture_matrix(rows, cols, percent_zeros, dtype, structure, seed, matrix_format):
+    """
+    Generates the matrix of a fixture.
+    Parameters
+    ----------
+    rows, cols, percent_zeros, dtype, structure, seed, matrix_format - the fixture parameters (see get_matrix)
+
+    Returns a numpy 2-dim matrix or a SciPy sparse matrix
+    -------
+
+    """
+    return mf.create_structured_matrix(structure, rows, cols, percent_zeros, matrix_format, seed=seed, dtype=dtype)
+
+
+def save_fixture(path, matrix):
+    """
+    Saves a fixture to a file. The file is written under a temporary name first, so concurrent benchmark runs
+    never load a half written fixture.
+    Parameters
+    ----------
+    path - the file path
+    matrix - a numpy 2-dim matrix or a SciPy sparse matrix
+
+    """
+    directory = os.path.dirname(path)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    handle, temporary_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    with os.fdopen(handle, 'wb') as f:
+        if sparse.issparse(matrix):
+            sparse.save_npz(f, matrix, compressed=False)
+        else:
+            np.save(f, matrix)
+    os.replace(temporary_path, path)
+
+
+def save_memmap_fixture(path, rows, cols, percent_zeros, dtype, structure, seed):
+    """
+    Generates a fixture block by block directly into its file, without holding the matrix in memory.
+    Parameters
+    ----------
+    path - the file path
+    rows, cols, percent_zeros, dtype, structure, seed - the fixture parameters (see get_matrix)
+
+    """
+    if structure not in MEMMAP_STRUCTURES:
+        raise ValueError("Memory-mapped fixtures support only the uniform structure (currently: {0})"
+                         .format(structure))
+    directory = os.path.dirname(path)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    handle, temporary_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    os.close(handle)
+    matrix = mm.create_matrix_memmap(temporary_path, rows, cols, percent_zeros, dtype, seed)
+    del matrix
+    os.replace(temporary_path, path)
+
+
+def load_fixture(path, mmap_mode=None):
+    """
+    Loads a fixture from a file.
+    Parameters
+    ----------
+    path - the file path
+    mmap_mode - memory-map mode for dense fixtures
+
+    Returns a numpy 2-dim matrix or a SciPy sparse matrix
+    -------
+
+    """
+    if path.endswith('.npz'):
+        return sparse.load_npz(path)
+    return np.load(path, mmap_mode=mmap_mode)
+
+
+def evict_least_recently_used(cache_directory, size_budget, keep=None):
+    """
+    Deletes the least recently used fixtures until the cache directory fits into the size budget.
+    Parameters
+    ----------
+    cache_directory - path to the cache directory
+    size_budget - maximal size of the cache directory in bytes
+    keep - path of a fixture that is never deleted
+
+    Returns a list of the deleted files
+    -------
+
+    """
+    entries = []
+    for filename in os.listdir(cache_directory):
+        path = os.path.join(cache_directory, filename)
+        if os.path.splitext(filename)[1] in ('.npy', '.npz') and os.path.isfile(path):
+            status = os.stat(path)
+            entries.append((status.st_mtime, status.st_size, path))
+    total_size = sum(size for mtime, size, path in entries)
+    deleted = []
+    for mtime, size, path in sorted(entries):
+        if total_size <= size_budget:
+            break
+        if keep is not None and os.path.samefile(path, keep):
+            continue
+        os.remove(path)
+        total_size -= size
+        deleted.append(path)
+    return deleted
@@ -0,0 +1,123 @@
+import numpy as np
+from scipy import sparse
+import matrix_funcs as mf
+
+
+class IncrementalProduct(object):
+    """
+    Keeps the dense product of two matrices up to date while rows of the first matrix or columns of the second
+    matrix change. An update recomputes only the affected rows or columns of the product: changed rows of the first
+    matrix are multiplied with the whole second matrix, changed columns of the second matrix with the whole first
+    matrix.
+    """
+
+    def __init__(self, matrix_1, matrix_2, dtype=None):
+        """
+        Parameters
+        ----------
+        matrix_1 - the first matrix, numpy array or SciPy sparse matrix
+        matrix_2 - the second matrix, numpy array or SciPy sparse matrix
+        dtype - if given, the matrices and all updates are converted to this data type
+        """
+        if matrix_1.shape[1] != matrix_2.shape[0]:
+            raise ValueError("Matrices of the shapes {0} and {1} cannot be multiplied".format(matrix_1.shape,
+                                                                                              matrix_2.shape))
+        self.dtype = dtype
+        self.csr_matrix_1 = sparse.csr_matrix(mf.convert_dtype(matrix_1, dtype))
+        self.csc_matrix_2 = sparse.csc_matrix(mf.convert_dtype(matrix_2, dtype))
+        self.cached_csr_matrix_2 = None
+        self.result = mf.format_result(self.csr_matrix_1.dot(self.get_csr_matrix_2()))
+
+    def get_csr_matrix_2(self):
+        """
+        Gets the second matrix in CSR format, for the multiplication of changed rows. The conversion is cached until
+        the next column update.
+        Returns a SciPy CSR matrix
+        -------
+
+        """
+        if self.cached_csr_matrix_2 is None:
+            self.cached_csr_matrix_2 = self.csc_matrix_2.tocsr()
+        return self.cached_csr_matrix_2
+
+    def update_rows(self, rows, new_rows):
+        """
+        Replaces rows of the first matrix and recomputes the same rows of the product.
+        Parameters
+        ----------
+        rows - the indices of the changed rows, without duplicates
+        new_rows - the new rows, numpy array or SciPy sparse matrix with the shape (len(rows), columns)
+
+        Returns the updated product
+        -------
+
+        """
+        rows = get_update_indices(rows, new_rows.shape[0], self.csr_matrix_1.shape[0])
+        new_rows = sparse.csr_matrix(mf.convert_dtype(new_rows, self.dtype))
+        self.csr_matrix_1 = replace_csr_rows(self.csr_matrix_1, rows, new_rows)
+        self.result[rows] = new_rows.dot(self.get_csr_matrix_2()).toarray()
+        return self.result
+
+    def update_columns(self, cols, new_columns):
+        """
+        Replaces columns of the second matrix and recomputes the same columns of the product.
+        Parameters
+        ----------
+        cols - the indices of the changed columns, without duplicates
+        new_columns - the new columns, numpy array or SciPy sparse matrix with the shape (rows, len(cols))
+
+        Returns the updated product
+        -------
+
+        """
+        cols = get_update_indices(cols, new_columns.shape[1], self.csc_matrix_2.shape[1])
+        new_columns = sparse.csc_matrix(mf.convert_dtype(new_columns, self.dtype))
+        # the columns of a CSC matrix are the rows of its transposed CSR matrix
+        self.csc_matrix_2 = replace_csr_rows(self.csc_matrix_2.T, cols, new_columns.T).T
+        self.cached_csr_matrix_2 = None
+        self.result[:, cols] = self.csr_matrix_1.dot(new_columns).toarray()
+        return self.result
+
+
+def get_update_indices(indices, count, size):
+    """
+    Validates the indices of an update. Negative indices count from the end, so -1 and size - 1 are the same row
+    or column and must not appear together.
+    Parameters
+    ----------
+    indices - the indices of the changed rows or columns
+    count - the number of new rows or columns
+    size - the number of rows or columns of the matrix
+
+    Returns the non negative indices as numpy array
+    -------
+
+    """
+    indices = np.asarray(indices, dtype=np.int64).ravel()
+    if len(indices) != count:
+        raise ValueError("{0} indices for {1} new rows or columns".format(len(indices), count))
+    if len(indices) and (indices.min() < -size or indices.max() >= size):
+        raise ValueError("The indices must be smaller than {0}".format(size))
+    indices = indices % size if len(indices) else indices
+    if len(np.unique(indices)) != len(indices):
+        raise ValueError("The indices of an update must not repeat")
+    return indices
+
+
+def replace_csr_rows(csr_matrix, rows, new_rows):
+    """
+    Replaces rows of a CSR matrix. The new rows are appended below the matrix and the rows are selected in the new
+    order, so the replacement costs one pass over the non zero entries.
+    Parameters
+    ----------
+    csr_matrix - a SciPy CSR matrix
+    rows - the indices of the replaced rows
+    new_rows - a SciPy CSR matrix with the new rows
+
+    Returns a new SciPy CSR matrix
+    -------
+
+    """
+    order = np.arange(csr_matrix.shape[0])
+    order[rows] = csr_matrix.shape[0] + np.arange(len(rows))
+    return sparse.vstack([csr_matrix, new_rows], format='csr')[order]
@@ -1,9 +1,24 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from scipy import sparse
-from top_n_funcs import convert_matrix_to_sparse_with_top_n
+from top_n_funcs import top_n_to_csr, stack_csr_rows
+import bsr_funcs as bsr
 
+DENSITY_SAMPLE_SIZE = 10000
 
-def create_matrix(rows, cols, percent_zeros=0.99):
+FALLBACK_DENSITY_THRESHOLD = 0.1
+
+SWAP_TILE_BYTES = 4 * 1024 ** 2  # temporary bytes pro tile of the swap functions
+
+THREAD_POOLS = {}
+
+INT32_INDEX_LIMIT = np.iinfo(np.int32).max  # largest shape and nnz of a sparse matrix with int32 indices
+
+COMPACT_INTEGER_DTYPES = [np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32]  # narrowest first
+
+
+def create_matrix(rows, cols, percent_zeros=0.99, dtype=int):
     """
     Creates a random matrix with a defined percentage of sparsity.
     The matrix contains only zeros and ones.
@@ -12,93 +27,707 @@ def create_matrix(rows, cols, percent_zeros=0.99):
     rows: number of rows in the matrix
     cols: number of columns in the matrix
     percent_zeros: percentage of zeros in the matrix
+    dtype: the data type of the matrix entries
 
     Returns numpy 2-dim matrix
     -------
 
+    """
+    return create_sparse_matrix(rows, cols, percent_zeros, matrix_format='dense', dtype=dtype)
+
+
+def create_sparse_matrix(rows, cols, percent_zeros=0.99, matrix_format='csr', seed=None, dtype=int):
+    """
+    Creates a random 0/1 matrix with exactly int(rows*cols*percent_zeros) zeros. The coordinates of the ones
+    are drawn in a single vectorized sample, so neither time nor memory depends on rows*cols unless a dense
+    matrix is requested.
+    Parameters
+    ----------
+    rows: number of rows in the matrix
+    cols: number of columns in the matrix
+    percent_zeros: percentage of zeros in the matrix
+    matrix_format: one of 'coo', 'csr', 'csc' or 'dense'
+    seed: seed for the random generator. The same seed always yields the same matrix.
+    dtype: the data type of the matrix entries
+
+    Returns a SciPy sparse matrix in the requested format, or a numpy 2-dim matrix for 'dense'
+    -------
+
+    """
+    ones_count = get_ones_count(rows, cols, percent_zeros)
+    size = rows * cols
+    random_generator = np.random.default_rng(seed)
+    if ones_count <= size // 2:
+        linear_indices = np.sort(random_generator.choice(size, ones_count, replace=False))
+    else:
+        # mostly ones: sampling the fewer zeros and taking the complement is cheaper
+        ones_mask = np.ones(size, dtype=bool)
+        ones_mask[random_generator.choice(size, size - ones_count, replace=False)] = False
+        linear_indices = np.flatnonzero(ones_mask)
+    return build_matrix_from_linear_indices(linear_indices, rows, cols, matrix_format, dtype)
+
+
+def get_ones_count(rows, cols, percent_zeros):
+    """
+    Validates the parameters of a matrix generator and calculates the number of ones in the matrix.
+    Parameters
+    ----------
+    rows: number of rows in the matrix
+    cols: number of columns in the matrix
+    percent_zeros: percentage of zeros in the matrix
+
+    Returns the number of ones
+    -------
+
     """
     if percent_zeros < 0 or percent_zeros > 1:
-        raise ValueError
+        raise ValueError("percent_zeros must be between 0 and 1 (currently: {0})".format(percent_zeros))
     if rows <= 0 or cols <= 0:
-        raise ValueError
-    matrix = np.ones([rows,cols], dtype=np.int)
-    desired_ones_count = int(rows*cols*percent_zeros)
-    ones_count = 0
-    while ones_count < desired_ones_count:
-        row = np.random.random_integers(0,rows-1)
-        col = np.random.random_integers(0,cols-1)
-        if matrix[row][col]==1 :
-            matrix[row][col] = 0
-            ones_count+=1
-    return matrix
+        raise ValueError("The matrix dimensions must be positive (currently: {0}x{1})".format(rows, cols))
+    size = rows * cols
+    return size - int(size * percent_zeros)
+
+
+def build_matrix_from_linear_indices(linear_indices, rows, cols, matrix_format='csr', dtype=int):
+    """
+    Builds a 0/1 matrix from the sorted row-major positions of its ones.
+    Parameters
+    ----------
+    linear_indices: sorted array of the positions (row * cols + col) of the ones
+    rows: number of rows in the matrix
+    cols: number of columns in the matrix
+    matrix_format: one of 'coo', 'csr', 'csc' or 'dense'
+    dtype: the data type of the matrix entries
+
+    Returns a SciPy sparse matrix in the requested format, or a numpy 2-dim matrix for 'dense'
+    -------
+
+    """
+    if matrix_format == 'dense':
+        matrix = np.zeros(rows * cols, dtype=dtype)
+        matrix[linear_indices] = 1
+        return matrix.reshape(rows, cols)
+    row_indices, col_indices = np.divmod(linear_indices, cols)
+    data = np.ones(len(linear_indices), dtype=dtype)
+    if matrix_format == 'coo':
+        return sparse.coo_matrix((data, (row_indices, col_indices)), shape=(rows, cols))
+    if matrix_format == 'csr':
+        # the indices are sorted row-major, so the CSR arrays can be built without a COO detour
+        indptr = np.zeros(rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_indices, minlength=rows), out=indptr[1:])
+        return sparse.csr_matrix((data, col_indices, indptr), shape=(rows, cols))
+    if matrix_format == 'csc':
+        return sparse.coo_matrix((data, (row_indices, col_indices)), shape=(rows, cols)).tocsc()
+    raise ValueError("Unknown matrix format: {0}".format(matrix_format))
+
+
+def create_banded_matrix(rows, cols, percent_zeros=0.99, matrix_format='csr', seed=None, dtype=int,
+                         bandwidth=None):
+    """
+    Creates a random 0/1 matrix whose ones lie in a band around the main diagonal.
+    Parameters
+    ----------
+    rows: number of rows in the matrix
+    cols: number of columns in the matrix
+    percent_zeros: percentage of zeros in the matrix
+    matrix_format: one of 'coo', 'csr', 'csc' or 'dense'
+    seed: seed for the random generator
+    dtype: the data type of the matrix entries
+    bandwidth: number of diagonals above and below the main diagonal. By default the narrowest band which holds
+               all ones is used. Ones that do not fit into a given band are spread uniformly outside of it.
+
+    Returns a SciPy sparse matrix in the requested format, or a numpy 2-dim matrix for 'dense'
+    -------
+
+    """
+    ones_count = get_ones_count(rows, cols, percent_zeros)
+    offsets = get_diagonal_offsets_by_distance(rows, cols)
+    if bandwidth is None:
+        lengths = get_diagonal_lengths(rows, cols, offsets)
+        diagonals_count = np.searchsorted(np.cumsum(lengths), ones_count) + 1
+    else:
+        diagonals_count = np.count_nonzero(np.abs(offsets) <= bandwidth)
+    band = get_diagonal_linear_indices(rows, cols, offsets[:diagonals_count])
+    random_generator = np.random.default_rng(seed)
+    linear_indices = select_linear_indices(band, ones_count, rows * cols, random_generator)
+    return build_matrix_from_linear_indices(linear_indices, rows, cols, matrix_format, dtype)
+
+
+def create_diagonal_matrix(rows, cols, percent_zeros=0.99, matrix_format='csr', seed=None, dtype=int):
+    """
+    Creates a random 0/1 matrix which consists of completely filled diagonals at random offsets. Only the last
+    diagonal is filled partially, so that the sparsity is exact.
+    Parameters
+    ----------
+    rows: number of rows in the matrix
+    cols: number of columns in the matrix
+    percent_zeros: percentage of zeros in the matrix
+    matrix_format: one of 'coo', 'csr', 'csc' or 'dense'
+    seed: seed for the random generator
+    dtype: the data type of the matrix entries
+
+    Returns a SciPy sparse matrix in the requested format, or a numpy 2-dim matrix for 'dense'
+    -------
+
+    """
+    ones_count = get_ones_count(rows, cols, percent_zeros)
+    random_generator = np.random.default_rng(seed)
+    offsets = random_generator.permutation(np.arange(-rows + 1, cols))
+    lengths = get_diagonal_lengths(rows, cols, offsets)
+    full_diagonals_count = np.searchsorted(np.cumsum(lengths), ones_count, side='right')
+    full_diagonals = get_diagonal_linear_indices(rows, cols, offsets[:full_diagonals_count])
+    partial_ones_count = ones_count - len(full_diagonals)
+    if partial_ones_count > 0:
+        last_diagonal = get_diagonal_linear_indices(rows, cols, offsets[full_diagonals_count:full_diagonals_count + 1])
+        partial = random_generator.choice(last_diagonal, partial_ones_count, replace=False)
+        full_diagonals = np.concatenate([full_diagonals, partial])
+    return build_matrix_from_linear_indices(np.sort(full_diagonals), rows, cols, matrix_format, dtype)
+
+
+def create_block_diagonal_matrix(rows, cols, percent_zeros=0.99, matrix_format='csr', seed=None, dtype=int,
+                                 block_size=16):
+    """
+    Creates a random 0/1 matrix whose ones lie in square blocks along the main diagonal. Ones that do not fit
+    into the blocks are spread uniformly outside of them.
+    Parameters
+    ----------
+    rows: number of rows in the matrix
+    cols: number of columns in the matrix
+    percent_zeros: percentage of zeros in the matrix
+    matrix_format: one of 'coo', 'csr', 'csc' or 'dense'
+    seed: seed for the random generator
+    dtype: the data type of the matrix entries
+    block_size: number of rows and columns of each block
+
+    Returns a SciPy sparse matrix in the requested format, or a numpy 2-dim matrix for 'dense'
+    -------
+
+    """
+    if block_size <= 0:
+        raise ValueError("block_size must be positive (currently: {0})".format(block_size))
+    ones_count = get_ones_count(rows, cols, percent_zeros)
+    row_indices = np.arange(rows, dtype=np.int64)
+    block_starts = (row_indices // block_size) * block_size
+    lengths = np.clip(np.minimum(block_starts + block_size, cols) - block_starts, 0, None)
+    blocks = concatenate_ranges(row_indices * cols + block_starts, lengths)
+    random_generator = np.random.default_rng(seed)
+    linear_indices = select_linear_indices(blocks, ones_count, rows * cols, random_generator)
+    return build_matrix_from_linear_indices(linear_indices, rows, cols, matrix_format, dtype)
 
 
-def dot_numpy(matrix_1: np.ndarray, matrix_2: np.ndarray):
+def create_power_law_matrix(rows, cols, percent_zeros=0.99, matrix_format='csr', seed=None, dtype=int,
+                            exponent=1.0, max_rounds=10):
+    """
+    Creates a random 0/1 matrix whose row and column degrees follow a power law (Zipf) distribution, such as a
+    user x item matrix. Rows and columns are drawn with probabilities proportional to rank^-exponent.
+    Parameters
+    ----------
+    rows: number of rows in the matrix
+    cols: number of columns in the matrix
+    percent_zeros: percentage of zeros in the matrix
+    matrix_format: one of 'coo', 'csr', 'csc' or 'dense'
+    seed: seed for the random generator
+    dtype: the data type of the matrix entries
+    exponent: the exponent of the power law
+    max_rounds: number of vectorized sampling rounds. Ones still missing afterwards are spread uniformly.
+
+    Returns a SciPy sparse matrix in the requested format, or a numpy 2-dim matrix for 'dense'
+    -------
+
+    """
+    ones_count = get_ones_count(rows, cols, percent_zeros)
+    random_generator = np.random.default_rng(seed)
+    row_weights = get_power_law_weights(rows, exponent, random_generator)
+    col_weights = get_power_law_weights(cols, exponent, random_generator)
+    drawn = np.empty(0, dtype=np.int64)
+    for i in range(max_rounds):
+        missing = ones_count - len(drawn)
+        if missing <= 0:
+            break
+        draws_count = 2 * missing + 16
+        new_rows = random_generator.choice(rows, draws_count, p=row_weights)
+        new_cols = random_generator.choice(cols, draws_count, p=col_weights)
+        candidates = np.concatenate([drawn, new_rows * np.int64(cols) + new_cols])
+        unique_positions = np.unique(candidates, return_index=True)[1]
+        drawn = candidates[np.sort(unique_positions)]  # keeps the order in which the positions were drawn
+    drawn = np.sort(drawn[:ones_count])
+    linear_indices = select_linear_indices(drawn, ones_count, rows * cols, random_generator)
+    return build_matrix_from_linear_indices(linear_indices, rows, cols, matrix_format, dtype)
+
+
+def create_clustered_matrix(rows, cols, percent_zeros=0.99, matrix_format='csr', seed=None, dtype=int,
+                            clusters_count=8):
+    """
+    Creates a random 0/1 matrix whose ones lie in rectangular clusters at random positions. The clusters are
+    sized, so that about half of their cells are ones.
+    Parameters
+    ----------
+    rows: number of rows in the matrix
+    cols: number of columns in the matrix
+    percent_zeros: percentage of zeros in the matrix
+    matrix_format: one of 'coo', 'csr', 'csc' or 'dense'
+    seed: seed for the random generator
+    dtype: the data type of the matrix entries
+    clusters_count: number of clusters
+
+    Returns a SciPy sparse matrix in the requested format, or a numpy 2-dim matrix for 'dense'
+    -------
+
+    """
+    if clusters_count <= 0:
+        raise ValueError("clusters_count must be positive (currently: {0})".format(clusters_count))
+    ones_count = get_ones_count(rows, cols, percent_zeros)
+    random_generator = np.random.default_rng(seed)
+    cluster_share = min(1.0, np.sqrt(2.0 * ones_count / (clusters_count * rows * cols)))
+    cluster_rows = max(1, int(np.ceil(rows * cluster_share)))
+    cluster_cols = max(1, int(np.ceil(cols * cluster_share)))
+    first_rows = random_generator.integers(0, rows - cluster_rows + 1, clusters_count)
+    first_cols = random_generator.integers(0, cols - cluster_cols + 1, clusters_count)
+    cluster_row_indices = (first_rows[:, None] + np.arange(cluster_rows)).ravel()
+    row_starts = cluster_row_indices.astype(np.int64) * cols + np.repeat(first_cols, cluster_rows)
+    clusters = np.unique(concatenate_ranges(row_starts, np.full(len(row_starts), cluster_cols)))
+    linear_indices = select_linear_indices(clusters, ones_count, rows * cols, random_generator)
+    return build_matrix_from_linear_indices(linear_indices, rows, cols, matrix_format, dtype)
+
+
+MATRIX_STRUCTURES = {'uniform': create_sparse_matrix, 'banded': create_banded_matrix,
+                     'diagonal': create_diagonal_matrix, 'block_diagonal': create_block_diagonal_matrix,
+                     'power_law': create_power_law_matrix, 'clustered': create_clustered_matrix}
+
+
+def create_structured_matrix(structure, rows, cols, percent_zeros=0.99, matrix_format='csr', seed=None,
+                             dtype=int):
+    """
+    Creates a random 0/1 matrix with a given sparsity structure.
+    Parameters
+    ----------
+    structure: one of the keys of MATRIX_STRUCTURES
+    rows: number of rows in the matrix
+    cols: number of columns in the matrix
+    percent_zeros: percentage of zeros in the matrix
+    matrix_format: one of 'coo', 'csr', 'csc' or 'dense'
+    seed: seed for the random generator
+    dtype: the data type of the matrix entries
+
+    Returns a SciPy sparse matrix in the requested format, or a numpy 2-dim matrix for 'dense'
+    -------
+
+    """
+    if structure not in MATRIX_STRUCTURES:
+        raise ValueError("Unknown matrix structure: {0}".format(structure))
+    return MATRIX_STRUCTURES[structure](rows, cols, percent_zeros, matrix_format, seed=seed, dtype=dtype)
+
+
+def select_linear_indices(preferred, ones_count, size, random_generator):
+    """
+    Selects the positions of the ones in a matrix. The positions are drawn from the preferred positions first;
+    if there are not enough of them, the remaining ones are spread uniformly over all other positions.
+    Parameters
+    ----------
+    preferred: sorted array of distinct preferred positions (row * cols + col)
+    ones_count: number of positions to select
+    size: number of cells in the matrix
+    random_generator: a numpy random Generator
+
+    Returns a sorted array of the selected positions
+    -------
+
+    """
+    if ones_count <= len(preferred):
+        return np.sort(random_generator.choice(preferred, ones_count, replace=False))
+    ranks = random_generator.choice(size - len(preferred), ones_count - len(preferred), replace=False)
+    # the k-th position which is not preferred equals k plus the number of preferred positions before it
+    gaps = preferred - np.arange(len(preferred))
+    others = ranks + np.searchsorted(gaps, ranks, side='right')
+    return np.sort(np.concatenate([preferred, others]))
+
+
+def concatenate_ranges(starts, lengths):
+    """
+    Concatenates the ranges [start, start + length) without a python loop.
+    Parameters
+    ----------
+    starts: array with the first value of each range
+    lengths: array with the length of each range
+
+    Returns a 1-dim array
+    -------
+
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + np.arange(offsets.size) - offsets
+
+
+def get_diagonal_offsets_by_distance(rows, cols):
+    """
+    Gets all diagonal offsets of a matrix, ordered by their distance from the main diagonal.
+    Parameters
+    ----------
+    rows: number of rows in the matrix
+    cols: number of columns in the matrix
+
+    Returns an array of offsets
+    -------
+
+    """
+    offsets = np.arange(-rows + 1, cols)
+    return offsets[np.argsort(np.abs(offsets), kind='stable')]
+
+
+def get_diagonal_lengths(rows, cols, offsets):
+    """
+    Calculates the number of cells on diagonals of a matrix.
+    Parameters
+    ----------
+    rows: number of rows in the matrix
+    cols: number of columns in the matrix
+    offsets: the diagonal offsets (0 is the main diagonal, positive offsets lie above it)
+
+    Returns an array with the length of each diagonal
+    -------
+
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    return np.minimum(rows, cols - offsets) - np.maximum(0, -offsets)
+
+
+def get_diagonal_linear_indices(rows, cols, offsets):
+    """
+    Gets the positions (row * cols + col) of all cells on the given diagonals.
+    Parameters
+    ----------
+    rows: number of rows in the matrix
+    cols: number of columns in the matrix
+    offsets: the diagonal offsets
+
+    Returns a sorted array of positions
+    -------
+
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    first_rows = np.maximum(0, -offsets)
+    lengths = get_diagonal_lengths(rows, cols, offsets)
+    # walking along a diagonal advances the position by cols + 1
+    steps = concatenate_ranges(np.zeros(len(offsets)), lengths) * (cols + 1)
+    return np.sort(np.repeat(first_rows * cols + first_rows + offsets, lengths) + steps)
+
+
+def get_power_law_weights(count, exponent, random_generator):
+    """
+    Creates normalized power law weights, randomly assigned to the indices 0..count-1.
+    Parameters
+    ----------
+    count: number of weights
+    exponent: the exponent of the power law
+    random_generator: a numpy random Generator
+
+    Returns an array of probabilities
+    -------
+
+    """
+    weights = np.arange(1, count + 1, dtype=float) ** -exponent
+    return random_generator.permutation(weights / weights.sum())
+
+
+SPARSE_MATRIX_TYPES = {'csr': sparse.csr_matrix, 'csc': sparse.csc_matrix, 'bsr': sparse.bsr_matrix}
+
+
+class SparseDotPlan(object):
+    """
+    A prepared multiplication with one static operand. The static operand is converted to the sparse format once;
+    every call of multiply only converts the changing operand.
+    """
+
+    def __init__(self, static_matrix, sparse_format='csr', static_side='right', dtype=None):
+        """
+        Parameters
+        ----------
+        static_matrix - the operand which stays the same for all multiplications, numpy array or sparse matrix
+        sparse_format - one of 'csr', 'csc' or 'bsr'
+        static_side - 'right' for products A x static_matrix, 'left' for products static_matrix x A
+        dtype - if given, both operands are converted to this data type
+        """
+        if sparse_format not in SPARSE_MATRIX_TYPES:
+            raise ValueError("Unknown sparse format: {0}".format(sparse_format))
+        if static_side not in ('left', 'right'):
+            raise ValueError("static_side must be 'left' or 'right' (currently: {0})".format(static_side))
+        self.sparse_format = sparse_format
+        self.static_side = static_side
+        self.dtype = dtype
+        self.static_matrix = SPARSE_MATRIX_TYPES[sparse_format](convert_dtype(static_matrix, dtype))
+
+    def multiply(self, matrix, output='dense', out=None):
+        """
+        Multiplies a matrix with the static operand.
+        Parameters
+        ----------
+        matrix - the changing operand, numpy array or sparse matrix
+        output - the format of the result: 'dense', 'csr', 'csc' or 'auto' (see format_result)
+        out - if given, the dense result is written into this array (see format_result)
+
+        Returns a numpy-array or a sparse matrix which results from the dot product
+        -------
+
+        """
+        other = SPARSE_MATRIX_TYPES[self.sparse_format](convert_dtype(matrix, self.dtype))
+        if self.static_side == 'right':
+            sparse_result = other.dot(self.static_matrix)
+        else:
+            sparse_result = self.static_matrix.dot(other)
+        return format_result(sparse_result, output, out)
+
+
+def format_result(sparse_result, output='dense', out=None):
+    """
+    Converts the sparse result of a multiplication to the requested output format.
+    Parameters
+    ----------
+    sparse_result - a SciPy sparse matrix
+    output - one of 'dense', 'csr', 'csc' or 'auto'. 'auto' returns a CSR matrix if it needs less memory than the
+             dense result, otherwise a numpy array.
+    out - a numpy array with the shape and data type of the result. If given, a dense result is written into it
+          instead of a new array; it can only be used with output='dense'.
+
+    Returns a numpy array or a SciPy sparse matrix
+    -------
+
+    """
+    if out is not None and output != 'dense':
+        raise ValueError("out can only be used with output='dense' (currently: {0})".format(output))
+    if output == 'auto':
+        sparse_result = sparse_result.tocsr()
+        rows, cols = sparse_result.shape
+        csr_bytes = get_sparse_bytes(sparse_result)
+        output = 'csr' if csr_bytes < rows * cols * sparse_result.dtype.itemsize else 'dense'
+    if output == 'dense':
+        if out is None:
+            return np.array(sparse_result.todense())
+        out.fill(0)  # SciPy adds the entries to the buffer
+        sparse_result.toarray(out=out)
+        return out
+    if output == 'csr':
+        return sparse_result.tocsr()
+    if output == 'csc':
+        return sparse_result.tocsc()
+    raise ValueError("Unknown output format: {0}".format(output))
+
+
+def convert_dtype(matrix, dtype=None):
+    """
+    Converts a dense or sparse matrix to a data type. The matrix is not copied if it has the data type already.
+    Parameters
+    ----------
+    matrix: numpy-array or SciPy sparse matrix
+    dtype: the data type. None keeps the data type of the matrix.
+
+    Returns the converted matrix
+    -------
+
+    """
+    if dtype is None or matrix.dtype == dtype:
+        return matrix
+    return matrix.astype(dtype)
+
+
+def get_narrowest_dtype(values):
+    """
+    Gets the narrowest data type which represents all values exactly: bool for 0/1 values, the smallest integer type
+    for integer values and float32 for float values without rounding errors. Other values keep their data type.
+    Parameters
+    ----------
+    values - a numpy array
+
+    Returns a numpy data type
+    -------
+
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == 'b' or (values.dtype.kind in 'iuf' and np.all((values == 0) | (values == 1))):
+        return np.dtype(bool)
+    if values.dtype.kind in 'iu':
+        for dtype in COMPACT_INTEGER_DTYPES:
+            if np.iinfo(dtype).min <= values.min() and values.max() <= np.iinfo(dtype).max:
+                return np.dtype(dtype)
+    if values.dtype.itemsize > 4 and values.dtype.kind == 'f' and \
+            np.array_equal(values.astype(np.float32), values, equal_nan=True):
+        return np.dtype(np.float32)
+    return values.dtype
+
+
+def compact_sparse(matrix, matrix_format=None):
+    """
+    Converts a matrix to a compact sparse matrix: the indices are int32 if the shape and the number of non zero
+    entries allow it, the data has the narrowest data type which represents the values (see get_narrowest_dtype).
+    A 0/1 matrix needs 5 bytes pro non zero entry instead of 16 with int64 data and int64 indices.
+    SciPy widens the data to the data type of the other operand in every multiplication, so compact operands should
+    be multiplied with dot_compact.
+    Parameters
+    ----------
+    matrix - numpy 2-dim matrix or SciPy sparse matrix
+    matrix_format - 'csr' or 'csc'. None keeps the format of a CSR or CSC matrix and converts all others to CSR.
+
+    Returns a SciPy CSR or CSC matrix, which shares the arrays that are compact already
+    -------
+
+    """
+    if matrix_format is None:
+        matrix_format = matrix.format if sparse.issparse(matrix) and matrix.format in ('csr', 'csc') else 'csr'
+    if matrix_format not in ('csr', 'csc'):
+        raise ValueError("Only CSR and CSC matrices can be compacted (currently: {0})".format(matrix_format))
+    matrix = SPARSE_MATRIX_TYPES[matrix_format](matrix)
+    index_dtype = np.int32 if max(matrix.shape + (matrix.nnz,)) <= INT32_INDEX_LIMIT else np.int64
+    return SPARSE_MATRIX_TYPES[matrix_format]((matrix.data.astype(get_narrowest_dtype(matrix.data), copy=False),
+                                               matrix.indices.astype(index_dtype, copy=False),
+                                               matrix.indptr.astype(index_dtype, copy=False)), shape=matrix.shape)
+
+
+def get_sparse_bytes(matrix):
+    """
+    Calculates the memory of the arrays of a SciPy CSR, CSC or BSR matrix.
+    Parameters
+    ----------
+    matrix - a SciPy CSR, CSC or BSR matrix
+
+    Returns the size in bytes
+    -------
+
+    """
+    return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+
+
+def dot_compact(matrix_1, matrix_2, output='dense', out=None):
+    """
+    Multiplies matrices of which at least one is compact (see compact_sparse). The product is calculated in at least
+    64 bit (int64, float64 or complex128), so narrow data types neither overflow nor turn a bool product into a
+    logical one. The dense operands are converted to this data type. SciPy widens the data of the sparse operands
+    to it in every call, which makes the multiplication slower than with the default representation: the compact
+    representation saves memory, not time. Of two sparse operands the first one is converted.
+    Parameters
+    ----------
+    matrix_1 - the first matrix, numpy array or SciPy sparse matrix
+    matrix_2 - the second matrix, numpy array or SciPy sparse matrix
+    output - the format of a sparse result: 'dense', 'csr', 'csc' or 'auto' (see format_result)
+    out - if given, the dense result is written into this array
+
+    Returns a numpy array or a SciPy sparse matrix, which is the result of the matrix multiplication.
+    -------
+
+    """
+    dtype = np.result_type(matrix_1.dtype, matrix_2.dtype, np.int64)
+    if not sparse.issparse(matrix_1) or sparse.issparse(matrix_2):
+        matrix_1 = convert_dtype(matrix_1, dtype)
+    if not sparse.issparse(matrix_2):
+        matrix_2 = convert_dtype(matrix_2, dtype)
+    result = matrix_1 @ matrix_2
+    if sparse.issparse(result):
+        return format_result(result, output, out)
+    return write_result(result, out)
+
+
+def write_result(result, out=None):
+    """
+    Writes a dense result into a preallocated array.
+    Parameters
+    ----------
+    result - a numpy array
+    out - a numpy array with the shape of the result, or None
+
+    Returns out, or the result if out is None
+    -------
+
+    """
+    if out is None:
+        return result
+    np.copyto(out, result)
+    return out
+
+
+def dot_numpy(matrix_1: np.ndarray, matrix_2: np.ndarray, dtype=None, out=None):
     """
     Calculates the dot product using numpy
     Parameters
     ----------
     matrix_1:  numpy-array
     matrix_2:  numpy-array
+    dtype: if given, the matrices are converted to this data type before the multiplication
 
     Returns: a numpy-array which results from the dot product
     -------
 
     """
-    return np.dot(matrix_1, matrix_2)
+    matrix_1, matrix_2 = convert_dtype(matrix_1, dtype), convert_dtype(matrix_2, dtype)
+    return np.dot(matrix_1, matrix_2, out=out)
 
 
-def dot_scipy_csc_with_conversion(matrix_1: np.ndarray, matrix_2: np.ndarray):
+def dot_scipy_csc_with_conversion(matrix_1: np.ndarray, matrix_2: np.ndarray, dtype=None, output='dense',
+                                  out=None):
     """
     Calculates the dot product by converting the parameters to compressed Sparse Column matrices
     Parameters
     ----------
     matrix_1:  numpy-array
     matrix_2:  numpy-array
+    dtype: if given, the matrices are converted to this data type before the multiplication
+    output: the format of the result: 'dense', 'csr', 'csc' or 'auto' (see format_result)
+    out: if given, the dense result is written into this array (see format_result)
 
-    Returns: a numpy-array which results from the dot product
+    Returns: a numpy-array or a sparse matrix which results from the dot product
     -------
 
     """
+    matrix_1, matrix_2 = convert_dtype(matrix_1, dtype), convert_dtype(matrix_2, dtype)
     sparse_result = sparse.csc_matrix(matrix_1).dot(sparse.csc_matrix(matrix_2))
-    return np.array(sparse_result.todense())
+    return format_result(sparse_result, output, out)
 
 
-def dot_scipy_bsr_with_conversion(matrix_1: np.ndarray, matrix_2: np.ndarray):
+def dot_scipy_bsr_with_conversion(matrix_1: np.ndarray, matrix_2: np.ndarray, dtype=None, output='dense',
+                                  blocksize=None, out=None):
     """
     Calculates the dot product by converting the parameters to Block Sparse Row matrices
     Parameters
     ----------
     matrix_1:  numpy-array
     matrix_2:  numpy-array
+    dtype: if given, the matrices are converted to this data type before the multiplication
+    output: the format of the result: 'dense', 'csr', 'csc' or 'auto' (see format_result)
+    blocksize: the block size of the first matrix. If None, it is autotuned (see bsr_funcs.get_bsr_blocksize).
+    out: if given, the dense result is written into this array (see format_result)
 
-    Returns: a numpy-array which results from the dot product
+    Returns: a numpy-array or a sparse matrix which results from the dot product
     -------
 
     """
-    sparse_result = sparse.bsr_matrix(matrix_1).dot(sparse.bsr_matrix(matrix_2))
-    return np.array(sparse_result.todense())
+    matrix_1, matrix_2 = convert_dtype(matrix_1, dtype), convert_dtype(matrix_2, dtype)
+    blocksize = blocksize or bsr.get_bsr_blocksize(matrix_1, operation='sparse')
+    sparse_result = sparse.bsr_matrix(matrix_1, blocksize=blocksize).dot(
+        sparse.bsr_matrix(matrix_2, blocksize=bsr.get_matching_blocksize(blocksize, matrix_2.shape)))
+    return format_result(sparse_result, output, out)
 
 
-def dot_scipy_csr_with_conversion(matrix_1: np.ndarray, matrix_2: np.ndarray):
+def dot_scipy_csr_with_conversion(matrix_1: np.ndarray, matrix_2: np.ndarray, dtype=None, output='dense',
+                                  out=None):
     """
     Calculates the dot product by converting the parameters to Compressed Sparse Row sparse matrices
     Parameters
     ----------
     matrix_1:  numpy-array
     matrix_2:  numpy-array
+    dtype: if given, the matrices are converted to this data type before the multiplication
+    output: the format of the result: 'dense', 'csr', 'csc' or 'auto' (see format_result)
+    out: if given, the dense result is written into this array (see format_result)
 
-    Returns: a numpy-array which results from the dot product
+    Returns: a numpy-array or a sparse matrix which results from the dot product
     -------
 
     """
+    matrix_1, matrix_2 = convert_dtype(matrix_1, dtype), convert_dtype(matrix_2, dtype)
     sparse_result = sparse.csr_matrix(matrix_1).dot(sparse.csr_matrix(matrix_2))
-    return np.array(sparse_result.todense())
-
-
+    return format_result(sparse_result, output, out)
 
 
-def scipy_csc_dot_numpy_with_swap(matrix_dense: np.ndarray, matrix_sparse: np.ndarray):
+def scipy_csc_dot_numpy_with_swap(matrix_dense: np.ndarray, matrix_sparse: np.ndarray, dtype=None, out=None):
     """
     Calculates the dot product of two numpy arrays. The matrices are converted to CSC format for fast
     multiplication.
@@ -107,16 +736,19 @@ def scipy_csc_dot_numpy_with_swap(matrix_dense: np.ndarray, matrix_sparse: np.nd
     ----------
     matrix_dense - the first array
     matrix_sparse - the second array.
+    dtype - if given, the matrices are converted to this data type before the multiplication
+    out - if given, the result is written into this array
 
     Returns a numpy array, which is the result of the matrix multiplication.
     -------
 
     """
-    result = sparse.csc_matrix(matrix_sparse.T).dot(matrix_dense.T)
-    return result.T
+    matrix_dense, matrix_sparse = convert_dtype(matrix_dense, dtype), convert_dtype(matrix_sparse, dtype)
+    # the CSC matrix of the transpose is the transposed CSR matrix, the transposition copies nothing
+    return dot_transposed_sparse(sparse.csr_matrix(matrix_sparse).T, matrix_dense, out)
 
 
-def scipy_csr_dot_numpy_with_swap(dense_matrix: np.ndarray, sparse_matrix: np.ndarray):
+def scipy_csr_dot_numpy_with_swap(dense_matrix: np.ndarray, sparse_matrix: np.ndarray, dtype=None, out=None):
     """
     Calculates the dot product of two numpy arrays. The matrices are converted to CSR format for fast
     multiplication.
@@ -125,16 +757,20 @@ def scipy_csr_dot_numpy_with_swap(dense_matrix: np.ndarray, sparse_matrix: np.nd
     ----------
     matrix_dense - the first array
     matrix_sparse - the second array.
+    dtype - if given, the matrices are converted to this data type before the multiplication
+    out - if given, the result is written into this array
 
     Returns a numpy array, which is the result of the matrix multiplication.
     -------
 
     """
-    result = sparse.csr_matrix(sparse_matrix.T).dot(dense_matrix.T)
-    return result.T
+    dense_matrix, sparse_matrix = convert_dtype(dense_matrix, dtype), convert_dtype(sparse_matrix, dtype)
+    # the CSR matrix of the transpose is the transposed CSC matrix, the transposition copies nothing
+    return dot_transposed_sparse(sparse.csc_matrix(sparse_matrix).T, dense_matrix, out)
 
 
-def scipy_bsr_dot_numpy_with_swap(dense_matrix: np.ndarray, sparse_matrix: np.ndarray):
+def scipy_bsr_dot_numpy_with_swap(dense_matrix: np.ndarray, sparse_matrix: np.ndarray, dtype=None, blocksize=None,
+                                  out=None):
     """
     Calculates the dot product of two numpy arrays. The matrices are converted to BSR format for fast
     multiplication.
@@ -142,71 +778,462 @@ def scipy_bsr_dot_numpy_with_swap(dense_matrix: np.ndarray, sparse_matrix: np.nd
     ----------
     matrix_dense - the first array
     matrix_sparse - the second array.
+    dtype - if given, the matrices are converted to this data type before the multiplication
+    blocksize - the block size of the transposed sparse matrix. If None, it is autotuned
+                (see bsr_funcs.get_bsr_blocksize).
+    out - if given, the result is written into this array
 
     Returns a numpy array, which is the result of the matrix multiplication.
     -------
 
     """
-    result = sparse.bsr_matrix(sparse_matrix.T).dot(dense_matrix.T)
-    return result.T
+    dense_matrix, sparse_matrix = convert_dtype(dense_matrix, dtype), convert_dtype(sparse_matrix, dtype)
+    blocksize = blocksize or bsr.get_bsr_blocksize(sparse_matrix.T, operation='dense')
+    return dot_transposed_sparse(sparse.bsr_matrix(sparse_matrix.T, blocksize=blocksize), dense_matrix, out)
 
 
-def scipy_csc_dot_numpy_with_top_n(dense_matrix: np.ndarray, sparse_matrix: np.ndarray, n=20):
+def dot_transposed_sparse(transposed_sparse, dense_matrix, out=None, tile_bytes=SWAP_TILE_BYTES, workers=1,
+                          tiles_pro_worker=4):
     """
-    Calculates the dot product of two Matrices of type numpy array. The first array is convert to a sparse matrix with
-    top N items in every row. Afterwards both matrices are converted to Sparse matrices from type CSC for
-    fast multiplication.
+    Calculates dense_matrix x sparse_matrix as (sparse_matrix^T x dense_matrix^T)^T, so the sparse matrix is on
+    the left. SciPy needs the dense operand C-contiguous. The transpose of an F-contiguous dense matrix is
+    C-contiguous and is used directly. Otherwise the dense matrix is multiplied in row tiles, so SciPy copies one
+    tile at a time instead of the whole transpose, and the tiles are written into a C-contiguous result. With
+    several workers the row tiles are multiplied on a shared thread pool (see get_thread_pool); SciPy's sparse
+    kernels release the GIL, so the tiles run in parallel.
     Parameters
     ----------
-    dense_matrix - The first matrix, which will be converted to a top-n matrix
-    sparse_matrix - the second matrix
-    n = the n value for the top n matrix.
+    transposed_sparse - the transposed sparse matrix, a SciPy CSR, CSC or BSR matrix
+    dense_matrix - the dense matrix, the first factor of the product
+    out - if given, the result is written into this array
+    tile_bytes - maximal size of the temporary arrays of a tile in bytes
+    workers - number of threads. None means all CPUs.
+    tiles_pro_worker - minimal number of tiles pro thread, more tiles even out the load
 
     Returns a numpy array, which is the result of the matrix multiplication.
     -------
 
     """
+    workers = workers or os.cpu_count()
+    rows, cols = dense_matrix.shape[0], transposed_sparse.shape[0]
+    if workers == 1 and dense_matrix.T.flags.c_contiguous:
+        return write_result(transposed_sparse.dot(dense_matrix.T).T, out)
+    result_dtype = np.result_type(transposed_sparse.dtype, dense_matrix.dtype)
+    result = out if out is not None else np.empty((rows, cols), dtype=result_dtype)
+    tile_rows = tile_bytes // ((dense_matrix.shape[1] + cols) * result_dtype.itemsize)
+    if workers > 1:
+        tile_rows = min(tile_rows, -(-rows // (workers * tiles_pro_worker)))
+    tile_rows = max(1, tile_rows)
+
+    def multiply_tile(first_row):
+        tile = dense_matrix[first_row:first_row + tile_rows]
+        result[first_row:first_row + tile_rows] = transposed_sparse.dot(tile.T).T
 
-    convert_matrix_to_sparse_with_top_n(dense_matrix, n)
-    result = sparse.csc_matrix(dense_matrix).dot(sparse.csc_matrix(sparse_matrix))
-    return np.array(result.todense())
+    if workers == 1:
+        for first_row in range(0, rows, tile_rows):
+            multiply_tile(first_row)
+    else:
+        list(get_thread_pool(workers).map(multiply_tile, range(0, rows, tile_rows)))
+    return result
 
 
-def scipy_csr_dot_numpy_with_top_n(dense_matrix: np.ndarray, sparse_matrix: np.ndarray, n=20):
+def get_thread_pool(workers):
     """
-    Calculates the dot product of two Matrices of type numpy array. The first array is convert to a sparse matrix with
-    top N items in every row. Afterwards both matrices are converted to Sparse matrices from type CSR for
-    fast multiplication.
+    Gets the shared thread pool for a number of workers. The pool is created on the first request and reused by
+    all later calls, so the threads are not started within a timing.
     Parameters
     ----------
-    dense_matrix - The first matrix, which will be converted to a top-n matrix
+    workers - number of threads
+
+    Returns a concurrent.futures.ThreadPoolExecutor
+    -------
+
+    """
+    if workers not in THREAD_POOLS:
+        THREAD_POOLS[workers] = ThreadPoolExecutor(max_workers=workers)
+    return THREAD_POOLS[workers]
+
+
+def scipy_csr_dot_numpy_tiled(dense_matrix: np.ndarray, sparse_matrix: np.ndarray, workers=None, dtype=None,
+                              out=None):
+    """
+    Calculates the dot product of two numpy arrays like scipy_csr_dot_numpy_with_swap, but multiplies the row
+    tiles of the dense matrix on a shared thread pool (see dot_transposed_sparse).
+    Parameters
+    ----------
+    dense_matrix - the first array
+    sparse_matrix - the second array.
+    workers - number of threads. None means all CPUs.
+    dtype - if given, the matrices are converted to this data type before the multiplication
+    out - if given, the result is written into this array, the tiles write directly into it
+
+    Returns a numpy array, which is the result of the matrix multiplication.
+    -------
+
+    """
+    dense_matrix, sparse_matrix = convert_dtype(dense_matrix, dtype), convert_dtype(sparse_matrix, dtype)
+    # the CSR matrix of the transpose is the transposed CSC matrix, the transposition copies nothing
+    return dot_transposed_sparse(sparse.csc_matrix(sparse_matrix).T, dense_matrix, out, workers=workers)
+
+
+def get_nnz_balanced_row_blocks(indptr, blocks_count):
+    """
+    Splits the rows of a CSR matrix into blocks with about the same number of non zero entries.
+    Parameters
+    ----------
+    indptr - the index pointer array of the CSR matrix
+    blocks_count - the wanted number of blocks
+
+    Returns a numpy array with the block boundaries: block i holds the rows boundaries[i] to boundaries[i + 1]
+    -------
+
+    """
+    rows = len(indptr) - 1
+    boundaries = np.searchsorted(indptr, np.linspace(0, indptr[-1], blocks_count + 1))
+    boundaries[0], boundaries[-1] = 0, rows
+    return np.unique(np.minimum(boundaries, rows))
+
+
+def scipy_csc_dot_numpy_with_top_n(dense_matrix: np.ndarray, sparse_matrix: np.ndarray, n=20, dtype=None,
+                                   output='dense', out=None):
+    """
+    Calculates the dot product of two Matrices of type numpy array. The top N items in every row of the first array
+    are extracted directly into a sparse matrix, the first array is not modified. Afterwards both matrices are
+    multiplied as Sparse matrices from type CSC.
+    Parameters
+    ----------
+    dense_matrix - The first matrix, whose top-n items are multiplied
     sparse_matrix - the second matrix
     n = the n value for the top n matrix.
+    dtype - if given, the matrices are converted to this data type before the multiplication
+    output - the format of the result: 'dense', 'csr', 'csc' or 'auto' (see format_result)
+    out - if given, the dense result is written into this array (see format_result)
 
-    Returns a numpy array, which is the result of the matrix multiplication.
+    Returns a numpy array or a sparse matrix, which is the result of the matrix multiplication.
+    -------
+
+    """
+    dense_matrix, sparse_matrix = convert_dtype(dense_matrix, dtype), convert_dtype(sparse_matrix, dtype)
+    result = top_n_to_csr(dense_matrix, n).tocsc().dot(sparse.csc_matrix(sparse_matrix))
+    return format_result(result, output, out)
+
+
+def scipy_csr_dot_numpy_with_top_n(dense_matrix: np.ndarray, sparse_matrix: np.ndarray, n=20, dtype=None,
+                                   output='dense', out=None):
+    """
+    Calculates the dot product of two Matrices of type numpy array. The top N items in every row of the first array
+    are extracted directly into a sparse matrix, the first array is not modified. Afterwards both matrices are
+    multiplied as Sparse matrices from type CSR.
+    Parameters
+    ----------
+    dense_matrix - The first matrix, whose top-n items are multiplied
+    sparse_matrix - the second matrix
+    n = the n value for the top n matrix.
+    dtype - if given, the matrices are converted to this data type before the multiplication
+    output - the format of the result: 'dense', 'csr', 'csc' or 'auto' (see format_result)
+    out - if given, the dense result is written into this array (see format_result)
+
+    Returns a numpy array or a sparse matrix, which is the result of the matrix multiplication.
+    -------
+
+    """
+    dense_matrix, sparse_matrix = convert_dtype(dense_matrix, dtype), convert_dtype(sparse_matrix, dtype)
+    result = top_n_to_csr(dense_matrix, n).dot(sparse.csr_matrix(sparse_matrix))
+    return format_result(result, output, out)
+
+
+def dot_with_top_k(matrix_1, matrix_2, k=20, block_rows=256, dtype=None):
+    """
+    Calculates the k highest items in every row of the dot product without materializing the full product. Row
+    tiles of the first matrix are multiplied with the second matrix one after another and only the top k items
+    of every tile row are kept, so the peak memory is bounded by block_rows x columns instead of the full
+    product.
+    Parameters
+    ----------
+    matrix_1 - the first matrix, numpy array or SciPy sparse matrix
+    matrix_2 - the second matrix, numpy array or SciPy sparse matrix
+    k - the number of items kept in every row of the product. If both matrices are sparse, the items are
+        selected among the stored items of the product.
+    block_rows - number of rows of the first matrix which are multiplied at once
+    dtype - if given, the matrices are converted to this data type before the multiplication
+
+    Returns a SciPy CSR matrix with at most k items in every row
     -------
 
     """
-    convert_matrix_to_sparse_with_top_n(dense_matrix, n)
-    result = sparse.csr_matrix(dense_matrix).dot(sparse.csr_matrix(sparse_matrix))
-    return np.array(result.todense())
+    matrix_1, matrix_2 = convert_dtype(matrix_1, dtype), convert_dtype(matrix_2, dtype)
+    if sparse.issparse(matrix_1):
+        matrix_1 = matrix_1.tocsr()
+    if sparse.issparse(matrix_2):
+        matrix_2 = matrix_2.tocsr()
+    blocks = []
+    for first_row in range(0, matrix_1.shape[0], block_rows):
+        # the tile is sparse only if both matrices are sparse
+        tile = matrix_1[first_row:first_row + block_rows] @ matrix_2
+        blocks.append(top_n_to_csr(tile, k))
+    return stack_csr_rows(blocks, matrix_2.shape[1])
 
 
-def scipy_bsr_dot_numpy_with_top_n(dense_matrix: np.ndarray, sparse_matrix: np.ndarray, n=20):
+def scipy_bsr_dot_numpy_with_top_n(dense_matrix: np.ndarray, sparse_matrix: np.ndarray, n=20, dtype=None,
+                                   output='dense', blocksize=None, out=None):
     """
-    Calculates the dot product of two Matrices of type numpy array. The first array is convert to a sparse matrix with
-    top N items in every row. Afterwards both matrices are converted to Sparse matrices from type BSR for
-    fast multiplication.
+    Calculates the dot product of two Matrices of type numpy array. The top N items in every row of the first array
+    are extracted directly into a sparse matrix, the first array is not modified. Afterwards both matrices are
+    multiplied as Sparse matrices from type BSR.
     Parameters
     ----------
-    dense_matrix - The first matrix, which will be converted to a top-n matrix
+    dense_matrix - The first matrix, whose top-n items are multiplied
     sparse_matrix - the second matrix
     n = the n value for the top n matrix.
+    dtype - if given, the matrices are converted to this data type before the multiplication
+    output - the format of the result: 'dense', 'csr', 'csc' or 'auto' (see format_result)
+    blocksize - the block size of the top-n matrix. If None, it is autotuned (see bsr_funcs.get_bsr_blocksize).
+    out - if given, the dense result is written into this array (see format_result)
+
+    Returns a numpy array or a sparse matrix, which is the result of the matrix multiplication.
+    -------
+
+    """
+    dense_matrix, sparse_matrix = convert_dtype(dense_matrix, dtype), convert_dtype(sparse_matrix, dtype)
+    top_n_matrix = top_n_to_csr(dense_matrix, n)
+    blocksize = blocksize or bsr.get_bsr_blocksize(top_n_matrix, operation='sparse')
+    result = top_n_matrix.tobsr(blocksize=blocksize).dot(
+        sparse.bsr_matrix(sparse_matrix, blocksize=bsr.get_matching_blocksize(blocksize, sparse_matrix.shape)))
+    return format_result(result, output, out)
+
+
+# functions which autotune the BSR block size on their first call with an operand (see bsr_funcs.get_bsr_blocksize)
+AUTOTUNED_FUNCTIONS = {dot_scipy_bsr_with_conversion, scipy_bsr_dot_numpy_with_swap, scipy_bsr_dot_numpy_with_top_n}
+
+
+def estimate_density(matrix, sample_size=DENSITY_SAMPLE_SIZE, seed=0):
+    """
+    Estimates the share of the non zero entries in a matrix. Sparse matrices and small dense matrices are counted
+    exactly, large dense matrices are sampled at random positions.
+    Parameters
+    ----------
+    matrix - numpy 2-dim matrix or SciPy sparse matrix
+    sample_size - number of sampled entries
+    seed - seed for the random generator
+
+    Returns the density between 0 and 1
+    -------
+
+    """
+    rows, cols = matrix.shape
+    if rows * cols == 0:
+        return 0.0
+    if sparse.issparse(matrix):
+        return matrix.count_nonzero() / (rows * cols)
+    if rows * cols <= sample_size:
+        return np.count_nonzero(matrix) / (rows * cols)
+    random_generator = np.random.default_rng(seed)
+    sampled_rows = random_generator.integers(0, rows, sample_size)
+    sampled_cols = random_generator.integers(0, cols, sample_size)
+    return np.count_nonzero(matrix[sampled_rows, sampled_cols]) / sample_size
+
+
+def get_dot_candidates(matrix_1, matrix_2):
+    """
+    Gets the dot product functions which can multiply the given matrices. Numpy's dot is never used with a sparse
+    operand, the swap functions require a dense first matrix.
+    Parameters
+    ----------
+    matrix_1 - the first matrix
+    matrix_2 - the second matrix
+
+    Returns a list of functions
+    -------
+
+    """
+    candidates = [dot_scipy_csr_with_conversion, dot_scipy_csc_with_conversion, dot_scipy_bsr_with_conversion]
+    if not sparse.issparse(matrix_1):
+        candidates += [scipy_csr_dot_numpy_with_swap, scipy_csc_dot_numpy_with_swap, scipy_bsr_dot_numpy_with_swap]
+        if not sparse.issparse(matrix_2):
+            candidates.append(dot_numpy)
+    return candidates
+
+
+def choose_dot_function(matrix_1, matrix_2, cost_model=None):
+    """
+    Chooses the dot product function with the lowest predicted runtime.
+    Parameters
+    ----------
+    matrix_1 - the first matrix, numpy array or sparse matrix
+    matrix_2 - the second matrix, numpy array or sparse matrix
+    cost_model - the cost model (see cost_model_funcs). If None, the calibrated model is loaded.
+
+    Returns a function of this module
+    -------
+
+    """
+    import cost_model_funcs as cm  # imported here, it pulls scipy.optimize and the benchmark helpers
+    candidates = get_dot_candidates(matrix_1, matrix_2)
+    density_1, density_2 = estimate_density(matrix_1), estimate_density(matrix_2)
+    if cost_model is None:
+        cost_model = cm.load_cost_model()
+    rows, inner = matrix_1.shape
+    cols = matrix_2.shape[1]
+    modelled = [func for func in candidates if cost_model is not None and func.__name__ in cost_model]
+    if modelled:
+        return min(modelled, key=lambda func: cm.predict_cost(cost_model, func.__name__, rows, inner, cols,
+                                                              density_1, density_2))
+    # no calibrated cost model: dense numpy only if both matrices are dense enough
+    if min(density_1, density_2) >= FALLBACK_DENSITY_THRESHOLD and dot_numpy in candidates:
+        return dot_numpy
+    if density_1 >= FALLBACK_DENSITY_THRESHOLD and scipy_csr_dot_numpy_with_swap in candidates:
+        return scipy_csr_dot_numpy_with_swap
+    return dot_scipy_csr_with_conversion
+
+
+def dot_auto(matrix_1, matrix_2, dtype=None, cost_model=None, out=None):
+    """
+    Calculates the dot product with the function that the cost model predicts to be the fastest for the shapes and
+    densities of the matrices.
+    Parameters
+    ----------
+    matrix_1 - the first matrix, numpy array or sparse matrix
+    matrix_2 - the second matrix, numpy array or sparse matrix
+    dtype - if given, the matrices are converted to this data type before the multiplication
+    cost_model - the cost model (see cost_model_funcs). If None, the calibrated model is loaded.
+    out - if given, the result is written into this array
 
     Returns a numpy array, which is the result of the matrix multiplication.
     -------
 
     """
-    convert_matrix_to_sparse_with_top_n(dense_matrix, n)
-    result = sparse.bsr_matrix(dense_matrix).dot(sparse.bsr_matrix(sparse_matrix))
-    return np.array(result.todense())
\ No newline at end of file
+    func = choose_dot_function(matrix_1, matrix_2, cost_model)
+    return func(matrix_1, matrix_2, dtype=dtype, out=out)
+
+
+def dot_batched(matrices_1, matrices_2, dtype=None, method='auto'):
+    """
+    Calculates the dot products of a batch of matrix pairs with one call. The dense method multiplies two 3-dim
+    stacks with numpy's matmul. The sparse method builds one block-diagonal CSR matrix from the first matrices and
+    multiplies it with the second matrices stacked on top of each other, so the result rows of all pairs come
+    out of one sparse product.
+    Parameters
+    ----------
+    matrices_1 - the first matrices of the pairs: a numpy 3-dim array (batch, rows, inner) or a list of numpy
+                 2-dim matrices or SciPy sparse matrices with the same shape
+    matrices_2 - the second matrices of the pairs, in the same form with the shape (batch, inner, cols)
+    dtype - if given, the matrices are converted to this data type before the multiplication
+    method - 'dense', 'sparse' or 'auto'. 'auto' uses the sparse method if the first matrices are sparser than
+             FALLBACK_DENSITY_THRESHOLD.
+
+    Returns a numpy 3-dim array (batch, rows, cols) with the products
+    -------
+
+    """
+    batch_size, rows, inner = get_batch_shape(matrices_1)
+    batch_size_2, inner_2, cols = get_batch_shape(matrices_2)
+    if batch_size != batch_size_2 or inner != inner_2:
+        raise ValueError("Batches of the shapes {0} and {1} cannot be multiplied".format(
+            (batch_size, rows, inner), (batch_size_2, inner_2, cols)))
+    if method == 'auto':
+        method = 'dense' if estimate_batch_density(matrices_1) >= FALLBACK_DENSITY_THRESHOLD else 'sparse'
+    if method == 'dense':
+        return np.matmul(get_dense_batch(matrices_1, dtype), get_dense_batch(matrices_2, dtype))
+    if method == 'sparse':
+        block_diagonal = get_block_diagonal_batch(matrices_1, dtype)
+        result = block_diagonal.dot(get_stacked_batch(matrices_2, dtype))
+        if sparse.issparse(result):
+            result = result.toarray()
+        return np.asarray(result).reshape(batch_size, rows, cols)
+    raise ValueError("Unknown method: {0}".format(method))
+
+
+def get_batch_shape(matrices):
+    """
+    Gets the shape of a batch of matrices.
+    Parameters
+    ----------
+    matrices - a numpy 3-dim array or a list of 2-dim matrices
+
+    Returns a tuple (batch, rows, cols)
+    -------
+
+    """
+    if isinstance(matrices, np.ndarray):
+        if matrices.ndim != 3:
+            raise ValueError("A batch must have 3 dimensions, not {0}".format(matrices.ndim))
+        return matrices.shape
+    if len(matrices) == 0:
+        raise ValueError("The batch is empty")
+    shapes = set(matrix.shape for matrix in matrices)
+    if len(shapes) != 1:
+        raise ValueError("All matrices of a batch must have the same shape: {0}".format(sorted(shapes)))
+    return (len(matrices),) + shapes.pop()
+
+
+def estimate_batch_density(matrices):
+    """
+    Estimates the share of the non zero entries in a batch of matrices (see estimate_density).
+    Parameters
+    ----------
+    matrices - a numpy 3-dim array or a list of 2-dim matrices
+
+    Returns the density between 0 and 1
+    -------
+
+    """
+    if isinstance(matrices, np.ndarray):
+        return estimate_density(matrices.reshape(-1, matrices.shape[2]))
+    return float(np.mean([estimate_density(matrix) for matrix in matrices]))
+
+
+def get_dense_batch(matrices, dtype=None):
+    """
+    Converts a batch of matrices to a numpy 3-dim array.
+    Parameters
+    ----------
+    matrices - a numpy 3-dim array or a list of 2-dim matrices
+    dtype - if given, the matrices are converted to this data type
+
+    Returns a numpy 3-dim array
+    -------
+
+    """
+    if not isinstance(matrices, np.ndarray):
+        matrices = np.stack([matrix.toarray() if sparse.issparse(matrix) else matrix for matrix in matrices])
+    return convert_dtype(matrices, dtype)
+
+
+def get_block_diagonal_batch(matrices, dtype=None):
+    """
+    Builds one block-diagonal CSR matrix from a batch of matrices.
+    Parameters
+    ----------
+    matrices - a numpy 3-dim array or a list of 2-dim matrices
+    dtype - if given, the matrices are converted to this data type
+
+    Returns a SciPy CSR matrix with the shape (batch * rows, batch * cols)
+    -------
+
+    """
+    batch_size, rows, cols = get_batch_shape(matrices)
+    if not isinstance(matrices, np.ndarray):
+        return convert_dtype(sparse.block_diag(matrices, format='csr'), dtype)
+    matrices = convert_dtype(matrices, dtype)
+    batch, row, col = np.nonzero(matrices)
+    return sparse.csr_matrix((matrices[batch, row, col], (batch * rows + row, batch * cols + col)),
+                             shape=(batch_size * rows, batch_size * cols))
+
+
+def get_stacked_batch(matrices, dtype=None):
+    """
+    Stacks a batch of matrices on top of each other.
+    Parameters
+    ----------
+    matrices - a numpy 3-dim array or a list of 2-dim matrices
+    dtype - if given, the matrices are converted to this data type
+
+    Returns a numpy 2-dim array or a SciPy CSR matrix with the shape (batch * rows, cols)
+    -------
+
+    """
+    if isinstance(matrices, np.ndarray):
+        return convert_dtype(matrices.reshape(-1, matrices.shape[2]), dtype)
+    if any(sparse.issparse(matrix) for matrix in matrices):
+        return convert_dtype(sparse.vstack(matrices, format='csr'), dtype)
+    return convert_dtype(np.vstack(matrices), dtype)
@@ -0,0 +1,362 @@
+import os
+import queue
+import threading
+import numpy as np
+from scipy import sparse
+import matrix_funcs as mf
+
+BLOCK_MEMORY_BUDGET = 256 * 1024 ** 2  # bytes
+
+READ_AHEAD_BLOCKS = 1
+
+STREAMED_OPERAND_SHARE = 0.25  # share of the memory budget for the row blocks of a streamed second matrix
+
+SHARD_FILENAME = 'shard_{0:05d}.npz'
+
+
+def create_matrix_memmap(path, rows, cols, percent_zeros=0.99, dtype=int, seed=None,
+                         memory_budget=BLOCK_MEMORY_BUDGET):
+    """
+    Creates a random 0/1 matrix with exactly int(rows*cols*percent_zeros) zeros directly in a memory-mapped
+    .npy file. The matrix is written in row blocks, so only one block is held in memory at a time.
+    Parameters
+    ----------
+    path - path to the .npy file
+    rows - number of rows in the matrix
+    cols - number of columns in the matrix
+    percent_zeros - percentage of zeros in the matrix
+    dtype - the data type of the matrix entries
+    seed - seed for the random generator
+    memory_budget - maximal size of a row block in bytes
+
+    Returns the matrix as numpy memmap
+    -------
+
+    """
+    ones_count = mf.get_ones_count(rows, cols, percent_zeros)
+    matrix = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(rows, cols))
+    block_rows = get_block_rows(cols, matrix.dtype.itemsize, memory_budget)
+    block_starts = np.arange(0, rows, block_rows)
+    block_sizes = (np.minimum(block_starts + block_rows, rows) - block_starts) * cols
+    random_generator = np.random.default_rng(seed)
+    # distributes the ones over the blocks exactly as a uniform draw over the whole matrix would
+    ones_pro_block = random_generator.multivariate_hypergeometric(block_sizes, ones_count, method='marginals')
+    for first_row, block_size, block_ones_count in zip(block_starts, block_sizes, ones_pro_block):
+        block = np.zeros(block_size, dtype=matrix.dtype)
+        block[random_generator.choice(block_size, block_ones_count, replace=False)] = 1
+        matrix[first_row:first_row + block_size // cols] = block.reshape(-1, cols)
+    matrix.flush()
+    return matrix
+
+
+def load_matrix_memmap(path, mode='r'):
+    """
+    Loads a matrix from a .npy file without reading it into memory.
+    Parameters
+    ----------
+    path - path to the .npy file
+    mode - the memory-map mode (see numpy.load)
+
+    Returns the matrix as numpy memmap
+    -------
+
+    """
+    return np.load(path, mmap_mode=mode)
+
+
+def memmap_to_csr(matrix, memory_budget=BLOCK_MEMORY_BUDGET):
+    """
+    Converts a (memory-mapped) dense matrix to a Compressed Sparse Row matrix block by block, so the dense
+    matrix is never loaded entirely.
+    Parameters
+    ----------
+    matrix - numpy 2-dim matrix or memmap
+    memory_budget - maximal size of a row block in bytes
+
+    Returns a SciPy CSR matrix
+    -------
+
+    """
+    rows, cols = matrix.shape
+    block_rows = get_block_rows(cols, matrix.dtype.itemsize, memory_budget)
+    blocks = [sparse.csr_matrix(np.asarray(matrix[first_row:first_row + block_rows]))
+              for first_row in range(0, rows, block_rows)]
+    return sparse.vstack(blocks, format='csr')
+
+
+def get_block_rows(cols, itemsize, memory_budget=BLOCK_MEMORY_BUDGET):
+    """
+    Calculates how many matrix rows fit into a memory budget.
+    Parameters
+    ----------
+    cols - number of columns in the matrix
+    itemsize - size of one matrix entry in bytes
+    memory_budget - the memory budget in bytes
+
+    Returns the number of rows (at least one)
+    -------
+
+    """
+    return max(1, memory_budget // (cols * itemsize))
+
+
+def streaming_dot(matrix_1, matrix_2, output_path, output_format='dense', memory_budget=BLOCK_MEMORY_BUDGET,
+                  read_ahead=READ_AHEAD_BLOCKS):
+    """
+    Multiplies a matrix which does not fit into memory with a second matrix. The first matrix is read in row
+    blocks, every block is multiplied and its result rows are written to disk before the next block is
+    multiplied. A background thread reads the next blocks while the current block is multiplied.
+    Blocks sparser than matrix_funcs.FALLBACK_DENSITY_THRESHOLD are multiplied as CSR matrices.
+    Parameters
+    ----------
+    matrix_1 - numpy 2-dim matrix or memmap, or a list of paths to CSR row shards (see save_csr_shards)
+    matrix_2 - numpy 2-dim matrix, SciPy sparse matrix or memmap. A memmap is streamed in row blocks as well, for
+               every block of the first matrix.
+    output_path - path to the .npy file of a dense result or to the directory of the CSR result shards
+    output_format - 'dense' for a memory-mapped .npy file or 'csr' for one .npz shard pro block
+    memory_budget - maximal size of the blocks in memory in bytes: the blocks read ahead, the block which is
+                    multiplied and its result. Shards of the first matrix are read as they are.
+    read_ahead - number of blocks which are read ahead by the background thread. 0 reads in the calling thread.
+
+    Returns the result as numpy memmap ('dense') or the list of the result shard paths ('csr')
+    -------
+
+    """
+    if output_format not in ('dense', 'csr'):
+        raise ValueError("Unknown output format: {0}".format(output_format))
+    if isinstance(matrix_1, (list, tuple)):
+        rows, inner = get_csr_shards_shape(matrix_1)
+        blocks = iter_csr_shards(matrix_1)
+    else:
+        rows, inner = matrix_1.shape
+        block_rows = get_streaming_block_rows(inner, matrix_2.shape[1], matrix_1.dtype.itemsize, memory_budget,
+                                              read_ahead)
+        blocks = iter_row_blocks(matrix_1, block_rows)
+    if inner != matrix_2.shape[0]:
+        raise ValueError("Matrices of the shapes {0} and {1} cannot be multiplied".format((rows, inner),
+                                                                                          matrix_2.shape))
+    if sparse.issparse(matrix_2):
+        matrix_2 = matrix_2.tocsr()
+    if read_ahead:
+        blocks = read_ahead_blocks(blocks, read_ahead)
+    result, shard_paths = None, []
+    for first_row, block in blocks:
+        block_result = multiply_streamed_block(block, matrix_2, memory_budget)
+        if output_format == 'csr':
+            shard_paths.append(save_csr_shard(output_path, len(shard_paths), sparse.csr_matrix(block_result)))
+            continue
+        if result is None:
+            result = np.lib.format.open_memmap(output_path, mode='w+', dtype=block_result.dtype,
+                                               shape=(rows, matrix_2.shape[1]))
+        result[first_row:first_row + block_result.shape[0]] = \
+            block_result.toarray() if sparse.issparse(block_result) else block_result
+    if output_format == 'csr':
+        return shard_paths
+    if result is None:
+        result = np.lib.format.open_memmap(output_path, mode='w+', dtype=matrix_2.dtype,
+                                           shape=(rows, matrix_2.shape[1]))
+    result.flush()
+    return result
+
+
+def get_streaming_block_rows(inner, cols, itemsize, memory_budget=BLOCK_MEMORY_BUDGET,
+                             read_ahead=READ_AHEAD_BLOCKS):
+    """
+    Calculates how many rows of the first matrix are streamed at once. The budget holds the blocks which are read
+    ahead, the block which is read by the background thread, the block which is multiplied and its result.
+    Parameters
+    ----------
+    inner - number of columns of the first matrix
+    cols - number of columns of the second matrix
+    itemsize - size of one matrix entry in bytes
+    memory_budget - the memory budget in bytes
+    read_ahead - number of blocks which are read ahead
+
+    Returns the number of rows (at least one)
+    -------
+
+    """
+    blocks_in_memory = read_ahead + 2 if read_ahead else 1
+    return max(1, memory_budget // (blocks_in_memory * inner * itemsize + cols * itemsize))
+
+
+def iter_row_blocks(matrix, block_rows):
+    """
+    Reads a (memory-mapped) dense matrix in row blocks.
+    Parameters
+    ----------
+    matrix - numpy 2-dim matrix or memmap
+    block_rows - number of rows pro block
+
+    Returns a generator of tuples (first row, block as numpy array in memory)
+    -------
+
+    """
+    for first_row in range(0, matrix.shape[0], block_rows):
+        yield first_row, np.array(matrix[first_row:first_row + block_rows])
+
+
+def iter_csr_shards(paths):
+    """
+    Reads CSR row shards one after another.
+    Parameters
+    ----------
+    paths - the paths to the .npz files of the shards, in row order
+
+    Returns a generator of tuples (first row, SciPy CSR matrix)
+    -------
+
+    """
+    first_row = 0
+    for path in paths:
+        shard = sparse.load_npz(path).tocsr()
+        yield first_row, shard
+        first_row += shard.shape[0]
+
+
+def read_ahead_blocks(blocks, read_ahead=READ_AHEAD_BLOCKS):
+    """
+    Reads the items of a generator in a background thread, so reading overlaps with the processing of the
+    previous items. Errors of the generator are raised in the calling thread.
+    Parameters
+    ----------
+    blocks - a generator, e.g. of iter_row_blocks or iter_csr_shards
+    read_ahead - maximal number of items which wait for the calling thread
+
+    Returns a generator with the same items
+    -------
+
+    """
+    items = queue.Queue(maxsize=read_ahead)
+    stopped = threading.Event()
+    end = object()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read():
+        try:
+            for block in blocks:
+                if not put((block, None)):
+                    return
+            put((end, None))
+        except Exception as error:
+            put((None, error))
+
+    thread = threading.Thread(target=read, daemon=True)
+    thread.start()
+    try:
+        while True:
+            block, error = items.get()
+            if error is not None:
+                raise error
+            if block is end:
+                return
+            yield block
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def multiply_streamed_block(block, matrix_2, memory_budget=BLOCK_MEMORY_BUDGET):
+    """
+    Multiplies a row block of the first matrix with the second matrix. A memory-mapped second matrix is read in row
+    blocks and the partial products are summed up.
+    Parameters
+    ----------
+    block - a row block, numpy array or SciPy CSR matrix
+    matrix_2 - numpy 2-dim matrix, SciPy CSR matrix or memmap
+    memory_budget - the memory budget of the streaming multiplication in bytes
+
+    Returns a numpy array or a SciPy sparse matrix
+    -------
+
+    """
+    if not sparse.issparse(block) and mf.estimate_density(block) < mf.FALLBACK_DENSITY_THRESHOLD:
+        block = sparse.csr_matrix(block)
+    if not isinstance(matrix_2, np.memmap):
+        return block.dot(matrix_2)
+    inner_rows = get_block_rows(matrix_2.shape[1], matrix_2.dtype.itemsize,
+                                int(memory_budget * STREAMED_OPERAND_SHARE))
+    result = None
+    for first_row in range(0, matrix_2.shape[0], inner_rows):
+        partial = block[:, first_row:first_row + inner_rows].dot(np.array(matrix_2[first_row:first_row + inner_rows]))
+        result = partial if result is None else result + partial
+    return result
+
+
+def save_csr_shard(directory, index, shard):
+    """
+    Saves one CSR row shard.
+    Parameters
+    ----------
+    directory - the directory of the shards, it is created if necessary
+    index - the index of the shard
+    shard - a SciPy CSR matrix
+
+    Returns the path of the shard
+    -------
+
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, SHARD_FILENAME.format(index))
+    sparse.save_npz(path, shard)
+    return path
+
+
+def save_csr_shards(matrix, directory, rows_pro_shard):
+    """
+    Saves a (memory-mapped) dense or sparse matrix as CSR row shards. Only one shard is held in memory at a time.
+    Parameters
+    ----------
+    matrix - numpy 2-dim matrix, memmap or SciPy sparse matrix
+    directory - the directory of the shards
+    rows_pro_shard - number of rows pro shard
+
+    Returns the list of the shard paths
+    -------
+
+    """
+    if sparse.issparse(matrix):
+        matrix = matrix.tocsr()
+    return [save_csr_shard(directory, index, sparse.csr_matrix(matrix[first_row:first_row + rows_pro_shard]))
+            for index, first_row in enumerate(range(0, matrix.shape[0], rows_pro_shard))]
+
+
+def load_csr_shards(paths):
+    """
+    Loads CSR row shards into one matrix.
+    Parameters
+    ----------
+    paths - the paths to the .npz files of the shards, in row order
+
+    Returns a SciPy CSR matrix
+    -------
+
+    """
+    return sparse.vstack([shard for first_row, shard in iter_csr_shards(paths)], format='csr')
+
+
+def get_csr_shards_shape(paths):
+    """
+    Gets the shape of the matrix stored in CSR row shards, without loading the shards.
+    Parameters
+    ----------
+    paths - the paths to the .npz files of the shards
+
+    Returns a tuple (rows, cols)
+    -------
+
+    """
+    rows, cols = 0, 0
+    for path in paths:
+        with np.load(path) as shard:
+            shard_rows, cols = (int(size) for size in shard['shape'])
+        rows += shard_rows
+    return rows, cols
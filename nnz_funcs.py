@@ -0,0 +1,141 @@
+import numpy as np
+from scipy import sparse
+
+SYMBOLIC_MEMORY_BUDGET = 64 * 1024 ** 2  # bytes of expanded products pro row block of the symbolic pass
+
+NNZ_SAMPLE_SIZE = 1000  # number of sampled rows of the first matrix
+
+
+def count_product_nnz(matrix_1, matrix_2, memory_budget=SYMBOLIC_MEMORY_BUDGET):
+    """
+    Counts the non zero entries in every row of the product exactly, without keeping the product (symbolic pass).
+    The boolean sparsity patterns are multiplied row block by row block, a block holds at most as many
+    products as fit into the memory budget and only its row counts are kept. Cancellations of values are
+    ignored, the count is the number of structurally non zero entries.
+    Parameters
+    ----------
+    matrix_1 - the first matrix, numpy array or SciPy sparse matrix
+    matrix_2 - the second matrix, numpy array or SciPy sparse matrix
+    memory_budget - maximal size of the pattern product of a row block in bytes
+
+    Returns a numpy array with the number of non zero entries pro row of the product
+    -------
+
+    """
+    pattern_1, pattern_2 = get_pattern(matrix_1), get_pattern(matrix_2)
+    rows = pattern_1.shape[0]
+    degrees_2 = np.diff(pattern_2.indptr)
+    entry_rows = np.repeat(np.arange(rows), np.diff(pattern_1.indptr))
+    row_products = np.bincount(entry_rows, weights=degrees_2[pattern_1.indices], minlength=rows)
+    cumulative_products = np.concatenate([[0], np.cumsum(row_products)])
+    counts = np.zeros(rows, dtype=np.int64)
+    # a product entry needs a column index and a boolean value, the row counts are taken before the next block
+    block_products = max(1, memory_budget // (pattern_2.indices.itemsize + 1))
+    first_row = 0
+    while first_row < rows:
+        last_row = int(np.searchsorted(cumulative_products, cumulative_products[first_row] + block_products,
+                                       side='right')) - 1
+        last_row = min(rows, max(first_row + 1, last_row))
+        counts[first_row:last_row] = np.diff(pattern_1[first_row:last_row].dot(pattern_2).indptr)
+        first_row = last_row
+    return counts
+
+
+def estimate_product_nnz(matrix_1, matrix_2, method='degrees', sample_size=NNZ_SAMPLE_SIZE, seed=0):
+    """
+    Estimates the number of non zero entries in the product before it is calculated.
+    'degrees' predicts every row of the product from the row degrees of the second matrix: a column of the product
+    row stays zero if none of the rows of the second matrix which the row of the first matrix reaches has an
+    entry in it, the entries are assumed to be scattered independently. The cost is one pass over the non zero
+    entries of the first matrix.
+    'sample' counts the rows of a random sample of the first matrix exactly (see count_product_nnz) and scales
+    the count to all rows.
+    Parameters
+    ----------
+    matrix_1 - the first matrix, numpy array or SciPy sparse matrix
+    matrix_2 - the second matrix, numpy array or SciPy sparse matrix
+    method - 'degrees' or 'sample'
+    sample_size - number of sampled rows of the first matrix ('sample' only)
+    seed - seed for the random generator ('sample' only)
+
+    Returns the estimated number of non zero entries
+    -------
+
+    """
+    pattern_1, pattern_2 = get_pattern(matrix_1), get_pattern(matrix_2)
+    rows, cols = pattern_1.shape[0], pattern_2.shape[1]
+    if method == 'degrees':
+        if rows == 0 or cols == 0:
+            return 0.0
+        degrees_2 = np.diff(pattern_2.indptr)
+        entry_rows = np.repeat(np.arange(rows), np.diff(pattern_1.indptr))
+        with np.errstate(divide='ignore'):
+            missing = np.log1p(-degrees_2[pattern_1.indices] / cols)
+        # the log probability that a column of a product row stays zero
+        row_missing = np.bincount(entry_rows, weights=missing, minlength=rows)
+        return float(-np.expm1(row_missing).sum() * cols)
+    if method == 'sample':
+        if rows <= sample_size:
+            return float(count_product_nnz(pattern_1, pattern_2).sum())
+        sampled_rows = np.random.default_rng(seed).choice(rows, sample_size, replace=False)
+        return float(count_product_nnz(pattern_1[sampled_rows], pattern_2).sum() * rows / sample_size)
+    raise ValueError("Unknown method: {0}".format(method))
+
+
+def get_pattern(matrix):
+    """
+    Gets the sparsity pattern of a matrix as boolean CSR matrix.
+    Parameters
+    ----------
+    matrix - numpy 2-dim matrix or SciPy sparse matrix
+
+    Returns a SciPy CSR matrix of type bool
+    -------
+
+    """
+    matrix = sparse.csr_matrix(matrix)
+    pattern = sparse.csr_matrix((np.ones(len(matrix.data), dtype=bool), matrix.indices, matrix.indptr),
+                                shape=matrix.shape)
+    pattern.sum_duplicates()
+    pattern.eliminate_zeros()
+    return pattern
+
+
+def get_product_bytes(matrix_1, matrix_2, nnz):
+    """
+    Calculates the memory the product needs as CSR matrix and as dense matrix.
+    Parameters
+    ----------
+    matrix_1 - the first matrix
+    matrix_2 - the second matrix
+    nnz - the (estimated) number of non zero entries in the product
+
+    Returns a dictionary with the formats 'csr' and 'dense' as keys and the sizes in bytes as values
+    -------
+
+    """
+    rows, cols = matrix_1.shape[0], matrix_2.shape[1]
+    itemsize = np.result_type(matrix_1.dtype, matrix_2.dtype).itemsize
+    index_itemsize = 4 if max(nnz, rows, cols) < 2 ** 31 else 8
+    nnz = int(np.ceil(nnz))
+    return {'csr': nnz * (itemsize + index_itemsize) + (rows + 1) * index_itemsize,
+            'dense': rows * cols * itemsize}
+
+
+def choose_product_format(matrix_1, matrix_2, method='degrees'):
+    """
+    Chooses the output format of a product before it is calculated: CSR if it needs less memory than the dense
+    result (like matrix_funcs.format_result with output='auto').
+    Parameters
+    ----------
+    matrix_1 - the first matrix, numpy array or SciPy sparse matrix
+    matrix_2 - the second matrix, numpy array or SciPy sparse matrix
+    method - the estimation method (see estimate_product_nnz)
+
+    Returns a tuple (format, bytes to reserve) with the format 'csr' or 'dense'
+    -------
+
+    """
+    product_bytes = get_product_bytes(matrix_1, matrix_2, estimate_product_nnz(matrix_1, matrix_2, method))
+    output = 'csr' if product_bytes['csr'] < product_bytes['dense'] else 'dense'
+    return output, product_bytes[output]
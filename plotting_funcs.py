@@ -15,7 +15,7 @@ def configure_plot(data_object, x_axis_data, padding=3):
     -------
 
     """
-    markers = ['D', 'p', 's', '*', 'v', '.', 'H']
+    markers = ['D', 'p', 's', '*', 'v', '.', 'H', 'o']
     line_width = 1
     plt.rcParams.update({'font.size': 14})  # Font size
     fig = plt.figure(figsize=(11, 10))  # width and height of plot
@@ -46,6 +46,32 @@ def plot_timing_dense_dot_sparse_benchmark(data_object, items_pro_dimension, res
     io.save_plot_to_file(results_directory, data_object.title, fig)
 
 
+def plot_timing_over(data_object, x_values, results_directory="", log_x=False):
+    """
+    Creates a plot of the timings over the tested values of a benchmark parameter, e.g. the BSR block sizes, the
+    lengths of matrix chains, the batch sizes or the shares of changed rows.
+    Parameters
+    ----------
+    data_object  - an object from type PlotData, containing data such as the results and labels.
+    x_values - the tested values of the parameter
+    results_directory - path to the results directory
+    log_x - if True, the x axis is logarithmic, otherwise every tested value gets a tick
+
+    """
+    fig, line_width, markers = configure_plot(data_object, x_values, padding=0 if log_x else 1)
+    for i, ranked_label in enumerate(data_object.data_ranking):
+        plt.errorbar(x_values, [tup[0] for tup in data_object.results[ranked_label]],
+                     [tup[1] for tup in data_object.results[ranked_label]], alpha=0.5, label=data_object.labels[ranked_label],
+                     marker=markers[i], lw=line_width, markersize=10, elinewidth=2)
+    if log_x:
+        plt.xscale('log')
+    else:
+        plt.xticks(x_values)
+    plt.legend(loc=2, fancybox=True, framealpha=0.8) # add legend with transparent background
+    plt.yscale('log')
+    io.save_plot_to_file(results_directory, data_object.title, fig)
+
+
 def plot_timing_sparse_matrices_benchmark(data_object, items_pro_dimension, sparse_functions, sparsity, results_directory=""):
     """
     Creates a plot for the matrix sparsity benchmark.
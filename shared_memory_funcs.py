@@ -0,0 +1,312 @@
+import atexit
+import multiprocessing
+import os
+from collections import OrderedDict
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from scipy import sparse
+import matrix_funcs as mf
+
+DOT_POOLS = {}
+
+MAX_CACHED_OPERANDS = 4
+
+
+class SharedMemoryDotPool(object):
+    """
+    A reusable process pool that multiplies CSR matrices with dense matrices. The workers attach to the operands in
+    shared memory by name and write their row blocks into a shared output buffer, so no matrix is pickled.
+    Operands which are used in several calls are placed in shared memory once with share or share_cached, all
+    others are copied into shared memory for the call.
+    """
+
+    def __init__(self, workers=None, blocks_pro_worker=4):
+        """
+        Parameters
+        ----------
+        workers - number of processes. None means all CPUs.
+        blocks_pro_worker - number of row blocks pro process, more blocks even out the load
+        """
+        self.workers = workers or os.cpu_count()
+        self.blocks_pro_worker = blocks_pro_worker
+        # the workers must inherit the resource tracker, otherwise every worker starts its own one and reports the
+        # blocks it attached to as leaked
+        resource_tracker.ensure_running()
+        self.pool = multiprocessing.Pool(self.workers)
+        self.shared_matrices = []
+        self.cached_matrices = OrderedDict()
+
+    def share(self, matrix):
+        """
+        Places an operand in shared memory, so it can be used in several calls of multiply without being copied
+        again. The operand stays in shared memory until it is released or the pool is closed.
+        Parameters
+        ----------
+        matrix - a SciPy sparse matrix (the first operand) or a numpy 2-dim array (the second operand)
+
+        Returns a SharedMatrix
+        -------
+
+        """
+        return SharedMatrix(matrix, self.shared_matrices)
+
+    def share_cached(self, matrix, prepare=None, key=None):
+        """
+        Places an operand in shared memory like share, but reuses it as long as the same operand object is passed
+        again. The pool keeps the last MAX_CACHED_OPERANDS operands, older ones are released. A cached operand must
+        not be changed in place.
+        Parameters
+        ----------
+        matrix - the operand
+        prepare - a function which converts the operand before it is placed in shared memory, e.g. transposes it
+        key - distinguishes several preparations of the same operand, e.g. the data type
+
+        Returns a SharedMatrix
+        -------
+
+        """
+        cache_key = (id(matrix), key)
+        if cache_key in self.cached_matrices:
+            self.cached_matrices.move_to_end(cache_key)
+            return self.cached_matrices[cache_key][1]
+        shared_matrix = self.share(matrix if prepare is None else prepare(matrix))
+        # the operand is kept alive, so its id is not reused while it is cached
+        self.cached_matrices[cache_key] = (matrix, shared_matrix)
+        while len(self.cached_matrices) > MAX_CACHED_OPERANDS:
+            self.cached_matrices.popitem(last=False)[1][1].release()
+        return shared_matrix
+
+    def multiply(self, csr_matrix, dense_matrix):
+        """
+        Multiplies a CSR matrix with a dense matrix on the process pool.
+        Parameters
+        ----------
+        csr_matrix - a SciPy CSR matrix or a shared CSR matrix (see share)
+        dense_matrix - a numpy 2-dim array or a shared dense matrix (see share)
+
+        Returns a numpy array with the product
+        -------
+
+        """
+        temporary_matrices, handles = [], []
+        try:
+            if not isinstance(csr_matrix, SharedMatrix):
+                csr_matrix = SharedMatrix(csr_matrix)
+                temporary_matrices.append(csr_matrix)
+            if not isinstance(dense_matrix, SharedMatrix):
+                dense_matrix = SharedMatrix(dense_matrix)
+                temporary_matrices.append(dense_matrix)
+            if csr_matrix.indptr is None or dense_matrix.indptr is not None:
+                raise ValueError("The first operand must be sparse and the second operand dense")
+            result_shape = (csr_matrix.shape[0], dense_matrix.shape[1])
+            result_dtype = np.result_type(csr_matrix.dtype, dense_matrix.dtype)
+            descriptors = csr_matrix.descriptors + dense_matrix.descriptors + \
+                [create_shared_array(result_shape, result_dtype, handles)]
+            boundaries = mf.get_nnz_balanced_row_blocks(csr_matrix.indptr, self.workers * self.blocks_pro_worker)
+            self.pool.starmap(multiply_row_block, [(descriptors, csr_matrix.shape, first_row, last_row)
+                                                   for first_row, last_row in zip(boundaries[:-1], boundaries[1:])])
+            return np.array(np.ndarray(result_shape, result_dtype, buffer=handles[-1].buf))
+        finally:
+            release_handles(handles)
+            for shared_matrix in temporary_matrices:
+                shared_matrix.release()
+
+    def close(self):
+        """
+        Shuts the worker processes down and releases the shared operands.
+        """
+        self.pool.close()
+        self.pool.join()
+        self.cached_matrices.clear()
+        while self.shared_matrices:
+            self.shared_matrices[-1].release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class SharedMatrix(object):
+    """
+    A CSR matrix or a dense matrix which was copied into shared memory. The workers attach to it by name, so it can
+    be used in any number of multiplications without another copy.
+    """
+
+    def __init__(self, matrix, registry=None):
+        """
+        Parameters
+        ----------
+        matrix - a SciPy sparse matrix, which is stored as CSR matrix, or a numpy 2-dim array
+        registry - a list of the shared matrices of a pool. The matrix adds itself and removes itself on release.
+        """
+        self.handles = []
+        self.registry = registry
+        if sparse.issparse(matrix):
+            matrix = sparse.csr_matrix(matrix)
+            self.indptr = matrix.indptr  # the parent balances the row blocks with it
+            arrays = (matrix.data, matrix.indices, matrix.indptr)
+        else:
+            # not made contiguous here, share_array copies a transposed view in the same pass
+            matrix = np.asarray(matrix)
+            self.indptr = None
+            arrays = (matrix,)
+        self.shape, self.dtype = matrix.shape, matrix.dtype
+        try:
+            self.descriptors = [share_array(array, self.handles) for array in arrays]
+        except BaseException:
+            release_handles(self.handles)
+            raise
+        if registry is not None:
+            registry.append(self)
+
+    def get_names(self):
+        """
+        Returns the names of the shared memory blocks
+        -------
+
+        """
+        return [handle.name for handle in self.handles]
+
+    def release(self):
+        """
+        Frees the shared memory and removes the matrix from the registry. Releasing a matrix twice has no effect.
+        """
+        release_handles(self.handles)
+        if self.registry is not None and self in self.registry:
+            self.registry.remove(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+def release_handles(handles):
+    """
+    Closes and frees shared memory blocks.
+    Parameters
+    ----------
+    handles - a list of shared memory handles, it is emptied
+    """
+    while handles:
+        handle = handles.pop()
+        handle.close()
+        handle.unlink()
+
+
+def share_array(array, handles):
+    """
+    Copies a numpy array into a new shared memory block.
+    Parameters
+    ----------
+    array - a numpy array
+    handles - a list, the shared memory handle is appended to it
+
+    Returns a descriptor (name, shape, dtype) with which the workers attach to the array
+    -------
+
+    """
+    descriptor = create_shared_array(array.shape, array.dtype, handles)
+    np.ndarray(array.shape, array.dtype, buffer=handles[-1].buf)[...] = array
+    return descriptor
+
+
+def create_shared_array(shape, dtype, handles):
+    """
+    Creates a new shared memory block for an array.
+    Parameters
+    ----------
+    shape - the shape of the array
+    dtype - the data type of the array
+    handles - a list, the shared memory handle is appended to it
+
+    Returns a descriptor (name, shape, dtype) with which the workers attach to the array
+    -------
+
+    """
+    dtype = np.dtype(dtype)
+    handle = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+    handles.append(handle)
+    return handle.name, tuple(shape), dtype.str
+
+
+def multiply_row_block(descriptors, shape, first_row, last_row):
+    """
+    Runs in a worker: attaches to the shared operands and multiplies one row block of the CSR matrix into the
+    shared output.
+    Parameters
+    ----------
+    descriptors - descriptors of the CSR data, indices and indptr, the dense matrix and the output
+    shape - the shape of the CSR matrix
+    first_row - the first row of the block
+    last_row - the row after the block
+    """
+    handles = [shared_memory.SharedMemory(name=name) for name, array_shape, dtype in descriptors]
+    try:
+        data, indices, indptr, dense_matrix, output = [np.ndarray(array_shape, dtype, buffer=handle.buf) for
+                                                       handle, (name, array_shape, dtype) in
+                                                       zip(handles, descriptors)]
+        start, end = indptr[first_row], indptr[last_row]
+        block = sparse.csr_matrix((data[start:end], indices[start:end], indptr[first_row:last_row + 1] - start),
+                                  shape=(last_row - first_row, shape[1]), copy=False)
+        output[first_row:last_row] = block.dot(dense_matrix)
+        # the views must be released before the shared memory is closed
+        del data, indices, indptr, dense_matrix, output, block
+    finally:
+        for handle in handles:
+            handle.close()
+
+
+def get_dot_pool(workers=None):
+    """
+    Gets the shared process pool for a number of workers. The pool is created on the first request and reused by
+    all later calls.
+    Parameters
+    ----------
+    workers - number of processes. None means all CPUs.
+
+    Returns a SharedMemoryDotPool
+    -------
+
+    """
+    workers = workers or os.cpu_count()
+    if workers not in DOT_POOLS:
+        DOT_POOLS[workers] = SharedMemoryDotPool(workers)
+    return DOT_POOLS[workers]
+
+
+@atexit.register
+def close_dot_pools():
+    """
+    Shuts all shared process pools down.
+    """
+    while DOT_POOLS:
+        DOT_POOLS.popitem()[1].close()
+
+
+def scipy_csr_dot_numpy_processes(dense_matrix: np.ndarray, sparse_matrix: np.ndarray, workers=None, dtype=None):
+    """
+    Calculates the dot product of two numpy arrays like matrix_funcs.scipy_csr_dot_numpy_tiled, but multiplies the
+    row blocks of the transposed sparse matrix on a shared process pool. The transposed operands are placed in
+    shared memory on the first call and reused by later calls with the same arrays (see share_cached), so the
+    arrays must not be changed in place between the calls.
+    Parameters
+    ----------
+    dense_matrix - the first array
+    sparse_matrix - the second array.
+    workers - number of processes. None means all CPUs.
+    dtype - if given, the matrices are converted to this data type before the multiplication
+
+    Returns a numpy array, which is the result of the matrix multiplication.
+    -------
+
+    """
+    pool = get_dot_pool(workers)
+    shared_sparse_matrix = pool.share_cached(
+        sparse_matrix, lambda matrix: sparse.csr_matrix(mf.convert_dtype(matrix, dtype).T), ('sparse', dtype))
+    shared_dense_matrix = pool.share_cached(dense_matrix, lambda matrix: mf.convert_dtype(matrix, dtype).T,
+                                            ('dense', dtype))
+    return pool.multiply(shared_sparse_matrix, shared_dense_matrix).T
@@ -15,6 +15,26 @@ FLOAT_FORMATTING = 5
 
 LEFT = 'l'
 
+BYTES_MOVED = 'Bewegte Bytes'
+
+THROUGHPUT = 'Durchsatz [GB/Sek]'
+
+PEAK_MEMORY = 'Spitzenspeicher [MB]'
+
+RESULT_MEMORY = 'Ergebnisspeicher [MB]'
+
+SPARSE_MEMORY = 'Speicher der dünn besetzten Matrix [MB]'
+
+ROWS_PRO_SECOND = 'Zeilen/Sek'
+
+READ_THROUGHPUT = 'Gelesen [MB/Sek]'
+
+ESTIMATED_NNZ = 'Geschätzte Nicht-Nullen'
+
+RELATIVE_ERROR = 'rel. Fehler [%]'
+
+SKIPPED = 'übersprungen'
+
 
 TableData = namedtuple('TableData', ['functions_labels', 'items_pro_dimension', 'functions_ranked_by_time', 'results',
                                      'timings'])
@@ -204,7 +224,7 @@ def create_table_dense_dot_sparse_benchmark(table_data, index, n):
 
 def create_table_row(table_data, entry, fit_table, index):
     """
-    Adds one row to the results table.
+    Adds one row to the results table. For a skipped test the row shows the reason instead of the timing.
     Parameters
     ----------
     table_data - TableData object containing the results
@@ -215,6 +235,10 @@ def create_table_row(table_data, entry, fit_table, index):
     """
     empty_cell = ''
     tested_func = table_data.functions_labels[entry[1]]
+    reason = getattr(table_data.results[entry[1]][index], 'reason', None)
+    if reason is not None:
+        fit_table.add_row([empty_cell, tested_func, SKIPPED + ': ' + reason, empty_cell, empty_cell])
+        return
     compared_result = table_data.timings[table_data.functions_ranked_by_time[0][1]][index]
     rounded_time_in_sec = round(table_data.timings[entry[1]][index], 5)
     rounded_std_deviation = round(table_data.results[entry[1]][index][1], 5)
@@ -247,4 +271,93 @@ def create_table_row_for_sparse_matrices_benchmark(entry, fit_table, index, tabl
     ])
 
 
+def create_bytes_moved_table(functions_labels, items_pro_dimension, bytes_moved, timings):
+    """
+    Creates a table with the bytes moved by each function and the resulting throughput.
+    Parameters
+    ----------
+    functions_labels - a dictionary with the function names as keys and aliases as values
+    items_pro_dimension - the number of items pro matrix dimension
+    bytes_moved - a dictionary with the function names as keys and a list of bytes (one pro matrix size) as values
+    timings - a dictionary with the function names as keys and a list of timings as values
+
+    Returns a string representation of the table
+    -------
+
+    """
+    table = prettytable.PrettyTable(['n', TESTOBJECT, BYTES_MOVED, THROUGHPUT])
+    table.align[TESTOBJECT] = LEFT
+    for index, n in enumerate(items_pro_dimension):
+        for func_name in sorted(bytes_moved):
+            throughput = bytes_moved[func_name][index] / timings[func_name][index] / 1e9
+            table.add_row([n, functions_labels[func_name], bytes_moved[func_name][index],
+                           round(throughput, 3)])
+    return table.get_string() + "\n"
+
+
+def create_memory_table(functions_labels, items_pro_dimension, memory, column_name=PEAK_MEMORY):
+    """
+    Creates a table with the memory each function needed.
+    Parameters
+    ----------
+    functions_labels - a dictionary with the function names as keys and aliases as values
+    items_pro_dimension - the number of items pro matrix dimension
+    memory - a dictionary with the function names as keys and a list of bytes (one pro matrix size) as values
+    column_name - the header of the memory column
 
+    Returns a string representation of the table
+    -------
+
+    """
+    table = prettytable.PrettyTable(['n', TESTOBJECT, column_name])
+    table.align[TESTOBJECT] = LEFT
+    for index, n in enumerate(items_pro_dimension):
+        for func_name in sorted(memory):
+            table.add_row([n, functions_labels[func_name], round(memory[func_name][index] / 1024 ** 2, 3)])
+    return table.get_string() + "\n"
+
+
+def create_streaming_throughput_table(functions_labels, row_counts, bytes_read, timings):
+    """
+    Creates a table with the rows and the bytes each streaming function processed pro second.
+    Parameters
+    ----------
+    functions_labels - a dictionary with the function names as keys and aliases as values
+    row_counts - the numbers of rows of the streamed matrices
+    bytes_read - a dictionary with the function names as keys and a list of bytes (one pro row count) as values
+    timings - a dictionary with the function names as keys and a list of timings as values
+
+    Returns a string representation of the table
+    -------
+
+    """
+    table = prettytable.PrettyTable(['n', TESTOBJECT, ROWS_PRO_SECOND, READ_THROUGHPUT])
+    table.align[TESTOBJECT] = LEFT
+    for index, n in enumerate(row_counts):
+        for func_name in sorted(bytes_read):
+            table.add_row([n, functions_labels[func_name], int(n / timings[func_name][index]),
+                           round(bytes_read[func_name][index] / timings[func_name][index] / 1024 ** 2, 3)])
+    return table.get_string() + "\n"
+
+
+def create_estimation_error_table(functions_labels, items_pro_dimension, estimates, exact_counts):
+    """
+    Creates a table with the estimates of each estimator and their relative errors.
+    Parameters
+    ----------
+    functions_labels - a dictionary with the estimator names as keys and aliases as values
+    items_pro_dimension - the number of items pro matrix dimension
+    estimates - a dictionary with the estimator names as keys and a list of estimates (one pro matrix size) as values
+    exact_counts - a list with the exact values (one pro matrix size)
+
+    Returns a string representation of the table
+    -------
+
+    """
+    table = prettytable.PrettyTable(['n', TESTOBJECT, ESTIMATED_NNZ, RELATIVE_ERROR])
+    table.align[TESTOBJECT] = LEFT
+    for index, n in enumerate(items_pro_dimension):
+        for func_name in sorted(estimates):
+            error = (estimates[func_name][index] - exact_counts[index]) / max(1, exact_counts[index]) * 100
+            table.add_row([n, functions_labels[func_name], int(round(estimates[func_name][index])), round(error, 2)])
+    return table.get_string() + "\n"
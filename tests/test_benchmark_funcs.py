@@ -1,7 +1,9 @@
+import multiprocessing
 from unittest import TestCase
 import benchmark_funcs as bf
 import mock
 import numpy as np
+from scipy import sparse
 from time import sleep
 
 TWO_SEC = 2
@@ -39,4 +41,84 @@ class TestBenchmarkFuncs(TestCase):
 
 
     def dummy_func(self):
-        pass
\ No newline at end of file
+        pass
+
+    def test_test_performance_skips_when_memory_does_not_fit(self):
+        result = bf.test_performance(self.dummy_func, REPEATS, np.zeros(RANDOM_SIZE), np.zeros(RANDOM_SIZE),
+                                     required_bytes=2 ** 62)
+        self.assertIsInstance(result, bf.SkippedTiming)
+        self.assertTrue(np.isnan(result.mean))
+        self.assertIn('dummy_func', result.reason)
+
+    def test_get_worker_counts(self):
+        worker_counts = bf.get_worker_counts()
+        self.assertEqual(1, worker_counts[0])
+        self.assertEqual(multiprocessing.cpu_count(), worker_counts[-1])
+        self.assertEqual(sorted(set(worker_counts)), worker_counts)
+
+    def test_estimate_dense_baseline_bytes(self):
+        a = np.zeros((10, 20))
+        b = np.zeros((20, 30))
+        self.assertEqual((10 * 30 + 10 * 20 + 20 * 30) * 8, bf.estimate_dense_baseline_bytes(a, b))
+        self.assertEqual(10 * 30 * 8, bf.estimate_dense_result_bytes(a, b))
+
+    def test_estimate_sparse_conversion_bytes(self):
+        matrix = np.eye(10, dtype=np.float64)
+        csr = sparse.csr_matrix(matrix)
+        self.assertEqual(csr.data.nbytes + csr.indices.nbytes + csr.indptr.nbytes,
+                         bf.estimate_sparse_conversion_bytes(matrix))
+
+    def test_get_matrix_bytes(self):
+        dense = np.ones((10, 10), dtype=np.float32)
+        csr = sparse.csr_matrix(dense)
+        self.assertEqual(400, bf.get_matrix_bytes(dense))
+        self.assertEqual(csr.data.nbytes + csr.indices.nbytes + csr.indptr.nbytes, bf.get_matrix_bytes(csr))
+
+    def test_measure_result_bytes(self):
+        identity = np.eye(10)
+        self.assertEqual(800, bf.measure_result_bytes(np.dot, identity, identity))
+        self.assertEqual(bf.get_matrix_bytes(sparse.csr_matrix(identity)),
+                         bf.measure_result_bytes(lambda m1, m2: sparse.csr_matrix(m1 @ m2), identity, identity))
+
+    def test_test_performance_over_workers(self):
+        bf.measure_time = mock.Mock(return_value=2.00)
+        self.assertEqual({1: (EXPECTED_MEAN, EXPECTED_STD), 2: (EXPECTED_MEAN, EXPECTED_STD)},
+                         bf.test_performance_over_workers(self.dummy_func, [1, 2], REPEATS, None, None))
+
+    def test_test_performance_with_setup_gives_every_repeat_fresh_inputs(self):
+        bf.measure_time = mock.Mock(return_value=2.00)
+        setup = mock.Mock(return_value=('a', 'b'))
+        bf.test_performance(self.dummy_func, REPEATS, 1, 2, setup=setup)
+        self.assertEqual(REPEATS, setup.call_count)
+        bf.measure_time.assert_called_with(self.dummy_func, 'a', 'b')
+
+    def test_mutating_function_gets_copies(self):
+        bf.measure_time = mock.Mock(return_value=2.00)
+        func = bf.mutates_inputs(mock.Mock())
+        matrix = np.zeros(RANDOM_SIZE)
+        bf.test_performance(func, REPEATS, matrix, None)
+        passed_matrix = bf.measure_time.call_args[0][1]
+        self.assertIsNot(matrix, passed_matrix)
+        np.testing.assert_array_equal(matrix, passed_matrix)
+
+    def test_warm_up_function_is_called_once_outside_the_timings(self):
+        bf.measure_time = mock.Mock(return_value=2.00)
+        func = mock.Mock()
+        self.assertEqual((2.00, 0.0), bf.test_performance(func, REPEATS, 1, 2, warm_up=True, workers=3))
+        func.assert_called_once_with(1, 2, workers=3)
+        self.assertEqual(REPEATS, bf.measure_time.call_count)
+
+    def test_mutating_function_gets_fresh_inputs_on_each_repeat(self):
+        seen = []
+
+        def increment_in_place(matrix_1, matrix_2):
+            seen.append(matrix_1.copy())
+            matrix_1 += matrix_2
+
+        bf.measure_time = mock.Mock(side_effect=lambda func, matrix_1, matrix_2: func(matrix_1, matrix_2) or 1.0)
+        matrix = np.zeros(RANDOM_SIZE)
+        bf.test_performance(bf.mutates_inputs(increment_in_place), REPEATS, matrix, np.ones(RANDOM_SIZE))
+        self.assertEqual(REPEATS, len(seen))
+        for seen_matrix in seen:
+            np.testing.assert_array_equal(np.zeros(RANDOM_SIZE), seen_matrix)
+        np.testing.assert_array_equal(np.zeros(RANDOM_SIZE), matrix)
@@ -0,0 +1,34 @@
+from unittest import TestCase
+import bitpacked_funcs as bp
+import matrix_funcs as mf
+import nose
+import numpy as np
+from scipy import sparse
+
+
+class TestBitpackedFuncs(TestCase):
+    """Tests for the functions in the module bitpacked_funcs.py"""
+
+    def test_pack_rows(self):
+        matrix = np.zeros((2, 70), dtype=int)
+        matrix[0, [0, 63]] = 1
+        matrix[1, 64] = 5
+        expected = np.array([[1 + 2 ** 63, 0], [0, 1]], dtype=np.uint64)
+        np.testing.assert_array_equal(expected, bp.pack_rows(matrix))
+        np.testing.assert_array_equal(expected, bp.pack_rows(sparse.csr_matrix(matrix)))
+
+    def test_popcount(self):
+        words = np.array([0, 1, 2 ** 64 - 1, 0b1011], dtype=np.uint64)
+        np.testing.assert_array_equal([0, 1, 64, 3], bp.popcount(words))
+
+    def test_bitpacked_dot(self):
+        M1 = mf.create_matrix(50, 130, 0.6)
+        M2 = mf.create_matrix(130, 40, 0.7)
+        expected = np.dot(M1, M2)
+        np.testing.assert_array_equal(expected, bp.dot_bitpacked(M1, M2))
+        np.testing.assert_array_equal(expected, bp.bitpacked_dot(sparse.csr_matrix(M1), M2, memory_budget=1000))
+        np.testing.assert_array_equal(expected > 0, bp.bitpacked_dot(M1, sparse.csc_matrix(M2), 'boolean'))
+
+    @nose.tools.raises(ValueError)
+    def test_bitpacked_dot_unknown_mode(self):
+        bp.bitpacked_dot(np.eye(2), np.eye(2), 'foo')
@@ -0,0 +1,50 @@
+from unittest import TestCase
+import bsr_funcs as bsr
+import matrix_funcs as mf
+import mock
+import numpy as np
+from scipy import sparse
+
+
+class TestBsrFuncs(TestCase):
+    """Tests for the functions in the module bsr_funcs.py"""
+
+    def test_get_candidate_blocksizes(self):
+        self.assertEqual([(1, 1), (2, 2), (4, 4)], bsr.get_candidate_blocksizes((12, 20)))
+        self.assertEqual([(1, 1)], bsr.get_candidate_blocksizes((7, 16)))
+
+    def test_get_bsr_blocksize_is_cached(self):
+        bsr.BLOCKSIZE_CACHE.clear()
+        bsr.LOOKUP_CACHE.clear()
+        matrix = mf.create_structured_matrix('block_diagonal', 64, 64, 0.9, 'dense', seed=1)
+        blocksize = bsr.get_bsr_blocksize(matrix, operation='dense')
+        self.assertIn(blocksize, bsr.get_candidate_blocksizes(matrix.shape))
+        self.assertEqual(1, len(bsr.BLOCKSIZE_CACHE))
+        self.assertEqual(blocksize, bsr.get_bsr_blocksize(sparse.csr_matrix(matrix), operation='dense'))
+        self.assertEqual(1, len(bsr.BLOCKSIZE_CACHE))
+
+    def test_get_bsr_blocksize_lookup_skips_the_sample(self):
+        bsr.BLOCKSIZE_CACHE.clear()
+        bsr.LOOKUP_CACHE.clear()
+        matrix = mf.create_structured_matrix('block_diagonal', 128, 128, 0.9, 'dense', seed=2)
+        blocksize = bsr.get_bsr_blocksize(matrix, operation='sparse')
+        with mock.patch.object(bsr, 'get_tuning_sample', side_effect=AssertionError("sample built on a hit")):
+            self.assertEqual(blocksize, bsr.get_bsr_blocksize(matrix, operation='sparse'))
+        scattered = mf.create_matrix(128, 128, 0.9)
+        self.assertNotEqual(bsr.get_lookup_key(matrix, None, 'sparse'), bsr.get_lookup_key(scattered, None, 'sparse'))
+
+    def test_tuned_bsr_matrix(self):
+        matrix = mf.create_matrix(48, 32, 0.8)
+        np.testing.assert_array_equal(matrix, bsr.tuned_bsr_matrix(matrix).toarray())
+
+    def test_get_block_fill(self):
+        self.assertEqual(1.0, bsr.get_block_fill(sparse.csr_matrix(np.ones((8, 8)))))
+        self.assertEqual(0.2, bsr.get_block_fill(sparse.csr_matrix(np.eye(8))))
+
+    def test_bsr_functions_with_blocksize(self):
+        M1 = mf.create_matrix(32, 16, 0.5)
+        M2 = mf.create_matrix(16, 24, 0.9)
+        expected = np.dot(M1, M2)
+        for blocksize in [(1, 1), (4, 4), (8, 8)]:
+            np.testing.assert_array_equal(expected, mf.dot_scipy_bsr_with_conversion(M1, M2, blocksize=blocksize))
+            np.testing.assert_array_equal(expected, mf.scipy_bsr_dot_numpy_with_swap(M1, M2, blocksize=blocksize))
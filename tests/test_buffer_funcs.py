@@ -0,0 +1,42 @@
+from unittest import TestCase
+import buffer_funcs as buf
+import numpy as np
+from scipy import sparse
+
+
+class TestBufferFuncs(TestCase):
+    """Tests for the functions in the module buffer_funcs.py"""
+
+    def test_acquire_reuses_released_buffer(self):
+        pool = buf.BufferPool()
+        buffer = pool.acquire((3, 4), np.float32)
+        self.assertEqual((3, 4), buffer.shape)
+        self.assertEqual(np.float32, buffer.dtype)
+        pool.release(buffer)
+        self.assertIs(buffer, pool.acquire((3, 4), np.float32))
+        self.assertIsNot(buffer, pool.acquire((3, 4), np.float32))
+
+    def test_acquire_separates_shapes_and_dtypes(self):
+        pool = buf.BufferPool()
+        buffer = pool.acquire((3, 4))
+        pool.release(buffer)
+        self.assertIsNot(buffer, pool.acquire((4, 3)))
+        self.assertIsNot(buffer, pool.acquire((3, 4), np.float32))
+        self.assertIs(buffer, pool.acquire((3, 4)))
+
+    def test_acquire_product(self):
+        pool = buf.BufferPool()
+        buffer = pool.acquire_product(np.ones((5, 2), dtype=np.float32), sparse.csr_matrix(np.ones((2, 7))))
+        self.assertEqual((5, 7), buffer.shape)
+        self.assertEqual(np.float64, buffer.dtype)
+
+    def test_release_keeps_at_most_max_buffers(self):
+        pool = buf.BufferPool(max_buffers_pro_key=1)
+        first, second = pool.acquire((2, 2)), pool.acquire((2, 2))
+        pool.release(first)
+        pool.release(second)
+        self.assertIs(first, pool.acquire((2, 2)))
+        self.assertIsNot(second, pool.acquire((2, 2)))
+        pool.release(first)
+        pool.clear()
+        self.assertIsNot(first, pool.acquire((2, 2)))
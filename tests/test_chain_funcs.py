@@ -0,0 +1,64 @@
+from unittest import TestCase
+import chain_funcs as cf
+import matrix_funcs as mf
+import nose
+import numpy as np
+from scipy import sparse
+
+
+class TestChainFuncs(TestCase):
+    """Tests for the functions in the module chain_funcs.py"""
+
+    def get_chain(self):
+        return [mf.create_matrix(30, 60, 0.1).astype(float),
+                mf.create_sparse_matrix(60, 80, 0.95, 'csr', seed=1).astype(float),
+                mf.create_sparse_matrix(80, 40, 0.95, 'csc', seed=2).astype(float),
+                mf.create_matrix(40, 5, 0.5).astype(float)]
+
+    def test_get_step_costs_from_cost_model(self):
+        cost_model = {'dot_numpy': np.array([0.0, 2e-10]),
+                      'scipy_csr_dot_numpy_with_swap': np.array([1e-3, 1e-8, 3e-9, 0.0])}
+        step_costs = cf.get_step_costs(cost_model)
+        self.assertEqual(2e-10, step_costs['dense_product'])
+        self.assertEqual(3e-9, step_costs['sparse_dense_product'])
+        self.assertEqual(cf.STEP_COSTS['dense_entry'], step_costs['dense_entry'])
+        self.assertEqual(cf.STEP_COSTS['sparse_product'], step_costs['sparse_product'])
+        self.assertEqual(cf.STEP_COSTS, cf.get_step_costs({}))
+
+    def test_multiply_chain_matches_left_to_right(self):
+        matrices = self.get_chain()
+        expected = cf.multiply_chain_left_to_right(matrices)
+        for output in ['dense', 'csr', 'csc', 'auto']:
+            result = cf.multiply_chain(matrices, output)
+            np.testing.assert_allclose(expected, result.toarray() if sparse.issparse(result) else result)
+        self.assertEqual('csc', cf.multiply_chain(matrices, 'csc').format)
+
+    def test_plan_every_step_kind(self):
+        matrices = self.get_chain()
+        expected = cf.multiply_chain_left_to_right(matrices)
+        product_costs = {'dense': 'dense_product', 'sparse_dense': 'sparse_dense_product',
+                         'dense_sparse': 'sparse_dense_product', 'sparse': 'sparse_product'}
+        for kind, product_cost in product_costs.items():
+            # makes the other kinds of steps expensive
+            step_costs = dict(cf.STEP_COSTS, dense_product=1, sparse_dense_product=1, sparse_product=1)
+            step_costs[product_cost] = 1e-9
+            plan = cf.ChainPlan(matrices, step_costs=step_costs)
+            np.testing.assert_allclose(expected, plan.multiply(matrices))
+            self.assertIn('[' + kind + ':', plan.describe())
+
+    def test_plan_prefers_cheap_parenthesization(self):
+        matrices = [np.ones((100, 100)), np.ones((100, 100)), np.ones((100, 1))]
+        self.assertEqual('(A0 x (A1 x A2)[dense:dense])[dense:dense]', cf.ChainPlan(matrices).describe())
+
+    def test_predict_product_density(self):
+        self.assertAlmostEqual(1 - (1 - 0.01) ** 10, cf.predict_product_density(0.1, 0.1, 10))
+        self.assertEqual(1.0, cf.predict_product_density(1.0, 1.0, 10))
+        self.assertEqual(0.0, cf.predict_product_density(0.0, 0.5, 10))
+
+    @nose.tools.raises(ValueError)
+    def test_multiply_chain_mismatching_dimensions(self):
+        cf.multiply_chain([np.ones((2, 3)), np.ones((2, 3))])
+
+    @nose.tools.raises(ValueError)
+    def test_multiply_chain_unknown_output(self):
+        cf.multiply_chain([np.ones((2, 3))], 'foo')
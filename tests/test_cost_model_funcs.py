@@ -0,0 +1,59 @@
+from unittest import TestCase
+import benchmark_funcs as bf
+import cost_model_funcs as cm
+import io_funcs as io
+import numpy as np
+import os
+import shutil
+
+TEST_DIRECTORY = "test_files/"
+
+
+class TestCostModelFuncs(TestCase):
+    """Tests for the functions in the module cost_model_funcs.py"""
+
+    def setUp(self):
+        os.makedirs(TEST_DIRECTORY, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(TEST_DIRECTORY)
+
+    def test_fit_cost_model_recovers_coefficients(self):
+        coefficients = np.array([1e-3, 2e-9])
+        samples = {'dot_numpy': []}
+        for n in [100, 500, 1000, 2000]:
+            features = cm.get_cost_features('dot_numpy', n, n, n, 1, 1)
+            samples['dot_numpy'].append((features, np.dot(coefficients, features)))
+        model = cm.fit_cost_model(samples)
+        np.testing.assert_allclose(coefficients, model['dot_numpy'], rtol=1e-6)
+
+    def test_calibrate_cost_model_from_results(self):
+        run_path = TEST_DIRECTORY + "results/03_DenseDotSparseBenchmark/16-01-01-00-00/"
+        sizes = [100, 200, 400]
+        results = {'dot_numpy': [(2e-9 * n ** 3, 0) for n in sizes],
+                   'dot_scipy_csr_with_conversion': [(1e-8 * n ** 2, 0) for n in sizes]}
+        io.save_results_to_pkl(run_path, results, 'dense_dot_sparse')
+        io.persist_to_text_file(''.join('| n={0}  | Testobjekt |\n'.format(n) for n in sizes), run_path,
+                                'summery_table.txt')
+        model = cm.calibrate_cost_model(TEST_DIRECTORY + "results/", TEST_DIRECTORY + "model/")
+        self.assertEqual({'dot_numpy', 'dot_scipy_csr_with_conversion'}, set(model))
+        self.assertAlmostEqual(2e-9 * 400 ** 3, cm.predict_cost(model, 'dot_numpy', 400, 400, 400, 0.99, 0.01))
+        loaded = cm.load_cost_model(TEST_DIRECTORY + "model/")
+        np.testing.assert_array_equal(model['dot_numpy'], loaded['dot_numpy'])
+
+    def test_append_samples_ignores_skipped_timings(self):
+        samples = {}
+        results = {'dot_numpy': [(0.1, 0.01), bf.SkippedTiming(np.nan, np.nan, 'not enough memory')]}
+        cm.append_samples(samples, results, [100, 200], [1, 1], [1, 1])
+        self.assertEqual(1, len(samples['dot_numpy']))
+        self.assertEqual(0.1, samples['dot_numpy'][0][1])
+
+    def test_get_latest_results_directory_with_structures(self):
+        run_path = TEST_DIRECTORY + "results/03_DenseDotSparseBenchmark/16-01-01-00-00/"
+        os.makedirs(run_path + "uniform/")
+        os.makedirs(run_path + "banded/")
+        self.assertEqual(run_path + "uniform/",
+                         cm.get_latest_results_directory(TEST_DIRECTORY + "results/", "03_DenseDotSparseBenchmark"))
+
+    def test_load_cost_model_missing(self):
+        self.assertIsNone(cm.load_cost_model(TEST_DIRECTORY + "missing/"))
@@ -0,0 +1,53 @@
+from unittest import TestCase
+import fixture_funcs as fx
+import numpy as np
+import os
+import shutil
+
+CACHE_DIRECTORY = "test_fixtures/"
+
+
+class TestFixtureFuncs(TestCase):
+    """Tests for the functions in the module fixture_funcs.py"""
+
+    def tearDown(self):
+        if os.path.exists(CACHE_DIRECTORY):
+            shutil.rmtree(CACHE_DIRECTORY)
+
+    def test_get_matrix_is_reproducible_and_cached(self):
+        first = fx.get_matrix(30, 20, 0.8, seed=3, cache_directory=CACHE_DIRECTORY)
+        os.remove(os.path.join(CACHE_DIRECTORY, os.listdir(CACHE_DIRECTORY)[0]))
+        second = fx.get_matrix(30, 20, 0.8, seed=3, cache_directory=CACHE_DIRECTORY)
+        third = fx.get_matrix(30, 20, 0.8, seed=3, cache_directory=CACHE_DIRECTORY)
+        np.testing.assert_array_equal(first, second)
+        np.testing.assert_array_equal(first, third)
+        self.assertEqual(1, len(os.listdir(CACHE_DIRECTORY)))
+
+    def test_get_matrix_sparse_format_and_dtype(self):
+        matrix = fx.get_matrix(30, 20, 0.8, dtype=np.float32, matrix_format='csr', cache_directory=CACHE_DIRECTORY)
+        self.assertEqual('csr', matrix.format)
+        self.assertEqual(np.float32, matrix.dtype)
+        self.assertEqual(120, matrix.nnz)
+
+    def test_get_matrix_memory_mapped(self):
+        matrix = fx.get_matrix(30, 20, 0.8, cache_directory=CACHE_DIRECTORY, mmap_mode='r')
+        self.assertIsInstance(matrix, np.memmap)
+
+    def test_different_parameters_give_different_keys(self):
+        key_1 = fx.get_fixture_key(10, 10, 0.5, int, 'uniform', 1, 'dense')
+        key_2 = fx.get_fixture_key(10, 10, 0.5, int, 'uniform', 2, 'dense')
+        key_3 = fx.get_fixture_key(10, 10, 0.5, np.float32, 'uniform', 1, 'dense')
+        self.assertEqual(3, len({key_1, key_2, key_3}))
+
+    def test_evict_least_recently_used(self):
+        fx.get_matrix(100, 100, 0.5, seed=1, cache_directory=CACHE_DIRECTORY)
+        old_path = os.path.join(CACHE_DIRECTORY, os.listdir(CACHE_DIRECTORY)[0])
+        os.utime(old_path, (0, 0))
+        fx.get_matrix(100, 100, 0.5, seed=2, cache_directory=CACHE_DIRECTORY, size_budget=100 * 100 * 8 + 1000)
+        self.assertEqual(1, len(os.listdir(CACHE_DIRECTORY)))
+        self.assertFalse(os.path.exists(old_path))
+
+    def test_get_matrix_memmap_format(self):
+        matrix = fx.get_matrix(40, 30, 0.9, matrix_format='memmap', cache_directory=CACHE_DIRECTORY)
+        self.assertIsInstance(matrix, np.memmap)
+        self.assertEqual(120, np.count_nonzero(matrix))
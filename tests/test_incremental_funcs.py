@@ -0,0 +1,44 @@
+from unittest import TestCase
+import incremental_funcs as inc
+import matrix_funcs as mf
+import nose
+import numpy as np
+from scipy import sparse
+
+
+class TestIncrementalFuncs(TestCase):
+    """Tests for the functions in the module incremental_funcs.py"""
+
+    def test_update_rows_and_columns(self):
+        matrix_1 = mf.create_matrix(20, 15, 0.8)
+        matrix_2 = mf.create_matrix(15, 10, 0.8)
+        product = inc.IncrementalProduct(matrix_1, sparse.csr_matrix(matrix_2))
+        np.testing.assert_array_equal(np.dot(matrix_1, matrix_2), product.result)
+        new_rows = mf.create_matrix(3, 15, 0.5)
+        product.update_rows([7, 0, 19], new_rows)
+        matrix_1[[7, 0, 19]] = new_rows
+        np.testing.assert_array_equal(np.dot(matrix_1, matrix_2), product.result)
+        new_columns = mf.create_matrix(15, 2, 0.5)
+        product.update_columns([4, -1], sparse.csc_matrix(new_columns))
+        matrix_2[:, [4, 9]] = new_columns
+        np.testing.assert_array_equal(np.dot(matrix_1, matrix_2), product.result)
+        product.update_rows([1], mf.create_matrix(1, 15, 0.5))
+        np.testing.assert_array_equal(product.csr_matrix_1.dot(product.csc_matrix_2).toarray(), product.result)
+
+    def test_replace_csr_rows(self):
+        matrix = sparse.csr_matrix(np.arange(12).reshape(4, 3))
+        new_rows = sparse.csr_matrix(np.array([[0, 0, 1], [2, 0, 0]]))
+        expected = np.array([[2, 0, 0], [3, 4, 5], [6, 7, 8], [0, 0, 1]])
+        np.testing.assert_array_equal(expected, inc.replace_csr_rows(matrix, np.array([3, 0]), new_rows).toarray())
+
+    @nose.tools.raises(ValueError)
+    def test_update_rows_with_repeated_rows(self):
+        inc.IncrementalProduct(np.ones((3, 2)), np.ones((2, 3))).update_rows([1, 1], np.ones((2, 2)))
+
+    @nose.tools.raises(ValueError)
+    def test_update_rows_with_negative_and_positive_index_of_the_same_row(self):
+        inc.IncrementalProduct(np.ones((4, 2)), np.ones((2, 3))).update_rows([-1, 3], np.ones((2, 2)))
+
+    @nose.tools.raises(ValueError)
+    def test_update_rows_with_wrong_count(self):
+        inc.IncrementalProduct(np.ones((3, 2)), np.ones((2, 3))).update_rows([1], np.ones((2, 2)))
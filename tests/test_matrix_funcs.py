@@ -1,7 +1,9 @@
 from unittest import TestCase
 import matrix_funcs as mf
+import mock
 import nose
 import numpy as np
+from scipy import sparse
 
 
 class TestMatrixFuncs(TestCase):
@@ -66,6 +68,26 @@ class TestMatrixFuncs(TestCase):
         np.testing.assert_array_equal(expected, mf.scipy_csr_dot_numpy_with_swap(M1, M2))
         np.testing.assert_array_equal(expected, mf.scipy_bsr_dot_numpy_with_swap(M1, M2))
 
+    def test_swap_funcs_with_memory_layouts(self):
+        M1 = mf.create_matrix(100, 60)
+        M2 = mf.create_matrix(60, 80)
+        expected = np.dot(M1, M2)
+        for dense_matrix in [M1, np.asfortranarray(M1), np.repeat(M1, 2, axis=1)[:, ::2]]:
+            for func in [mf.scipy_csc_dot_numpy_with_swap, mf.scipy_csr_dot_numpy_with_swap,
+                         mf.scipy_bsr_dot_numpy_with_swap]:
+                result = func(dense_matrix, M2)
+                np.testing.assert_array_equal(expected, result)
+                self.assertEqual((100, 80), result.shape)
+
+    def test_dot_transposed_sparse_in_tiles(self):
+        M1 = mf.create_matrix(100, 60)
+        M2 = mf.create_matrix(60, 80)
+        out = np.empty((100, 80), dtype=M1.dtype)
+        result = mf.dot_transposed_sparse(sparse.csc_matrix(M2).T, M1, out=out, tile_bytes=1)
+        self.assertIs(out, result)
+        np.testing.assert_array_equal(np.dot(M1, M2), result)
+        self.assertTrue(result.flags.c_contiguous)
+
     def test_scipy_dot_numpy_funcs(self):
         M1 = np.array([[2, 4, 6, 8], [2, 3, 4, 5], [9, 8 ,7, 6], [3, 7, 5, 9]])
         M2 = np.copy(M1)
@@ -73,4 +95,221 @@ class TestMatrixFuncs(TestCase):
         expected = np.dot(M1_top_2, M2)
         np.testing.assert_array_equal(expected, mf.scipy_csc_dot_numpy_with_top_n(M1, M2, 2))
         np.testing.assert_array_equal(expected, mf.scipy_csr_dot_numpy_with_top_n(M1, M2, 2))
-        np.testing.assert_array_equal(expected, mf.scipy_bsr_dot_numpy_with_top_n(M1, M2, 2))
\ No newline at end of file
+        np.testing.assert_array_equal(expected, mf.scipy_bsr_dot_numpy_with_top_n(M1, M2, 2))
+
+    def test_create_sparse_matrix_exact_sparsity_in_every_format(self):
+        for matrix_format in ['coo', 'csr', 'csc']:
+            matrix = mf.create_sparse_matrix(20, 30, 0.9, matrix_format)
+            self.assertEqual(matrix_format, matrix.format)
+            self.assertEqual(60, matrix.nnz)
+        self.assertEqual(60, np.count_nonzero(mf.create_sparse_matrix(20, 30, 0.9, 'dense')))
+        self.assertEqual(540, np.count_nonzero(mf.create_sparse_matrix(20, 30, 0.1, 'dense')))
+
+    def test_create_sparse_matrix_with_seed_is_reproducible(self):
+        M1 = mf.create_sparse_matrix(50, 40, 0.7, 'dense', seed=7)
+        M2 = mf.create_sparse_matrix(50, 40, 0.7, 'csr', seed=7)
+        np.testing.assert_array_equal(M1, M2.toarray())
+
+    @nose.tools.raises(ValueError)
+    def test_create_sparse_matrix_unknown_format(self):
+        mf.create_sparse_matrix(10, 10, 0.5, 'foo')
+
+    def test_create_structured_matrix_exact_sparsity_for_every_structure(self):
+        for structure in mf.MATRIX_STRUCTURES:
+            for percent_zeros in [0.99, 0.5, 0.01]:
+                matrix = mf.create_structured_matrix(structure, 40, 30, percent_zeros, 'dense', seed=1)
+                self.assertEqual(1200 - int(1200 * percent_zeros), np.count_nonzero(matrix))
+                self.assertEqual(1, matrix.max())
+
+    def test_create_banded_matrix_stays_in_band(self):
+        matrix = mf.create_banded_matrix(30, 30, 0.9, 'dense', seed=1)
+        rows, cols = np.nonzero(matrix)
+        self.assertLessEqual(np.max(np.abs(rows - cols)), 2)
+
+    def test_create_block_diagonal_matrix_stays_in_blocks(self):
+        matrix = mf.create_block_diagonal_matrix(30, 30, 0.9, 'dense', seed=1, block_size=5)
+        rows, cols = np.nonzero(matrix)
+        np.testing.assert_array_equal(rows // 5, cols // 5)
+
+    @nose.tools.raises(ValueError)
+    def test_create_structured_matrix_unknown_structure(self):
+        mf.create_structured_matrix('foo', 10, 10)
+
+    def test_dot_funcs_with_dtype(self):
+        M1 = mf.create_matrix(50, 50, 0.5, dtype=np.int8)
+        self.assertEqual(np.int8, M1.dtype)
+        expected = np.dot(M1.astype(np.float32), M1.astype(np.float32))
+        for func in [mf.dot_numpy, mf.dot_scipy_csc_with_conversion, mf.dot_scipy_csr_with_conversion,
+                     mf.dot_scipy_bsr_with_conversion, mf.scipy_csr_dot_numpy_with_swap]:
+            result = func(M1, M1, dtype=np.float32)
+            self.assertEqual(np.float32, result.dtype)
+            np.testing.assert_array_equal(expected, result)
+
+    def test_dot_with_top_k_matches_multiply_then_prune(self):
+        M1 = np.random.default_rng(1).random((60, 40))
+        M2 = mf.create_sparse_matrix(40, 50, 0.8, 'csr', seed=1, dtype=float)
+        expected = mf.top_n_to_csr(M1 @ M2.toarray(), 5).toarray()
+        np.testing.assert_allclose(expected, mf.dot_with_top_k(M1, M2, 5, block_rows=7).toarray())
+        np.testing.assert_allclose(expected, mf.dot_with_top_k(M1, M2.toarray(), 5, block_rows=64).toarray())
+        result = mf.dot_with_top_k(M2.T.tocsr(), M2, 3, block_rows=9)
+        self.assertEqual('csr', result.format)
+        self.assertLessEqual(np.diff(result.indptr).max(), 3)
+
+    def test_sparse_dot_plan(self):
+        M1 = mf.create_matrix(40, 30, 0.5)
+        M2 = mf.create_matrix(30, 20, 0.9)
+        for sparse_format in ['csr', 'csc', 'bsr']:
+            plan = mf.SparseDotPlan(M2, sparse_format)
+            np.testing.assert_array_equal(np.dot(M1, M2), plan.multiply(M1))
+            np.testing.assert_array_equal(np.dot(M1[:5], M2), plan.multiply(M1[:5]))
+        left_plan = mf.SparseDotPlan(M1, static_side='left')
+        np.testing.assert_array_equal(np.dot(M1, M2), left_plan.multiply(M2))
+
+    @nose.tools.raises(ValueError)
+    def test_sparse_dot_plan_unknown_format(self):
+        mf.SparseDotPlan(np.zeros((2, 2)), 'foo')
+
+    def test_dot_auto(self):
+        M1 = mf.create_matrix(60, 50, 0.05)
+        M2 = mf.create_matrix(50, 40, 0.95)
+        expected = np.dot(M1, M2)
+        for cost_model in [None, {}]:
+            np.testing.assert_array_equal(expected, mf.dot_auto(M1, M2, cost_model=cost_model))
+            np.testing.assert_array_equal(expected, mf.dot_auto(M1, sparse.csr_matrix(M2), cost_model=cost_model))
+            np.testing.assert_array_equal(expected, mf.dot_auto(sparse.csr_matrix(M1), M2, cost_model=cost_model))
+
+    def test_choose_dot_function_never_uses_numpy_with_sparse_operand(self):
+        M = mf.create_matrix(50, 50, 0.0)
+        cost_model = {'dot_numpy': np.zeros(2), 'dot_scipy_csr_with_conversion': np.ones(4)}
+        self.assertEqual(mf.dot_numpy, mf.choose_dot_function(M, M, cost_model))
+        self.assertEqual(mf.dot_scipy_csr_with_conversion,
+                         mf.choose_dot_function(M, sparse.csr_matrix(M), cost_model))
+
+    def test_choose_dot_function_without_cost_model(self):
+        with mock.patch('cost_model_funcs.load_cost_model', return_value=None):
+            dense = mf.create_matrix(50, 50, 0.0)
+            sparse_matrix = mf.create_matrix(50, 50, 0.99)
+            self.assertEqual(mf.dot_numpy, mf.choose_dot_function(dense, dense))
+            self.assertEqual(mf.scipy_csr_dot_numpy_with_swap, mf.choose_dot_function(dense, sparse_matrix))
+            self.assertEqual(mf.dot_scipy_csr_with_conversion, mf.choose_dot_function(sparse_matrix, dense))
+
+    def test_estimate_density(self):
+        M = mf.create_matrix(300, 300, 0.9)
+        self.assertAlmostEqual(0.1, mf.estimate_density(M, sample_size=100 * 100), delta=0.02)
+        self.assertAlmostEqual(0.1, mf.estimate_density(sparse.csr_matrix(M)))
+        self.assertAlmostEqual(0.1, mf.estimate_density(M, sample_size=M.size))
+
+    def test_scipy_csr_dot_numpy_tiled(self):
+        M1 = mf.create_matrix(70, 50, 0.1)
+        M2 = mf.create_power_law_matrix(50, 90, 0.9, matrix_format='dense', seed=3)
+        for workers in [1, 3]:
+            result = mf.scipy_csr_dot_numpy_tiled(M1, M2, workers=workers)
+            np.testing.assert_array_equal(np.dot(M1, M2), result)
+            self.assertTrue(result.flags.c_contiguous)
+        self.assertIs(mf.get_thread_pool(3), mf.get_thread_pool(3))
+
+    def test_get_nnz_balanced_row_blocks(self):
+        indptr = np.array([0, 90, 90, 91, 92, 93, 94, 95, 96, 97, 98, 180])
+        np.testing.assert_array_equal([0, 1, 11], mf.get_nnz_balanced_row_blocks(indptr, 2))
+        np.testing.assert_array_equal([0, 3], mf.get_nnz_balanced_row_blocks(np.zeros(4, dtype=int), 4))
+
+    def test_sparse_output_formats(self):
+        M1 = mf.create_matrix(40, 30, 0.95)
+        M2 = mf.create_matrix(30, 20, 0.95)
+        expected = np.dot(M1, M2)
+        functions = [mf.dot_scipy_csr_with_conversion, mf.dot_scipy_csc_with_conversion,
+                     mf.dot_scipy_bsr_with_conversion]
+        for func in functions:
+            self.assertIsInstance(func(M1, M2), np.ndarray)
+            for output in ['csr', 'csc']:
+                result = func(M1, M2, output=output)
+                self.assertEqual(output, result.format)
+                np.testing.assert_array_equal(expected, result.toarray())
+        top_n_expected = mf.scipy_csr_dot_numpy_with_top_n(M1, M2, 3)
+        result = mf.scipy_csc_dot_numpy_with_top_n(M1, M2, 3, output='csr')
+        np.testing.assert_array_equal(top_n_expected, result.toarray())
+
+    def test_format_result_auto(self):
+        sparse_result = sparse.csr_matrix(np.eye(50))
+        self.assertTrue(sparse.issparse(mf.format_result(sparse_result, 'auto')))
+        self.assertIsInstance(mf.format_result(sparse.csr_matrix(np.ones((5, 5))), 'auto'), np.ndarray)
+
+    @nose.tools.raises(ValueError)
+    def test_format_result_unknown(self):
+        mf.format_result(sparse.csr_matrix(np.eye(2)), 'foo')
+
+    def test_dot_funcs_with_out(self):
+        M1 = mf.create_matrix(40, 30, 0.5)
+        M2 = mf.create_matrix(30, 20, 0.9)
+        expected = np.dot(M1, M2)
+        functions = [mf.dot_numpy, mf.dot_scipy_csr_with_conversion, mf.dot_scipy_csc_with_conversion,
+                     mf.dot_scipy_bsr_with_conversion, mf.scipy_csr_dot_numpy_with_swap,
+                     mf.scipy_csc_dot_numpy_with_swap, mf.scipy_bsr_dot_numpy_with_swap,
+                     mf.scipy_csr_dot_numpy_tiled]
+        for func in functions:
+            out = np.full(expected.shape, 7, dtype=expected.dtype)
+            result = func(M1, M2, out=out)
+            self.assertIs(out, result)
+            np.testing.assert_array_equal(expected, out)
+        out = np.empty(expected.shape, dtype=expected.dtype)
+        top_n_expected = mf.scipy_csr_dot_numpy_with_top_n(M1, M2, 3)
+        np.testing.assert_array_equal(top_n_expected, mf.scipy_csc_dot_numpy_with_top_n(M1, M2, 3, out=out))
+
+    @nose.tools.raises(ValueError)
+    def test_format_result_out_with_sparse_output(self):
+        mf.format_result(sparse.csr_matrix(np.eye(2)), 'csr', np.empty((2, 2)))
+
+    def test_dot_batched(self):
+        matrices_1 = np.stack([mf.create_matrix(6, 4, 0.7) for i in range(5)])
+        matrices_2 = np.stack([mf.create_matrix(4, 3, 0.5) for i in range(5)])
+        expected = np.stack([np.dot(m1, m2) for m1, m2 in zip(matrices_1, matrices_2)])
+        for method in ['dense', 'sparse', 'auto']:
+            np.testing.assert_array_equal(expected, mf.dot_batched(matrices_1, matrices_2, method=method))
+        sparse_1 = [sparse.csr_matrix(matrix) for matrix in matrices_1]
+        sparse_2 = [sparse.csc_matrix(matrix) for matrix in matrices_2]
+        for method in ['dense', 'sparse']:
+            np.testing.assert_array_equal(expected, mf.dot_batched(sparse_1, sparse_2, method=method))
+            np.testing.assert_array_equal(expected, mf.dot_batched(sparse_1, list(matrices_2), method=method))
+        self.assertEqual(np.float32, mf.dot_batched(matrices_1, matrices_2, np.float32, 'sparse').dtype)
+
+    @nose.tools.raises(ValueError)
+    def test_dot_batched_mismatching_batches(self):
+        mf.dot_batched(np.ones((2, 3, 4)), np.ones((3, 4, 5)))
+
+    @nose.tools.raises(ValueError)
+    def test_dot_batched_mixed_shapes(self):
+        mf.dot_batched([np.ones((3, 4)), np.ones((2, 4))], [np.ones((4, 5)), np.ones((4, 5))])
+
+    def test_get_narrowest_dtype(self):
+        self.assertEqual(bool, mf.get_narrowest_dtype(np.array([0, 1, 1])))
+        self.assertEqual(np.uint16, mf.get_narrowest_dtype(np.array([1, 2, 300])))
+        self.assertEqual(np.int8, mf.get_narrowest_dtype(np.array([-5, 3])))
+        self.assertEqual(np.int64, mf.get_narrowest_dtype(np.array([2 ** 40])))
+        self.assertEqual(np.float32, mf.get_narrowest_dtype(np.array([0.5, 1.25])))
+        self.assertEqual(np.float64, mf.get_narrowest_dtype(np.array([0.1])))
+
+    def test_compact_sparse(self):
+        M1 = mf.create_matrix(100, 80)
+        compact = mf.compact_sparse(M1)
+        self.assertEqual('csr', compact.format)
+        self.assertEqual(bool, compact.dtype)
+        self.assertEqual(np.int32, compact.indices.dtype)
+        self.assertLess(mf.get_sparse_bytes(compact), mf.get_sparse_bytes(sparse.csr_matrix(M1)))
+        np.testing.assert_array_equal(M1, compact.toarray())
+        self.assertEqual('csc', mf.compact_sparse(sparse.csc_matrix(M1)).format)
+        self.assertEqual(np.int16, mf.compact_sparse(M1 * -300).dtype)
+
+    @nose.tools.raises(ValueError)
+    def test_compact_sparse_unknown_format(self):
+        mf.compact_sparse(mf.create_matrix(10, 10), 'bsr')
+
+    def test_dot_compact(self):
+        M1 = mf.create_matrix(60, 300, 0.5)
+        M2 = mf.create_matrix(300, 40, 0.5)
+        expected = np.dot(M1, M2)
+        compact_1, compact_2 = mf.compact_sparse(M1), mf.compact_sparse(M2, 'csc')
+        for matrix_1, matrix_2 in [(compact_1, compact_2), (compact_1, M2), (M1, compact_2)]:
+            result = mf.dot_compact(matrix_1, matrix_2)
+            self.assertEqual(np.int64, result.dtype)
+            np.testing.assert_array_equal(expected, result)
+        np.testing.assert_array_equal(expected, mf.dot_compact(compact_1, compact_2, output='csr').toarray())
@@ -0,0 +1,69 @@
+from unittest import TestCase
+import memmap_funcs as mm
+import numpy as np
+from scipy import sparse
+import os
+import shutil
+
+TEST_DIRECTORY = "test_files/"
+
+
+class TestMemmapFuncs(TestCase):
+    """Tests for the functions in the module memmap_funcs.py"""
+
+    def setUp(self):
+        os.makedirs(TEST_DIRECTORY, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(TEST_DIRECTORY)
+
+    def test_create_matrix_memmap_exact_sparsity_in_blocks(self):
+        path = TEST_DIRECTORY + "matrix.npy"
+        mm.create_matrix_memmap(path, 53, 20, 0.9, seed=1, memory_budget=20 * 8 * 7)
+        matrix = mm.load_matrix_memmap(path)
+        self.assertIsInstance(matrix, np.memmap)
+        self.assertEqual((53, 20), matrix.shape)
+        self.assertEqual(1060 - int(1060 * 0.9), np.count_nonzero(matrix))
+
+    def test_create_matrix_memmap_is_reproducible(self):
+        first = mm.create_matrix_memmap(TEST_DIRECTORY + "first.npy", 30, 30, 0.5, seed=4, memory_budget=1000)
+        second = mm.create_matrix_memmap(TEST_DIRECTORY + "second.npy", 30, 30, 0.5, seed=4, memory_budget=1000)
+        np.testing.assert_array_equal(first, second)
+
+    def test_memmap_to_csr(self):
+        path = TEST_DIRECTORY + "matrix.npy"
+        matrix = mm.create_matrix_memmap(path, 40, 25, 0.8, seed=2)
+        csr = mm.memmap_to_csr(matrix, memory_budget=25 * 8 * 3)
+        self.assertEqual('csr', csr.format)
+        np.testing.assert_array_equal(np.asarray(matrix), csr.toarray())
+
+    def test_streaming_dot_dense_output(self):
+        matrix_1 = mm.create_matrix_memmap(TEST_DIRECTORY + "matrix_1.npy", 50, 30, 0.9, dtype=float, seed=1)
+        matrix_2 = mm.create_matrix_memmap(TEST_DIRECTORY + "matrix_2.npy", 30, 10, 0.5, dtype=float, seed=2)
+        expected = np.dot(matrix_1, matrix_2)
+        for read_ahead in [0, 1, 3]:
+            result = mm.streaming_dot(matrix_1, np.array(matrix_2), TEST_DIRECTORY + "result.npy",
+                                      memory_budget=30 * 8 * 7, read_ahead=read_ahead)
+            self.assertIsInstance(result, np.memmap)
+            np.testing.assert_array_equal(expected, result)
+            del result
+        result = mm.streaming_dot(matrix_1, matrix_2, TEST_DIRECTORY + "streamed.npy", memory_budget=30 * 8 * 7)
+        np.testing.assert_array_equal(expected, result)
+
+    def test_streaming_dot_csr_shards(self):
+        matrix_1 = mm.create_matrix_memmap(TEST_DIRECTORY + "matrix_1.npy", 50, 30, 0.9, seed=1)
+        matrix_2 = sparse.csr_matrix(mm.create_matrix_memmap(TEST_DIRECTORY + "matrix_2.npy", 30, 10, 0.5, seed=2))
+        shard_paths = mm.save_csr_shards(matrix_1, TEST_DIRECTORY + "shards", 16)
+        self.assertEqual(4, len(shard_paths))
+        self.assertEqual((50, 30), mm.get_csr_shards_shape(shard_paths))
+        result_paths = mm.streaming_dot(shard_paths, matrix_2, TEST_DIRECTORY + "result", output_format='csr')
+        np.testing.assert_array_equal(np.asarray(matrix_1) @ matrix_2.toarray(),
+                                      mm.load_csr_shards(result_paths).toarray())
+
+    def test_read_ahead_blocks_raises_errors_of_the_reader(self):
+        def blocks():
+            yield 1
+            raise IOError("broken shard")
+        items = mm.read_ahead_blocks(blocks())
+        self.assertEqual(1, next(items))
+        self.assertRaises(IOError, next, items)
@@ -0,0 +1,39 @@
+from unittest import TestCase
+import matrix_funcs as mf
+import nnz_funcs as nz
+import nose
+import numpy as np
+from scipy import sparse
+
+
+class TestNnzFuncs(TestCase):
+    """Tests for the functions in the module nnz_funcs.py"""
+
+    def test_count_product_nnz(self):
+        matrix_1 = mf.create_sparse_matrix(60, 40, 0.9, 'csr', seed=1)
+        matrix_2 = mf.create_sparse_matrix(40, 50, 0.9, 'csc', seed=2)
+        expected = np.count_nonzero(matrix_1.toarray() @ matrix_2.toarray(), axis=1)
+        np.testing.assert_array_equal(expected, nz.count_product_nnz(matrix_1, matrix_2))
+        np.testing.assert_array_equal(expected, nz.count_product_nnz(matrix_1.toarray(), matrix_2, memory_budget=1))
+
+    def test_count_product_nnz_ignores_cancellation(self):
+        matrix_1 = np.array([[1, 1]])
+        matrix_2 = np.array([[1], [-1]])
+        np.testing.assert_array_equal([1], nz.count_product_nnz(matrix_1, matrix_2))
+
+    def test_estimate_product_nnz(self):
+        matrix_1 = mf.create_sparse_matrix(400, 300, 0.99, 'csr', seed=1)
+        matrix_2 = mf.create_sparse_matrix(300, 200, 0.99, 'csr', seed=2)
+        exact = nz.count_product_nnz(matrix_1, matrix_2).sum()
+        self.assertAlmostEqual(1, nz.estimate_product_nnz(matrix_1, matrix_2) / exact, delta=0.2)
+        self.assertAlmostEqual(1, nz.estimate_product_nnz(matrix_1, matrix_2, 'sample', 200) / exact, delta=0.3)
+        self.assertEqual(exact, nz.estimate_product_nnz(matrix_1, matrix_2, 'sample', 400))
+        self.assertEqual(20 * 30, nz.estimate_product_nnz(np.ones((20, 5)), np.ones((5, 30))))
+
+    @nose.tools.raises(ValueError)
+    def test_estimate_product_nnz_unknown_method(self):
+        nz.estimate_product_nnz(np.eye(2), np.eye(2), 'foo')
+
+    def test_choose_product_format(self):
+        self.assertEqual(('csr', 100 * 12 + 101 * 4), nz.choose_product_format(sparse.eye(100), sparse.eye(100)))
+        self.assertEqual(('dense', 10 * 10 * 8), nz.choose_product_format(np.ones((10, 3)), np.ones((3, 10))))
@@ -17,7 +17,7 @@ class TestPlottingFuncs(TestCase):
     def test_configure_plot(self):
         fig = plt.figure(figsize=(11, 10))
         line_width = 1
-        markers = ['D', 'p', 's', '*', 'v', '.', 'H']
+        markers = ['D', 'p', 's', '*', 'v', '.', 'H', 'o']
         x_axis_data = [100, 200]
         result = pf.configure_plot(self.data_object, x_axis_data, padding=3)
         self.assertEquals(line_width, result[1])
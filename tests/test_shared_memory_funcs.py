@@ -0,0 +1,89 @@
+from unittest import TestCase
+from multiprocessing import shared_memory
+import mock
+import nose
+import shared_memory_funcs as smf
+import matrix_funcs as mf
+import numpy as np
+from scipy import sparse
+
+
+class TestSharedMemoryFuncs(TestCase):
+    """Tests for the functions in the module shared_memory_funcs.py"""
+
+    def test_scipy_csr_dot_numpy_processes(self):
+        M1 = mf.create_matrix(70, 50, 0.1)
+        M2 = mf.create_power_law_matrix(50, 90, 0.9, matrix_format='dense', seed=3)
+        np.testing.assert_array_equal(np.dot(M1, M2), smf.scipy_csr_dot_numpy_processes(M1, M2, workers=2))
+        self.assertIs(smf.get_dot_pool(2), smf.get_dot_pool(2))
+
+    def test_scipy_csr_dot_numpy_processes_reuses_shared_operands(self):
+        M1 = mf.create_matrix(30, 20, 0.1)
+        M2 = mf.create_matrix(20, 10, 0.9)
+        with smf.SharedMemoryDotPool(2) as pool, mock.patch.object(smf, 'get_dot_pool', return_value=pool):
+            np.testing.assert_array_equal(np.dot(M1, M2), smf.scipy_csr_dot_numpy_processes(M1, M2))
+            self.assertEqual(2, len(pool.shared_matrices))
+            with mock.patch.object(smf, 'share_array', side_effect=AssertionError("operand copied again")):
+                np.testing.assert_array_equal(np.dot(M1, M2), smf.scipy_csr_dot_numpy_processes(M1, M2))
+            M3 = mf.create_matrix(20, 20, 0.5)
+            np.testing.assert_array_equal(np.dot(M3, M3), smf.scipy_csr_dot_numpy_processes(M3, M3))
+
+    def test_cached_operands_are_limited(self):
+        with smf.SharedMemoryDotPool(2) as pool:
+            matrices = [np.ones((3, 2)) for i in range(smf.MAX_CACHED_OPERANDS + 1)]
+            shared_matrices = [pool.share_cached(matrix) for matrix in matrices]
+            names = shared_matrices[0].get_names()
+            self.assertEqual(smf.MAX_CACHED_OPERANDS, len(pool.shared_matrices))
+            self.assertNotIn(shared_matrices[0], pool.shared_matrices)
+        self.assert_released(names)
+
+    def assert_released(self, names):
+        for name in names:
+            with self.assertRaises(FileNotFoundError):
+                shared_memory.SharedMemory(name=name)
+
+    def test_pool_is_reused_and_shared_memory_released(self):
+        names = []
+        original_create_shared_array = smf.create_shared_array
+
+        def create_shared_array(shape, dtype, handles):
+            descriptor = original_create_shared_array(shape, dtype, handles)
+            names.append(descriptor[0])
+            return descriptor
+
+        with mock.patch.object(smf, 'create_shared_array', side_effect=create_shared_array):
+            with smf.SharedMemoryDotPool(2) as pool:
+                for seed in range(2):
+                    csr_matrix = mf.create_sparse_matrix(40, 30, 0.8, seed=seed, dtype=float)
+                    dense_matrix = np.arange(30 * 5, dtype=float).reshape(30, 5)
+                    np.testing.assert_array_equal(csr_matrix.dot(dense_matrix),
+                                                  pool.multiply(csr_matrix, dense_matrix))
+        self.assertEqual(2 * 5, len(names))
+        self.assert_released(names)
+
+    def test_shared_operands_are_reused_until_released(self):
+        csr_matrix = mf.create_sparse_matrix(40, 30, 0.8, seed=1, dtype=float)
+        dense_matrix = np.arange(30 * 5, dtype=float).reshape(30, 5)
+        with smf.SharedMemoryDotPool(2) as pool:
+            shared_csr, shared_dense = pool.share(csr_matrix), pool.share(dense_matrix)
+            names = shared_csr.get_names() + shared_dense.get_names()
+            with mock.patch.object(smf, 'share_array', side_effect=AssertionError("operand copied again")):
+                for i in range(2):
+                    np.testing.assert_array_equal(csr_matrix.dot(dense_matrix),
+                                                  pool.multiply(shared_csr, shared_dense))
+            shared_csr.release()
+            self.assert_released(names[:3])
+            self.assertEqual([shared_dense], pool.shared_matrices)
+            np.testing.assert_array_equal(csr_matrix.dot(dense_matrix), pool.multiply(csr_matrix, shared_dense))
+        self.assertEqual(4, len(names))
+        self.assert_released(names)
+
+    @nose.tools.raises(ValueError)
+    def test_multiply_dense_first_operand(self):
+        with smf.SharedMemoryDotPool(2) as pool:
+            pool.multiply(np.ones((4, 3)), np.ones((3, 2)))
+
+    def test_multiply_empty_matrix(self):
+        with smf.SharedMemoryDotPool(2) as pool:
+            result = pool.multiply(sparse.csr_matrix((4, 3)), np.ones((3, 2)))
+        np.testing.assert_array_equal(np.zeros((4, 2)), result)
@@ -1,3 +1,4 @@
+import benchmark_funcs as bf
 import table_funcs as tf
 import io_funcs as io
 from prettytable import PrettyTable
@@ -18,6 +19,20 @@ class TestTableFuncs(TestCase):
         actual =  self.create_actual_table_dense_dot_sparse()
         self.assertEquals(expected, actual)
 
+    def test_table_for_dense_dot_sparse_shows_skip_reason(self):
+        labels = {'dot_numpy': 'numpy (Referenz)', 'dot_scipy_csr_with_conversion': 'Compressed Sparse Row'}
+        funcs_ranked_by_time = [(0.1, 'dot_scipy_csr_with_conversion'), (float('nan'), 'dot_numpy')]
+        results = {'dot_numpy': [bf.SkippedTiming(float('nan'), float('nan'), 'not enough memory')],
+                   'dot_scipy_csr_with_conversion': [(0.1, 0.001)]}
+        timings = {'dot_numpy': [float('nan')], 'dot_scipy_csr_with_conversion': [0.1]}
+        test_data = tf.TableData(labels, [100], funcs_ranked_by_time, results, timings)
+        table_1 = PrettyTable(
+            ["n=100  ", "Testobjekt", "Zeit in Sek.", "Standardabweichung", "rel. Performancegewinn"])
+        table_1.align["Testobjekt"] = "l"
+        table_1.add_row(["", "Compressed Sparse Row", 0.1, 0.001, 1.0])
+        table_1.add_row(["", "numpy (Referenz)", "übersprungen: not enough memory", "", ""])
+        self.assertEqual(table_1.get_string() + "\n", tf.create_summery_tables_dense_dot_sparse_benchmark(test_data))
+
     def test_table_for_sparsity_benchmark(self):
         expected = self.create_expected_table_sparsity_benchmark()
         actual =  self.create_actual_table_for_sparsity_benchmark()
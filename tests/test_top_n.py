@@ -1,6 +1,7 @@
 from unittest import TestCase
 import nose
 from top_n_funcs import *
+from scipy import sparse
 
 TOP_2_ITEMS = 2
 
@@ -89,3 +90,46 @@ class TopNTest(TestCase):
     def test_convert_matrix_to_sparse_with_top_n_bad_input(self):
         arr = [1, 2, 3]
         convert_matrix_to_sparse_with_top_n(arr, 2)
+
+    def test_top_n_to_csr_positive_test(self):
+        arr = np.array([[2, 3, 4, 5],[-1,-2,-3,-4],[0, 1, -1, 0]])
+        expected = np.array([[0, 0, 4, 5],[-1, -2, 0, 0],[0, 1, 0, 0]])
+        result = top_n_to_csr(arr, 2)
+        self.assertEqual('csr', result.format)
+        self.assertTrue(result.has_sorted_indices)
+        np.testing.assert_array_equal(expected, result.toarray())
+        np.testing.assert_array_equal(np.array([[2, 3, 4, 5],[-1,-2,-3,-4],[0, 1, -1, 0]]), arr)
+
+    def test_top_n_to_csr_with_all_and_no_items(self):
+        arr = np.array([[2, 3, 4, 5],[-1,-2,-3,-4]])
+        np.testing.assert_array_equal(arr, top_n_to_csr(arr, 4).toarray())
+        self.assertEqual(0, top_n_to_csr(arr, 0).nnz)
+
+    @nose.tools.raises(ValueError)
+    def test_top_n_to_csr_with_n_out_of_range(self):
+        top_n_to_csr(np.array([[2, 3, 4, 5]]), 5)
+
+    def test_top_n_to_csr_with_sparse_input(self):
+        arr = np.array([[0, 3, 4, 5], [-1, 0, -3, 0], [0, 1, 0, 0], [0, 0, 0, 0]])
+        expected = np.array([[0, 0, 4, 5], [-1, 0, -3, 0], [0, 1, 0, 0], [0, 0, 0, 0]])
+        for matrix in [sparse.csr_matrix(arr), sparse.csc_matrix(arr)]:
+            result = top_n_to_csr(matrix, 2)
+            self.assertEqual('csr', result.format)
+            np.testing.assert_array_equal([0, 2, 4, 5, 5], result.indptr)
+            np.testing.assert_array_equal(expected, result.toarray())
+
+    def test_sparse_top_n_to_csr_matches_dense_top_n(self):
+        arr = np.random.default_rng(1).random((30, 40))
+        np.testing.assert_array_equal(top_n_to_csr(arr, 5).toarray(),
+                                      sparse_top_n_to_csr(sparse.csr_matrix(arr), 5).toarray())
+
+    def test_top_n_to_csr_with_workers_matches_single_thread(self):
+        arr = np.random.default_rng(2).random((37, 20))
+        expected = top_n_to_csr(arr, 3).toarray()
+        np.testing.assert_array_equal(expected, top_n_to_csr(arr, 3, workers=3, block_rows=5).toarray())
+        np.testing.assert_array_equal(expected, top_n_to_csr(sparse.csr_matrix(arr), 3, workers=2).toarray())
+
+    def test_stack_csr_rows(self):
+        arr = np.array([[0, 1, 2], [3, 0, 0], [0, 0, 4]])
+        blocks = [sparse.csr_matrix(arr[:1]), sparse.csr_matrix(arr[1:])]
+        np.testing.assert_array_equal(arr, stack_csr_rows(blocks, 3).toarray())
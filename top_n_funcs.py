@@ -1,4 +1,7 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+from scipy import sparse
 
 
 def convert_matrix_to_sparse_with_top_n(dense_matrix, n):
@@ -13,8 +16,148 @@ def convert_matrix_to_sparse_with_top_n(dense_matrix, n):
     if(type(dense_matrix) != np.ndarray):
         raise ValueError("Matrix must be a numpy array "
                          "(currently: {0})". format(type(dense_matrix)))
-    for row in dense_matrix:
-        convert_to_sparse_vector_with_top_n(row, n)
+    indices = get_indices_of_top_n_items_in_rows(dense_matrix, n)
+    top_n = np.take_along_axis(dense_matrix, indices, axis=1)
+    dense_matrix.fill(0)
+    np.put_along_axis(dense_matrix, indices, top_n, axis=1)
+
+
+def top_n_to_csr(dense_matrix, n, workers=1, block_rows=None):
+    """
+    Creates a Compressed Sparse Row matrix which holds the top n items of every row of a dense matrix. The top
+    items of all rows are selected at once and the CSR arrays are built directly, so the dense matrix is neither
+    modified nor copied. SciPy sparse matrices are handled by sparse_top_n_to_csr.
+    Parameters
+    ----------
+    dense_matrix - a dense 2-dim numpy array or a SciPy sparse matrix
+    n - The number of top items that will be left in every matrix row.
+    workers - number of threads. With more than one thread the matrix is processed in row blocks, which works in
+              parallel because numpy releases the GIL while partitioning. None uses all CPUs.
+    block_rows - number of rows pro block. By default every thread gets about four blocks.
+
+    Returns a SciPy CSR matrix with n stored items in every row
+    -------
+
+    """
+    workers = workers or os.cpu_count()
+    if workers > 1:
+        return parallel_top_n_to_csr(dense_matrix, n, workers, block_rows)
+    if sparse.issparse(dense_matrix):
+        return sparse_top_n_to_csr(dense_matrix, n)
+    if not isinstance(dense_matrix, np.ndarray):
+        raise ValueError("Matrix must be a numpy array "
+                         "(currently: {0})". format(type(dense_matrix)))
+    rows, cols = dense_matrix.shape
+    indices = get_indices_of_top_n_items_in_rows(dense_matrix, n)
+    indices.sort(axis=1)
+    data = np.take_along_axis(dense_matrix, indices, axis=1)
+    indptr = np.arange(0, rows * n + 1, n) if n > 0 else np.zeros(rows + 1, dtype=np.int64)
+    return sparse.csr_matrix((data.ravel(), indices.ravel(), indptr), shape=(rows, cols))
+
+
+def parallel_top_n_to_csr(matrix, n, workers, block_rows=None):
+    """
+    Creates the top-n CSR matrix of a dense or sparse matrix in row blocks on a thread pool.
+    Parameters
+    ----------
+    matrix - a dense 2-dim numpy array or a SciPy sparse matrix
+    n - The number of top items that will be left in every matrix row.
+    workers - number of threads
+    block_rows - number of rows pro block. By default every thread gets about four blocks.
+
+    Returns a SciPy CSR matrix
+    -------
+
+    """
+    rows = matrix.shape[0]
+    if sparse.issparse(matrix):
+        matrix = matrix.tocsr()
+    block_rows = block_rows or max(1, -(-rows // (4 * workers)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        blocks = list(executor.map(lambda first_row: top_n_to_csr(matrix[first_row:first_row + block_rows], n),
+                                   range(0, rows, block_rows)))
+    return stack_csr_rows(blocks, matrix.shape[1])
+
+
+def stack_csr_rows(blocks, cols):
+    """
+    Stacks CSR row blocks on top of each other by concatenating their arrays.
+    Parameters
+    ----------
+    blocks - a list of SciPy CSR matrices with the same number of columns
+    cols - the number of columns
+
+    Returns a SciPy CSR matrix
+    -------
+
+    """
+    if not blocks:
+        return sparse.csr_matrix((0, cols))
+    offsets = np.cumsum([0] + [block.nnz for block in blocks[:-1]])
+    indptr = np.concatenate([[0]] + [block.indptr[1:] + offset for block, offset in zip(blocks, offsets)])
+    data = np.concatenate([block.data for block in blocks])
+    indices = np.concatenate([block.indices for block in blocks])
+    rows = sum(block.shape[0] for block in blocks)
+    return sparse.csr_matrix((data, indices, indptr), shape=(rows, cols))
+
+
+def sparse_top_n_to_csr(sparse_matrix, n):
+    """
+    Creates a Compressed Sparse Row matrix which holds the top n stored items of every row of a sparse matrix.
+    The rows are processed as segments of the data array delimited by indptr: all segments are sorted at once,
+    so time and memory are O(nnz) and the matrix is never densified.
+    Parameters
+    ----------
+    sparse_matrix - a SciPy sparse matrix (CSR and CSC are used without densifying)
+    n - The number of top items that will be left in every matrix row.
+
+    Returns a SciPy CSR matrix with at most n stored items in every row
+    -------
+
+    """
+    rows, cols = sparse_matrix.shape
+    if n > cols or n < 0:
+        raise ValueError("N may not be greater than the"
+                         " size of the matrix' rows or less than zero")
+    csr = sparse_matrix.tocsr()
+    if not csr.has_canonical_format:
+        csr = csr.copy()
+        csr.sum_duplicates()
+    row_lengths = np.diff(csr.indptr)
+    row_ids = np.repeat(np.arange(rows), row_lengths)
+    # ascending by value within each row, so the top items are the last ones of every segment. Sorting one
+    # combined (row, value rank) key is much faster than a lexsort over both arrays.
+    value_ranks = np.empty(csr.nnz, dtype=np.int64)
+    value_ranks[np.argsort(csr.data)] = np.arange(csr.nnz)
+    order = np.argsort(row_ids.astype(np.int64) * csr.nnz + value_ranks)
+    rank_from_end = csr.indptr[row_ids + 1] - 1 - np.arange(csr.nnz)
+    selected = np.sort(order[rank_from_end < n])
+    indptr = np.zeros(rows + 1, dtype=csr.indptr.dtype)
+    np.cumsum(np.minimum(row_lengths, n), out=indptr[1:])
+    return sparse.csr_matrix((csr.data[selected], csr.indices[selected], indptr), shape=(rows, cols))
+
+
+def get_indices_of_top_n_items_in_rows(dense_matrix, n):
+    """
+    Gets the column indices of the top n items in every row of a matrix, using one partition of the whole matrix.
+    Parameters
+    ----------
+    dense_matrix - a dense 2-dim numpy array
+    n - the number of indices pro row
+
+    Returns a 2-dim array with n (unsorted) column indices pro row
+    -------
+
+    """
+    cols = dense_matrix.shape[1]
+    if n > cols or n < 0:
+        raise ValueError("N may not be greater than the"
+                         " size of the matrix' rows or less than zero")
+    if n == cols:
+        return np.tile(np.arange(cols), (dense_matrix.shape[0], 1))
+    if n == 0:
+        return np.empty((dense_matrix.shape[0], 0), dtype=np.intp)
+    return np.argpartition(dense_matrix, cols - n, axis=1)[:, cols - n:]
 
 
 def convert_to_sparse_vector_with_top_n(dense_vector, n):